@@ -1,3 +1,14 @@
-from .complaint_analyzer import ComplaintAnalyzer
-from .chatbot_engine import ChatbotEngine
-from .data_handler import DataHandler
\ No newline at end of file
+# Re-exports resolve on first access, so `import app.<module>` does not load
+# the analyzer (NLTK) or pandas-heavy modules it doesn't need.
+_EXPORTS = {
+    "ComplaintAnalyzer": "complaint_analyzer",
+    "ChatbotEngine": "chatbot_engine",
+    "DataHandler": "data_handler",
+}
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        import importlib
+        return getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,126 @@
+"""
+Password hashing and session tokens.
+
+bcrypt is deliberately slow (~100+ ms per hash/check), so it runs on its own
+size-capped pool (executors.run_auth) where a login storm can only queue up
+behind other logins instead of starving the DB pool.
+
+Session tokens are stateless: base64url(JSON payload) + "." + base64url(HMAC-SHA256).
+Verifying one is a single HMAC over a few hundred bytes (microseconds, no DB,
+no bcrypt), so it is cheap enough to run on every request.
+
+Set SESSION_SECRET to keep tokens valid across restarts and worker processes;
+without it a random per-process secret is used and logins last until restart.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+
+from app.logs import get_logger
+
+log = get_logger(__name__)
+
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(8 * 3600)))   # one shift
+# REQUIRE_SESSION=1 rejects API calls without a valid token (see SessionMiddleware)
+REQUIRE_SESSION = os.getenv("REQUIRE_SESSION", "0") == "1"
+# Reachable without a token: health, readiness, login/registration and the metrics scrape
+PUBLIC_PATHS = ("/", "/ready", "/login", "/register", "/metrics")
+
+_secret = os.getenv("SESSION_SECRET", "").encode()
+if not _secret:
+    _secret = secrets.token_bytes(32)
+    log.warning("SESSION_SECRET not set; using a per-process secret (sessions end on restart)")
+
+
+def hash_password(password):
+    import bcrypt   # only the auth pool needs it
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt())
+
+
+_dummy_hash = None
+
+
+def check_password(password, hashed):
+    """bcrypt check; unknown users (hashed=None) cost the same time so emails can't be probed."""
+    import bcrypt
+    global _dummy_hash
+    if not hashed:
+        if _dummy_hash is None:
+            _dummy_hash = hash_password(secrets.token_hex(8))
+        bcrypt.checkpw(password.encode(), _dummy_hash)
+        return False
+    if isinstance(hashed, str):
+        hashed = hashed.encode()
+    return bcrypt.checkpw(password.encode(), hashed)
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _unb64(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(payload):
+    return _b64(hmac.new(_secret, payload.encode(), hashlib.sha256).digest())
+
+
+def issue_token(email, name, ttl=SESSION_TTL_SECONDS):
+    """A signed token for the user, valid for `ttl` seconds."""
+    now = int(time.time())
+    payload = _b64(json.dumps({"sub": email, "name": name, "iat": now, "exp": now + ttl},
+                              separators=(",", ":")).encode())
+    return f"{payload}.{_sign(payload)}"
+
+
+def verify_token(token):
+    """The token's claims if the signature is valid and it has not expired, else None."""
+    if not token or token.count(".") != 1:
+        return None
+    payload, signature = token.split(".")
+    if not hmac.compare_digest(signature, _sign(payload)):
+        return None
+    try:
+        claims = json.loads(_unb64(payload))
+    except ValueError:
+        return None
+    if claims.get("exp", 0) < time.time():
+        return None
+    return claims
+
+
+def bearer_token(headers):
+    """Extracts the token from an ASGI header list (Authorization: Bearer ...)."""
+    for name, value in headers:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            return token.strip() if scheme.lower() == "bearer" else None
+    return None
+
+
+class SessionMiddleware:
+    """ASGI middleware: attaches verified claims to scope["user"]; enforces them if REQUIRE_SESSION."""
+
+    def __init__(self, app, required=None):
+        self.app = app
+        self.required = REQUIRE_SESSION if required is None else required
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        claims = verify_token(bearer_token(scope.get("headers", [])))
+        scope["user"] = claims
+        if (claims is None and self.required and scope["method"] != "OPTIONS"
+                and scope["path"] not in PUBLIC_PATHS):
+            await send({"type": "http.response.start", "status": 401,
+                        "headers": [(b"content-type", b"application/json"),
+                                    (b"www-authenticate", b"Bearer")]})
+            await send({"type": "http.response.body", "body": b'{"error": "Login required"}'})
+            return
+        await self.app(scope, receive, send)
@@ -0,0 +1,191 @@
+"""
+Trainable category engine: hashed TF-IDF features + a linear softmax model.
+
+Keyword matching takes the first category whose word appears in the text, so
+anything phrased off-vocabulary lands in "General". This model learns from
+tickets agents have resolved (their category is taken as correct) plus the
+keyword table (each keyword becomes a short labelled example), and predicts a
+whole upload with one sparse matrix product:
+
+    X = tfidf(texts)                 # n x CATEGORY_FEATURES, CSR, L2-normalised rows
+    P = softmax(X @ W + b)           # n x classes
+
+Features are unigrams and bigrams hashed with crc32 (stable across processes,
+unlike hash()), so there is no vocabulary to store or keep in sync. Rows whose
+top probability is below CATEGORY_MIN_CONFIDENCE keep their keyword category.
+
+Trained models are stored in `category_models` (one row per version, with
+holdout metrics) and the active version is the meta counter "category_model"
+(0 = keywords only). Analysis workers load a version from the DB the first
+time they see it (see app/pipeline.py).
+"""
+import io
+import json
+import math
+import os
+import sqlite3
+import time
+import zlib
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+CATEGORY_FEATURES = int(os.getenv("CATEGORY_FEATURES", str(1 << 18)))
+CATEGORY_MIN_CONFIDENCE = float(os.getenv("CATEGORY_MIN_CONFIDENCE", "0.6"))
+CATEGORY_MIN_TRAIN_ROWS = int(os.getenv("CATEGORY_MIN_TRAIN_ROWS", "50"))
+CATEGORY_MAX_TRAIN_ROWS = int(os.getenv("CATEGORY_MAX_TRAIN_ROWS", "200000"))
+# A trained model only becomes active if its holdout accuracy reaches this
+CATEGORY_MIN_ACCURACY = float(os.getenv("CATEGORY_MIN_ACCURACY", "0.8"))
+# Copies of each (category, keyword) pair added to the training set
+KEYWORD_EXAMPLE_WEIGHT = 3
+HOLDOUT_FRACTION = 0.2
+
+_token_index = {}
+
+
+def _index(token):
+    """Hashed feature index of a token (memoised; the vocabulary of complaints is small)."""
+    i = _token_index.get(token)
+    if i is None:
+        if len(_token_index) > 1_000_000:
+            _token_index.clear()
+        i = _token_index[token] = zlib.crc32(token.encode()) % CATEGORY_FEATURES
+    return i
+
+
+def term_counts(texts):
+    """CSR matrix of raw unigram + bigram counts (texts are already cleaned/lowercased)."""
+    indptr, indices, data = [0], [], []
+    for text in texts:
+        words = text.split()
+        counts = Counter(_index(w) for w in words)
+        counts.update(_index(a + " " + b) for a, b in zip(words, words[1:]))
+        indices.extend(counts.keys())
+        data.extend(counts.values())
+        indptr.append(len(indices))
+    return sparse.csr_matrix((np.array(data, dtype=np.float32), np.array(indices, dtype=np.int32), indptr),
+                             shape=(len(texts), CATEGORY_FEATURES))
+
+
+def tfidf(counts, idf):
+    """Sublinear tf * idf with L2-normalised rows (in place on a copy of `counts`)."""
+    X = counts.copy()
+    X.data = (1 + np.log(X.data)) * idf[X.indices]
+    norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags((1 / norms).astype(np.float32)) @ X
+
+
+def _softmax(Z):
+    Z = Z - Z.max(axis=1, keepdims=True)
+    np.exp(Z, out=Z)
+    return Z / Z.sum(axis=1, keepdims=True)
+
+
+class CategoryModel:
+    def __init__(self, classes, W, b, idf, version=None):
+        self.classes = list(classes)
+        self.W, self.b, self.idf = W, b, idf
+        self.version = version
+
+    def predict_proba(self, texts):
+        if not texts:
+            return np.zeros((0, len(self.classes)), dtype=np.float32)
+        X = tfidf(term_counts(texts), self.idf)
+        return _softmax(np.asarray(X @ self.W) + self.b)
+
+    def predict(self, texts, fallback=None, min_confidence=CATEGORY_MIN_CONFIDENCE):
+        """Categories for cleaned texts; rows below min_confidence take fallback[i] (if given)."""
+        P = self.predict_proba(texts)
+        best = P.argmax(axis=1)
+        confident = P[np.arange(len(texts)), best] >= min_confidence
+        labels = [self.classes[i] for i in best]
+        if fallback is not None:
+            labels = [label if ok else kw for label, ok, kw in zip(labels, confident, fallback)]
+        return labels, confident
+
+    def dumps(self):
+        buf = io.BytesIO()
+        np.savez_compressed(buf, W=self.W, b=self.b, idf=self.idf)
+        return buf.getvalue()
+
+    @classmethod
+    def loads(cls, data, classes, version=None):
+        arrays = np.load(io.BytesIO(data))
+        return cls(classes, arrays["W"], arrays["b"], arrays["idf"], version)
+
+
+def fit(texts, labels, epochs=8, batch_size=256, lr=10.0, l2=1e-6, seed=0, min_steps=300):
+    """Trains a CategoryModel (mini-batch SGD on the softmax cross-entropy).
+
+    Small training sets get extra epochs so there are at least min_steps updates.
+    """
+    classes = sorted(set(labels))
+    y = np.array([classes.index(label) for label in labels])
+    counts = term_counts(texts)
+
+    # Smoothed idf from document frequencies
+    df = np.bincount(counts.indices, minlength=CATEGORY_FEATURES)
+    idf = (np.log((1 + len(texts)) / (1 + df)) + 1).astype(np.float32)
+    X = tfidf(counts, idf)
+
+    W = np.zeros((CATEGORY_FEATURES, len(classes)), dtype=np.float32)
+    b = np.zeros(len(classes), dtype=np.float32)
+    Y = np.eye(len(classes), dtype=np.float32)[y]
+    rng = np.random.default_rng(seed)
+    n_batches = max(len(y) // batch_size, 1)
+    for epoch in range(max(epochs, math.ceil(min_steps / n_batches))):
+        step = lr / math.sqrt(epoch + 1)
+        for batch in np.array_split(rng.permutation(len(y)), n_batches):
+            Xb = X[batch]
+            G = _softmax(np.asarray(Xb @ W) + b) - Y[batch]
+            # Only the features present in the batch get a gradient
+            cols = np.unique(Xb.indices)
+            grad = np.asarray(Xb[:, cols].T @ G) / len(batch)
+            W[cols] -= step * (grad + l2 * W[cols])
+            b -= step * G.mean(axis=0)
+    return CategoryModel(classes, W, b, idf)
+
+
+def train(examples, keywords, clean):
+    """Trains on [(complaint, category)] + the keyword table; evaluates on a holdout.
+
+    Returns (artifact bytes, info dict). Runs in the CPU pool.
+    """
+    start = time.perf_counter()
+    texts = [clean(text) for text, _ in examples]
+    labels = [category or "General" for _, category in examples]
+    holdout = [i for i in range(len(texts)) if zlib.crc32(texts[i].encode()) % 100 < HOLDOUT_FRACTION * 100]
+    held = set(holdout)
+    train_idx = [i for i in range(len(texts)) if i not in held]
+
+    train_texts = [texts[i] for i in train_idx]
+    train_labels = [labels[i] for i in train_idx]
+    for category, words in (keywords or {}).items():
+        for word in words:
+            train_texts.extend([word] * KEYWORD_EXAMPLE_WEIGHT)
+            train_labels.extend([category] * KEYWORD_EXAMPLE_WEIGHT)
+
+    model = fit(train_texts, train_labels)
+    info = {"classes": model.classes, "train_rows": len(train_idx), "holdout_rows": len(holdout),
+            "keyword_examples": len(train_texts) - len(train_idx)}
+    if holdout:
+        predicted, confident = model.predict([texts[i] for i in holdout])
+        truth = [labels[i] for i in holdout]
+        info["holdout_accuracy"] = round(float(np.mean([p == t for p, t in zip(predicted, truth)])), 4)
+        info["holdout_confident_pct"] = round(100 * float(np.mean(confident)), 2)
+    info["train_seconds"] = round(time.perf_counter() - start, 2)
+    return model.dumps(), info
+
+
+def load(db_name, version):
+    """Reads a stored model version straight from the DB file (used by analysis workers)."""
+    conn = sqlite3.connect(db_name, timeout=30)
+    try:
+        row = conn.execute("SELECT classes, artifact FROM category_models WHERE version = ?", (version,)).fetchone()
+    finally:
+        conn.close()
+    if not row:
+        return None
+    return CategoryModel.loads(row[1], json.loads(row[0]), version)
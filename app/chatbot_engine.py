@@ -1,9 +1,25 @@
+import numpy as np
 import pandas as pd
 
+
+def _matches(series, value, normalize):
+    """Mask of rows where normalize(series) == value; categoricals only normalize their distinct values."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        hits = np.flatnonzero((normalize(pd.Series(series.cat.categories)) == value).to_numpy())
+        return series.cat.codes.isin(hits).to_numpy()
+    return (normalize(series) == value).to_numpy()
+
+
 class ChatbotEngine:
-    def __init__(self, df, keywords_dict):
+    def __init__(self, df, keywords_dict, records=None):
+        """df may be DataHandler.load_data() or the shared snapshot (read-only here).
+
+        records(rows) turns matched rows into full dicts; with the snapshot that
+        is ComplaintSnapshot.records, which fetches the complaint text lazily.
+        """
         self.df = df
         self.keywords = keywords_dict
+        self.records = records or (lambda rows: rows.to_dict(orient="records"))
 
     def respond(self, query):
         """
@@ -35,11 +51,10 @@ class ChatbotEngine:
             if clean_word.isdigit() and len(clean_word) > 4:
                 return self.search_by_account(clean_word)
 
-        # 2. Look for Customer Name
-        search_df = self.df.copy()
-        if 'customer_name' in search_df.columns:
-            search_df['customer_name'] = search_df['customer_name'].fillna("Unknown").astype(str)
-            for name in search_df['customer_name']:
+        # 2. Look for Customer Name (distinct names, in order of first appearance)
+        if 'customer_name' in self.df.columns:
+            names = pd.Series(pd.unique(self.df['customer_name'])).astype(object).fillna("Unknown").astype(str)
+            for name in names:
                 if len(name) > 3 and name.lower() in query:
                     return self.search_by_name(name)
 
@@ -93,29 +108,28 @@ class ChatbotEngine:
         if not matches.empty:
             return {
                 "response": f"🚨 I found **{len(matches)} Critical (P1)** cases that need immediate attention:",
-                "data": matches.to_dict(orient="records")
+                "data": self.records(matches)
             }
         else:
             return "Good news! There are currently **0 Critical** cases in the system."
 
     def search_by_account(self, acc_num):
-        search_df = self.df.copy()
-        if 'account_number' in search_df.columns:
-            search_df['account_number'] = search_df['account_number'].fillna("0").astype(str).str.replace(".0", "", regex=False)
-            match = self.df[search_df['account_number'] == acc_num]
+        if 'account_number' in self.df.columns:
+            normalize = lambda s: s.fillna("0").astype(str).str.replace(".0", "", regex=False)
+            match = self.df[_matches(self.df['account_number'], acc_num, normalize)]
             
             if not match.empty:
                 return {
                     "response": f"✅ Found **{len(match)}** record(s) for Account **#{acc_num}**:",
-                    "data": match.to_dict(orient="records")
+                    "data": self.records(match)
                 }
         return f"I checked the database, but I couldn't find Account #{acc_num}."
 
     def search_by_name(self, name):
-        match = self.df[self.df['customer_name'].astype(str).str.lower() == name.lower()]
+        match = self.df[_matches(self.df['customer_name'], name.lower(), lambda s: s.astype(str).str.lower())]
         return {
             "response": f"👤 Found **{len(match)}** complaint(s) from **{name}**:",
-            "data": match.to_dict(orient="records")
+            "data": self.records(match)
         }
 
     def search_by_category(self, category, keyword):
@@ -123,6 +137,6 @@ class ChatbotEngine:
         if not matches.empty:
             return {
                 "response": f"📂 I found **{len(matches)}** cases related to **{category}** (keyword matched: '{keyword}'):",
-                "data": matches.to_dict(orient="records")
+                "data": self.records(matches)
             }
         return f"I understood you are looking for '{category}', but there are no open complaints in that category right now."
\ No newline at end of file
@@ -1,9 +1,19 @@
 import re
-from nltk.sentiment import SentimentIntensityAnalyzer
+from time import perf_counter
+from app import metrics, rules, sentiment
+from app.logs import get_logger
+from app.metrics import ROW_STAGE_SECONDS
+
+log = get_logger(__name__)
 
 class ComplaintAnalyzer:
-    def __init__(self, keywords_dict=None):
-        self.sentiment_analyzer = SentimentIntensityAnalyzer()
+    def __init__(self, keywords_dict=None, sentiment_backend=None):
+        # Pluggable sentiment model (VADER by default, see app/sentiment.py)
+        self.sentiment = sentiment_backend or sentiment.get_backend()
+        # Optional trained category model (app/category_model.py); keywords are the fallback
+        self.category_model = None
+        # Urgency/priority/action rules (app/rules.py); replaced when the DB rule set changes
+        self.rules = rules.compile_rules()
 
         # If keywords are provided (from DB), use them. Otherwise, use defaults.
         if keywords_dict:
@@ -20,48 +30,74 @@ class ComplaintAnalyzer:
     def update_keywords(self, new_keywords):
         """Updates the internal keyword list dynamically from the database."""
         self.categories = new_keywords
-        print("✅ ComplaintAnalyzer keywords updated.")
+        log.info("analyzer keywords updated", extra={"categories": len(new_keywords or {})})
+
+    def update_rules(self, rule_set, version):
+        """Recompiles the triage rules (called when the DB rules_version changes)."""
+        self.rules = rules.compile_rules(rule_set, version)
+        log.info("analyzer rules updated", extra={"rules_version": version})
 
-    def clean_text(self, text):
+    @staticmethod
+    def clean_text(text):
         text = text.lower()
         # FIXED: Now allows numbers (0-9) so amounts like "5000 rs" are kept
         text = re.sub(r'[^a-zA-Z0-9\s]', '', text)
         return text
 
-    def analyze(self, complaint):
-        cleaned = self.clean_text(complaint)
-
-        category = "General"
+    def categorize(self, cleaned):
         # Dynamic category matching
         for c, words in self.categories.items():
             if any(w in cleaned for w in words):
-                category = c
-                break
+                return c
+        return "General"
 
-        sentiment_score = self.sentiment_analyzer.polarity_scores(cleaned)['compound']
-        sentiment = "Positive" if sentiment_score >= 0.05 else "Negative" if sentiment_score <= -0.05 else "Neutral"
+    def analyze(self, complaint):
+        t0 = perf_counter()
+        cleaned = self.clean_text(complaint)
+        t1 = perf_counter()
+        category = self.categorize(cleaned)
+        if self.category_model:
+            category = self.category_model.predict([cleaned], fallback=[category])[0][0]
+        t2 = perf_counter()
+        labels, scores = self.sentiment.classify_with_scores([cleaned])
+        t3 = perf_counter()
+        ROW_STAGE_SECONDS.observe(t1 - t0, stage="text_clean")
+        ROW_STAGE_SECONDS.observe(t2 - t1, stage="keyword_match")
+        ROW_STAGE_SECONDS.observe(t3 - t2, stage="sentiment")
+        urgency, priority, action = self.rules.match_one(cleaned, category, labels[0], scores[0])
+        return self._result(complaint, category, labels[0], urgency, priority, action)
 
-        urgency = "Low"
-        # Check for urgent keywords (You could also make this dynamic later if you wanted!)
-        if any(w in cleaned for w in ["fraud", "scam", "unauthorized", "blocked", "urgent", "hacked"]):
-            urgency = "High"
-        elif any(w in cleaned for w in ["delay", "issue", "pending", "failed"]):
-            urgency = "Medium"
+    def analyze_batch(self, complaints):
+        """Same results as analyze() per complaint; sentiment and the rules run once over the whole batch."""
+        cleaned, categories = [], []
+        for complaint in complaints:
+            t0 = perf_counter()
+            text = self.clean_text(complaint)
+            t1 = perf_counter()
+            categories.append(self.categorize(text))
+            ROW_STAGE_SECONDS.observe(t1 - t0, stage="text_clean")
+            ROW_STAGE_SECONDS.observe(perf_counter() - t1, stage="keyword_match")
+            cleaned.append(text)
 
-        # Prioritization Logic
-        if category == "Fraud" or urgency == "High":
-            priority = "P1 - Critical"
-            action = "Immediate escalation to fraud/security team"
-        elif sentiment == "Negative" and urgency == "Medium":
-            priority = "P2 - High"
-            action = "Assign to senior customer support team"
-        elif sentiment == "Neutral":
-            priority = "P3 - Medium"
-            action = "Standard support handling"
-        else:
-            priority = "P4 - Low"
-            action = "Auto-response or FAQ handling"
+        if self.category_model:
+            # One sparse matrix product for the whole batch; low-confidence rows keep the keyword hit
+            with metrics.timed("category_model", items=len(cleaned)):
+                categories, confident = self.category_model.predict(cleaned, fallback=categories)
+            metrics.EVENTS.inc(int(confident.sum()), event="category", result="model")
+            metrics.EVENTS.inc(len(cleaned) - int(confident.sum()), event="category", result="keyword_fallback")
+
+        with metrics.timed("sentiment", items=len(cleaned)):
+            sentiments, scores = self.sentiment.classify_with_scores(cleaned)
+
+        if not cleaned:
+            return []
+        with metrics.timed("rules", items=len(cleaned)):
+            urgencies, priorities, actions = self.rules.evaluate(cleaned, categories, sentiments, scores)
+
+        return [self._result(*args) for args in zip(complaints, categories, sentiments, urgencies, priorities, actions)]
 
+    @staticmethod
+    def _result(complaint, category, sentiment, urgency, priority, action):
         return {
             "complaint": complaint,
             "category": category,
@@ -69,4 +105,4 @@ class ComplaintAnalyzer:
             "urgency": urgency,
             "priority": priority,
             "action": action
-        }
\ No newline at end of file
+        }
@@ -1,20 +1,129 @@
+import functools
+import json
 import sqlite3
+import threading
+import time
 import pandas as pd
-from datetime import datetime
-import bcrypt
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from app import auth, events, metrics, outbox, rollups, rules
+from app.snapshot import TABLE_COLUMNS, ComplaintSnapshot
+from app.metrics import timed_query
+from app.logs import get_logger
+
+log = get_logger(__name__)
+
+# Optional: cross-process writer lock (POSIX only; elsewhere writers are serialized per process)
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Stored in PRAGMA user_version once create_table has run; bump it whenever
+# create_table gains DDL or a migration, so existing databases run it again
+SCHEMA_VERSION = 1
+
+# Ticket statuses that trigger a customer email
+NOTIFY_STATUSES = ("Resolved", "Escalated")
+# Columns returned by the paginated complaints API (what the ticket editor shows)
+PAGE_COLUMNS = ("id", "customer_name", "account_number", "complaint", "category", "priority",
+                "sentiment", "status", "action", "date_logged")
+
+class ThreadConnection(sqlite3.Connection):
+    """A per-thread connection that survives close().
+
+    Callers keep the usual get_conn() ... close() pattern; close() only rolls
+    back an unfinished transaction, and the connection is reused by the next
+    call on the same thread. It is really closed when its thread goes away.
+    """
+
+    def close(self):
+        if self.in_transaction:
+            self.rollback()
+
+
+class WriterLock:
+    """One SQLite writer at a time across every thread and worker process.
+
+    SQLite allows a single writer; without coordination, concurrent writers
+    spin in the busy handler and fail with "database is locked" once the
+    timeout expires. Writers instead queue on an flock() of `<db>.writer`,
+    which the kernel hands out in turn. Reentrant within a thread.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()   # flock does not exclude threads sharing one fd
+        self.local = threading.local()
+        self.fd = None
+
+    @contextmanager
+    def hold(self):
+        if getattr(self.local, "depth", 0):
+            self.local.depth += 1
+            try:
+                yield
+            finally:
+                self.local.depth -= 1
+            return
+
+        start = time.perf_counter()
+        with self.lock:
+            if fcntl:
+                if self.fd is None:
+                    self.fd = open(self.path, "a")
+                fcntl.flock(self.fd, fcntl.LOCK_EX)
+            metrics.DB_WRITE_LOCK_SECONDS.observe(time.perf_counter() - start)
+            self.local.depth = 1
+            try:
+                yield
+            finally:
+                self.local.depth = 0
+                if fcntl:
+                    fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+
+def writes(fn):
+    """DataHandler method decorator: runs the call under the single-writer lock."""
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        with self.writer.hold():
+            return fn(self, *args, **kwargs)
+    return wrapper
+
 
 class DataHandler:
     def __init__(self, db_name="complaints.db"):
         self.db_name = db_name
-        self.create_table()
+        self.local = threading.local()
+        self.writer = WriterLock(db_name + ".writer")
+        # Per-process copies of DB-derived values, keyed by meta version (see cached())
+        self.cache = {}
+        self.cache_lock = threading.Lock()
+        # Compact shared copy of the complaints table for scanning reads (app/snapshot.py)
+        self.snapshot = ComplaintSnapshot(self)
+        # Worker restarts skip the DDL and seeding when the schema is current
+        if self.schema_version() < SCHEMA_VERSION:
+            self.create_table()
 
     def get_conn(self):
-        """Helper to get a fresh connection every time."""
-        return sqlite3.connect(self.db_name, check_same_thread=False)
+        """Returns this thread's connection, opening it on first use."""
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            with metrics.DB_CONNECT_SECONDS.time():
+                conn = sqlite3.connect(self.db_name, check_same_thread=False, timeout=30, factory=ThreadConnection)
+                conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
 
+    @writes
     def create_table(self):
-        """Creates tables if they don't exist."""
+        """Creates tables if they don't exist (under the writer lock, so workers starting together don't race)."""
         conn = self.get_conn()
+
+        # WAL lets readers (dashboard, reports) proceed while an upload is writing
+        conn.execute("PRAGMA journal_mode=WAL")
         
         # 1. Complaints Table
         conn.execute("""
@@ -31,9 +140,14 @@ class DataHandler:
             customer_name TEXT,
             account_number TEXT,
             email TEXT,
-            phone TEXT
+            phone TEXT,
+            row_version INTEGER NOT NULL DEFAULT 0
         )
         """)
+        # Write stamps for the incremental snapshot refresh; added to databases that predate it
+        if "row_version" not in {r[1] for r in conn.execute("PRAGMA table_info(complaints)")}:
+            conn.execute("ALTER TABLE complaints ADD COLUMN row_version INTEGER NOT NULL DEFAULT 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_complaints_row_version ON complaints (row_version)")
 
         # 2. Keywords Table
         conn.execute("""
@@ -52,7 +166,62 @@ class DataHandler:
             full_name TEXT
         )
         """)
+
+        # 4. Meta Table (version counters used to key caches)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER
+        )
+        """)
+        conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('data_version', 0)")
+
+        # 5. Rollup Tables (backfilled once for databases that predate them)
+        rollups.create_rollup_tables(conn)
+        has_rollups = conn.execute("SELECT count(*) FROM rollup_totals").fetchone()[0]
+        has_complaints = conn.execute("SELECT count(*) FROM complaints").fetchone()[0]
+        if has_complaints and not has_rollups:
+            rollups.rebuild_rollups(conn)
+        elif has_complaints and not conn.execute("SELECT count(*) FROM sentiment_rollup").fetchone()[0]:
+            rollups.rebuild_sentiment_rollup(conn)
+
+        # Paginated ticket queries filter by status/category/priority, newest first
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_complaints_status ON complaints (status, id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_complaints_category ON complaints (category, id)")
+
+        # 6. Email Outbox
+        outbox.create_outbox_table(conn)
+
+        # 7. Event Log (live feed for GET /events)
+        events.create_event_table(conn)
+
+        # 8. Category Models (trained artifacts, see app/category_model.py)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS category_models (
+            version INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at TEXT,
+            classes TEXT,
+            train_rows INTEGER,
+            metrics TEXT,
+            artifact BLOB
+        )
+        """)
         
+        # 9. Triage Rules (ordered per kind, see app/rules.py); meta.rules_version keys the compiled copies
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS rules (
+            kind TEXT,
+            position INTEGER,
+            name TEXT,
+            conditions TEXT,
+            outcome TEXT,
+            PRIMARY KEY (kind, position)
+        )
+        """)
+        if conn.execute("SELECT count(*) FROM rules").fetchone()[0] == 0:
+            for kind, rule_list in rules.DEFAULT_RULES.items():
+                self._insert_rules(conn, kind, rule_list)
+
         # Seed Keywords
         check = conn.execute("SELECT count(*) FROM keywords").fetchone()[0]
         if check == 0:
@@ -64,79 +233,349 @@ class DataHandler:
             ]
             conn.executemany("INSERT INTO keywords (category, word) VALUES (?, ?)", defaults)
         
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
         conn.commit()
         conn.close()
 
+    def schema_version(self):
+        conn = self.get_conn()
+        try:
+            return conn.execute("PRAGMA user_version").fetchone()[0]
+        finally:
+            conn.close()
+
+    def bump_version(self, conn, key="data_version"):
+        """Increments a version counter inside the caller's transaction."""
+        conn.execute("""
+            INSERT INTO meta (key, value) VALUES (?, 1)
+            ON CONFLICT(key) DO UPDATE SET value = value + 1
+        """, (key,))
+
+    def bump_row_version(self, conn):
+        """Bumps meta.row_version and returns it, for stamping the rows this transaction writes."""
+        self.bump_version(conn, "row_version")
+        return conn.execute("SELECT value FROM meta WHERE key = 'row_version'").fetchone()[0]
+
+    def get_version(self, key="data_version"):
+        conn = self.get_conn()
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key=?", (key,)).fetchone()
+            return row[0] if row else 0
+        finally:
+            conn.close()
+
+    def get_versions(self):
+        """Every meta counter ({key: value}) in one query."""
+        conn = self.get_conn()
+        try:
+            return dict(conn.execute("SELECT key, value FROM meta").fetchall())
+        finally:
+            conn.close()
+
+    def cached(self, key, version, loader, *args):
+        """loader(*args), reused by this process until `version` changes.
+
+        The version comes from the meta counters, which every writer bumps in
+        the same transaction as its change, so each worker process notices
+        another one's update on its next get_versions() without any messaging.
+        """
+        with self.cache_lock:
+            hit = self.cache.get(key)
+        if hit and hit[0] == version:
+            return hit[1]
+        value = loader(*args)
+        with self.cache_lock:
+            self.cache[key] = (version, value)
+        return value
+
+    def _set_meta(self, conn, key, value):
+        """Sets a meta value (e.g. the active category model) inside the caller's transaction."""
+        conn.execute("""
+            INSERT INTO meta (key, value) VALUES (?, ?)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value
+        """, (key, value))
+
     # --- CORE METHODS ---
 
+    @timed_query("save_results")
+    @writes
     def save_results(self, df):
         conn = self.get_conn()
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        rollup_counts = Counter()
+        sentiment_counts = Counter()
+        ids = []
         
-        for _, row in df.iterrows():
-            conn.execute("""
-                INSERT INTO complaints (
-                    complaint, category, sentiment, urgency, priority, 
-                    action, status, date_logged, customer_name, 
-                    account_number, email, phone
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                row['complaint'], 
-                row['category'], 
-                row['sentiment'], 
-                row['urgency'], 
-                row['priority'], 
-                row.get('action', 'Pending Review'), 
-                'Open', 
-                current_time, 
-                str(row.get('customer_name', 'Unknown')), 
-                str(row.get('account_number', 'N/A')), 
-                str(row.get('email', '')), 
-                str(row.get('phone', ''))
-            ))
-        
-        conn.commit()
-        conn.close()
+        try:
+            with metrics.timed("db_insert", items=len(df)):
+                row_version = self.bump_row_version(conn)
+                for _, row in df.iterrows():
+                    cursor = conn.execute("""
+                        INSERT INTO complaints (
+                            complaint, category, sentiment, urgency, priority, 
+                            action, status, date_logged, customer_name, 
+                            account_number, email, phone, row_version
+                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """, (
+                        row['complaint'], 
+                        row['category'], 
+                        row['sentiment'], 
+                        row['urgency'], 
+                        row['priority'], 
+                        row.get('action', 'Pending Review'), 
+                        'Open', 
+                        current_time, 
+                        str(row.get('customer_name', 'Unknown')), 
+                        str(row.get('account_number', 'N/A')), 
+                        str(row.get('email', '')), 
+                        str(row.get('phone', '')),
+                        row_version
+                    ))
+                    rollup_counts[(current_time[:10], row['category'], row['priority'], 'Open')] += 1
+                    sentiment_counts[(current_time[:10], row['category'], row['priority'], row['sentiment'])] += 1
+                    ids.append(cursor.lastrowid)
+            
+                rollups.add_counts(conn, rollup_counts)
+                rollups.add_sentiment_counts(conn, sentiment_counts)
+                if ids:
+                    events.append(conn, "complaints_added", self._added_event(conn, ids, rollup_counts))
+                self.bump_version(conn)
+                conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _added_event(conn, ids, rollup_counts):
+        """complaints_added payload; small uploads carry their rows so clients can append them."""
+        payload = {
+            "count": len(ids), "first_id": ids[0], "last_id": ids[-1],
+            "metrics": {
+                "total": len(ids),
+                "critical": sum(n for (_, _, priority, _), n in rollup_counts.items() if priority == 'P1 - Critical'),
+                "resolved": 0,
+            },
+        }
+        if len(ids) <= events.EVENT_MAX_ITEMS:
+            cursor = conn.execute(
+                f"SELECT {', '.join(events.ITEM_FIELDS)} FROM complaints WHERE id BETWEEN ? AND ? ORDER BY id",
+                (ids[0], ids[-1]))
+            payload["items"] = [dict(zip(events.ITEM_FIELDS, row)) for row in cursor]
+        return payload
 
+    @timed_query("load_data")
     def load_data(self):
         conn = self.get_conn()
         try:
-            df = pd.read_sql("SELECT * FROM complaints", conn)
+            df = pd.read_sql(f"SELECT {', '.join(TABLE_COLUMNS)} FROM complaints", conn)
         except:
             df = pd.DataFrame()
         finally:
             conn.close()
         return df
 
+    @staticmethod
+    def filter_clause(filters):
+        """Builds a WHERE clause for the report/query filters.
+
+        Supported keys: start_date / end_date (YYYY-MM-DD, inclusive),
+        category, priority, status. Empty values are ignored.
+        """
+        filters = filters or {}
+        where, args = [], []
+        if filters.get("start_date"):
+            where.append("date_logged >= ?")
+            args.append(filters["start_date"])
+        if filters.get("end_date"):
+            end = datetime.strptime(filters["end_date"], "%Y-%m-%d") + timedelta(days=1)
+            where.append("date_logged < ?")
+            args.append(end.strftime("%Y-%m-%d"))
+        for col in ("category", "priority", "status"):
+            if filters.get(col):
+                where.append(f"{col} = ?")
+                args.append(filters[col])
+        return (" WHERE " + " AND ".join(where) if where else ""), args
+
+    @timed_query("count_complaints")
+    def count_complaints(self, status=None, filters=None):
+        filters = dict(filters or {})
+        if status:
+            filters["status"] = status
+        clause, args = self.filter_clause(filters)
+        conn = self.get_conn()
+        try:
+            return conn.execute("SELECT count(*) FROM complaints" + clause, args).fetchone()[0]
+        finally:
+            conn.close()
+
+    def iter_complaints(self, batch_size=1000, filters=None):
+        """Yields the (filtered) complaints table as lists of dicts, one batch at a time."""
+        clause, args = self.filter_clause(filters)
+        conn = self.get_conn()
+        try:
+            cursor = conn.execute(f"SELECT {', '.join(TABLE_COLUMNS)} FROM complaints" + clause + " ORDER BY id", args)
+            cols = [description[0] for description in cursor.description]
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [dict(zip(cols, row)) for row in rows]
+        finally:
+            conn.close()
+
+    @timed_query("query_complaints")
+    def query_complaints(self, filters=None, search=None, page=1, page_size=50):
+        """One page of complaints (newest first) matching the filters, plus the total match count.
+
+        `search` matches the complaint text, customer name or account number.
+        """
+        clause, args = self.filter_clause(filters)
+        if search:
+            clause += (" AND " if clause else " WHERE ") + "(complaint LIKE ? OR customer_name LIKE ? OR account_number LIKE ?)"
+            args = args + [f"%{search}%"] * 3
+        conn = self.get_conn()
+        try:
+            total = conn.execute("SELECT count(*) FROM complaints" + clause, args).fetchone()[0]
+            cursor = conn.execute(
+                f"SELECT {', '.join(PAGE_COLUMNS)} FROM complaints{clause} ORDER BY id DESC LIMIT ? OFFSET ?",
+                (*args, page_size, (page - 1) * page_size)
+            )
+            cols = [description[0] for description in cursor.description]
+            return [dict(zip(cols, row)) for row in cursor.fetchall()], total
+        finally:
+            conn.close()
+
+    @timed_query("get_rollup_summary")
+    def get_rollup_summary(self, filters=None):
+        """Category x priority x status breakdowns and trends, read from the rollup tables."""
+        conn = self.get_conn()
+        try:
+            return rollups.rollup_summary(conn, filters=filters)
+        finally:
+            conn.close()
+
+    @timed_query("get_breakdown")
+    def get_breakdown(self, by, filters=None):
+        """{value: count} for one dimension (category/priority/status/sentiment), from the rollups."""
+        conn = self.get_conn()
+        try:
+            counts = rollups.breakdown(conn, by, filters)
+            if counts is None:
+                # Sentiment x status is not rolled up; count the filtered rows instead
+                clause, args = self.filter_clause(filters)
+                counts = dict(conn.execute(
+                    f"SELECT sentiment, count(*) FROM complaints{clause} GROUP BY 1 ORDER BY 2 DESC", args
+                ).fetchall())
+            return counts
+        finally:
+            conn.close()
+
+    @timed_query("get_timeseries")
+    def get_timeseries(self, granularity="day", filters=None, group_by=None):
+        conn = self.get_conn()
+        try:
+            return rollups.timeseries(conn, granularity, filters, group_by)
+        finally:
+            conn.close()
+
+    @timed_query("get_metrics")
     def get_metrics(self):
-        df = self.load_data()
-        if df.empty: return {"total": 0, "critical": 0, "resolved": 0}
-        
-        return {
-            "total": len(df),
-            "critical": len(df[df["priority"] == "P1 - Critical"]),
-            "resolved": len(df[df["status"] == "Resolved"])
-        }
+        """Headline counts, read from rollup_totals so the cost is independent of table size.
+
+        event_id is the last event already reflected in the counts (read in the
+        same statement), so live clients apply only newer deltas on top.
+        """
+        conn = self.get_conn()
+        try:
+            total, critical, resolved, event_id = conn.execute("""
+                SELECT coalesce(sum(count), 0),
+                       coalesce(sum(CASE WHEN priority = 'P1 - Critical' THEN count END), 0),
+                       coalesce(sum(CASE WHEN status = 'Resolved' THEN count END), 0),
+                       (SELECT coalesce(max(id), 0) FROM event_log)
+                FROM rollup_totals
+            """).fetchone()
+        finally:
+            conn.close()
+        return {"total": total, "critical": critical, "resolved": resolved, "event_id": event_id}
 
     # --- MISSING METHODS RESTORED HERE ---
     
-    def update_complaint(self, complaint_id, status, action):
-        """Updates the status and action of a complaint."""
+    @timed_query("update_complaint")
+    @writes
+    def update_complaint(self, complaint_id, status, action, notify=True):
+        """Updates the status and action of a complaint.
+
+        If the new status is in NOTIFY_STATUSES, the customer email is queued
+        in the outbox within the same transaction (delivered by OutboxWorker).
+        """
         conn = self.get_conn()
         try:
-            conn.execute("UPDATE complaints SET status = ?, action = ? WHERE id = ?", (status, action, complaint_id))
+            # Take the write lock up front so the rollup sees the same old status we overwrite
+            conn.execute("BEGIN IMMEDIATE")
+            self._apply_update(conn, complaint_id, status, action, notify, self.bump_row_version(conn))
+            self.bump_version(conn)
             conn.commit()
             return True
+        except sqlite3.Error as e:
+            metrics.db_error("update_complaint", e)
+            log.warning("complaint update failed", extra={"complaint_id": complaint_id, "error": str(e)})
+            return False
         except: 
             return False
         finally: 
             conn.close()
 
+    @timed_query("update_complaints")
+    @writes
+    def update_complaints(self, updates, notify=True):
+        """Applies [{"id", "status", "action"}, ...] in one transaction.
+
+        Returns the ids that exist and were updated, or None if the write failed
+        (in which case nothing was applied).
+        """
+        conn = self.get_conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row_version = self.bump_row_version(conn)
+            updated = [u["id"] for u in updates
+                       if self._apply_update(conn, u["id"], u["status"], u.get("action") or "", notify, row_version)]
+            if updated:
+                self.bump_version(conn)
+            conn.commit()
+            return updated
+        except sqlite3.Error as e:
+            metrics.db_error("update_complaints", e)
+            log.warning("bulk update failed", extra={"rows": len(updates), "error": str(e)})
+            return None
+        finally:
+            conn.close()
+
+    def _apply_update(self, conn, complaint_id, status, action, notify, row_version):
+        """One ticket change (rollups + outbox + event) inside the caller's transaction; False if the id is unknown."""
+        old = conn.execute(
+            "SELECT substr(date_logged, 1, 10), category, priority, status, email, customer_name FROM complaints WHERE id = ?",
+            (complaint_id,)
+        ).fetchone()
+        if not old:
+            return False
+        conn.execute("UPDATE complaints SET status = ?, action = ?, row_version = ? WHERE id = ?",
+                     (status, action, row_version, complaint_id))
+        day, category, priority, old_status, email, customer_name = (v or '' for v in old)
+        rollups.record_status_change(conn, day, category, priority, old_status, status)
+        if notify and status in NOTIFY_STATUSES and email:
+            outbox.enqueue(conn, complaint_id, email, customer_name, status, action)
+        events.append(conn, "status_changed", {
+            "id": complaint_id, "status": status, "old_status": old_status, "action": action,
+            "category": category, "priority": priority,
+            "metrics": {"resolved": (status == 'Resolved') - (old_status == 'Resolved')},
+        })
+        return True
+
+    @timed_query("get_complaint")
     def get_complaint(self, complaint_id):
         """Fetches a single complaint (Used for sending emails)."""
         conn = self.get_conn()
         try:
-            cursor = conn.execute("SELECT * FROM complaints WHERE id=?", (complaint_id,))
+            cursor = conn.execute(f"SELECT {', '.join(TABLE_COLUMNS)} FROM complaints WHERE id=?", (complaint_id,))
             row = cursor.fetchone()
             if row:
                 # Convert tuple to dict
@@ -150,6 +589,7 @@ class DataHandler:
 
     # --- SETTINGS & AUTH ---
         
+    @timed_query("get_keywords")
     def get_keywords(self):
         conn = self.get_conn()
         cursor = conn.execute("SELECT category, word FROM keywords")
@@ -160,19 +600,124 @@ class DataHandler:
         conn.close()
         return kb
 
+    @timed_query("add_keyword")
+    @writes
     def add_keyword(self, category, word):
         conn = self.get_conn()
         try:
             conn.execute("INSERT INTO keywords (category, word) VALUES (?, ?)", (category, word.lower()))
+            self.bump_version(conn, "keywords_version")
             conn.commit()
             return True
         except: return False
         finally: conn.close()
     
-    def create_user(self, email, password, full_name):
+    # --- TRIAGE RULES ---
+
+    @timed_query("get_rules")
+    def get_rules(self):
+        """(rules_version, {"urgency": [...], "priority": [...]}) in evaluation order."""
+        conn = self.get_conn()
+        try:
+            version = conn.execute("SELECT value FROM meta WHERE key = 'rules_version'").fetchone()
+            rows = conn.execute("SELECT kind, name, conditions, outcome FROM rules ORDER BY kind, position").fetchall()
+        finally:
+            conn.close()
+        rule_set = {kind: [] for kind in rules.KINDS}
+        for kind, name, conditions, outcome in rows:
+            rule_set.setdefault(kind, []).append({"name": name, "when": json.loads(conditions), "then": json.loads(outcome)})
+        return (version[0] if version else 0), rule_set
+
+    @timed_query("replace_rules")
+    @writes
+    def replace_rules(self, kind, rule_list):
+        """Replaces one kind's rules and bumps rules_version; raises ValueError if they are malformed."""
+        rules.validate(kind, rule_list)
+        conn = self.get_conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM rules WHERE kind = ?", (kind,))
+            self._insert_rules(conn, kind, rule_list)
+            self.bump_version(conn, "rules_version")
+            conn.commit()
+        finally:
+            conn.close()
+        return self.get_version("rules_version")
+
+    @staticmethod
+    def _insert_rules(conn, kind, rule_list):
+        conn.executemany("INSERT INTO rules (kind, position, name, conditions, outcome) VALUES (?, ?, ?, ?, ?)", [
+            (kind, position, rule.get("name", ""), json.dumps(rule.get("when", {})), json.dumps(rule["then"]))
+            for position, rule in enumerate(rule_list)
+        ])
+
+    # --- CATEGORY MODEL ---
+
+    @timed_query("get_training_examples")
+    def get_training_examples(self, limit=200000):
+        """(complaint, category) of the most recently resolved tickets."""
+        conn = self.get_conn()
+        try:
+            return conn.execute("""
+                SELECT complaint, category FROM complaints
+                WHERE status = 'Resolved' AND complaint IS NOT NULL
+                ORDER BY id DESC LIMIT ?
+            """, (limit,)).fetchall()
+        finally:
+            conn.close()
+
+    @timed_query("save_category_model")
+    @writes
+    def save_category_model(self, artifact, info, activate):
+        """Stores a trained model and returns its version; activate=True also makes it live."""
+        conn = self.get_conn()
+        try:
+            cursor = conn.execute("""
+                INSERT INTO category_models (created_at, classes, train_rows, metrics, artifact)
+                VALUES (?, ?, ?, ?, ?)
+            """, (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), json.dumps(info["classes"]),
+                  info["train_rows"], json.dumps(info), artifact))
+            version = cursor.lastrowid
+            if activate:
+                self._set_meta(conn, "category_model", version)
+            conn.commit()
+            return version
+        finally:
+            conn.close()
+
+    @timed_query("list_category_models")
+    def list_category_models(self):
+        conn = self.get_conn()
+        try:
+            rows = conn.execute("""
+                SELECT version, created_at, train_rows, metrics FROM category_models ORDER BY version DESC
+            """).fetchall()
+        finally:
+            conn.close()
+        return [{"version": v, "created_at": c, "train_rows": n, **json.loads(m)} for v, c, n, m in rows]
+
+    @timed_query("activate_category_model")
+    @writes
+    def activate_category_model(self, version):
+        """Makes a stored version live (0 = keywords only); False if the version does not exist."""
+        conn = self.get_conn()
+        try:
+            if version and not conn.execute("SELECT 1 FROM category_models WHERE version = ?", (version,)).fetchone():
+                return False
+            self._set_meta(conn, "category_model", version)
+            conn.commit()
+            return True
+        finally:
+            conn.close()
+
+    # bcrypt is slow, so the API hashes/checks on the auth pool (executors.run_auth)
+    # and only the SQL below runs on the DB pool.
+
+    @timed_query("insert_user")
+    @writes
+    def insert_user(self, email, hashed, full_name):
         conn = self.get_conn()
         try:
-            hashed = bcrypt.hashpw(password.encode(), bcrypt.gensalt())
             conn.execute("INSERT INTO users (email, password, full_name) VALUES (?, ?, ?)", 
                          (email, hashed, full_name))
             conn.commit()
@@ -180,10 +725,19 @@ class DataHandler:
         except: return False
         finally: conn.close()
 
-    def authenticate_user(self, email, password):
+    @timed_query("get_user")
+    def get_user(self, email):
+        """The stored password hash and name for an email, or None."""
         conn = self.get_conn()
         row = conn.execute("SELECT password, full_name FROM users WHERE email=?", (email,)).fetchone()
         conn.close()
-        if row and bcrypt.checkpw(password.encode(), row[0]):
-            return {"email": email, "name": row[1]}
-        return None
\ No newline at end of file
+        return {"email": email, "password": row[0], "name": row[1]} if row else None
+
+    def create_user(self, email, password, full_name):
+        return self.insert_user(email, auth.hash_password(password), full_name)
+
+    def authenticate_user(self, email, password):
+        user = self.get_user(email)
+        if user and auth.check_password(password, user["password"]):
+            return {"email": email, "name": user["name"]}
+        return None
@@ -0,0 +1,210 @@
+"""
+Live change feed served as Server-Sent Events (GET /events).
+
+Writes append to `event_log` in the same transaction as the change itself
+(DataHandler.save_results / _apply_update), so an event exists exactly when
+its change committed. One EventBroker per process tails that table and fans
+new rows out to every subscriber: the DB is read once per poll no matter how
+many clients are connected, and each event is encoded to an SSE frame once
+and shared, so an idle subscriber costs one parked coroutine and a queue.
+Because the broker reads the table rather than in-process state, subscribers
+on any worker see writes made by every worker.
+
+Event types (`data` is JSON):
+* complaints_added - {count, first_id, last_id, items: [...] (only for small
+                     uploads), metrics: {total, critical, resolved}}
+* status_changed   - {id, status, old_status, action, category, priority,
+                     metrics: {resolved}}
+* reset            - the client missed events (fell behind or reconnected too
+                     late); refetch instead of applying deltas
+
+`metrics` holds deltas for the /dashboard-stats counters. Clients reconnect
+with a Last-Event-ID header (or ?last_event_id=) and get missed events replayed.
+"""
+import asyncio
+import json
+import os
+import time
+
+from app import metrics
+from app.executors import run_db, run_write
+from app.logs import get_logger
+
+log = get_logger(__name__)
+
+EVENT_POLL_SECONDS = float(os.getenv("EVENT_POLL_SECONDS", "0.5"))
+EVENT_HEARTBEAT_SECONDS = float(os.getenv("EVENT_HEARTBEAT_SECONDS", "15"))
+# Buffered frames per subscriber; a client that falls further behind gets a reset
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "256"))
+# Rows kept in event_log for Last-Event-ID replay
+EVENT_LOG_KEEP = int(os.getenv("EVENT_LOG_KEEP", "10000"))
+# Uploads up to this size carry their rows in the event; bigger ones only counts
+EVENT_MAX_ITEMS = int(os.getenv("EVENT_MAX_ITEMS", "200"))
+EVENT_PRUNE_SECONDS = 60
+# Fields of an inserted complaint carried in complaints_added
+ITEM_FIELDS = ("id", "customer_name", "category", "priority", "sentiment", "status", "date_logged")
+
+RESET_FRAME = b"event: reset\ndata: {}\n\n"
+KEEPALIVE_FRAME = b": keepalive\n\n"
+
+
+def create_event_table(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS event_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        type TEXT,
+        payload TEXT,
+        created_at REAL
+    )
+    """)
+
+
+def append(conn, type, payload):
+    """Records an event inside the caller's transaction."""
+    conn.execute("INSERT INTO event_log (type, payload, created_at) VALUES (?, ?, ?)",
+                 (type, json.dumps(payload, separators=(",", ":"), default=str), time.time()))
+
+
+def read_since(db, after_id, limit=1000):
+    """[(id, type, payload)] newer than after_id, oldest first."""
+    conn = db.get_conn()
+    try:
+        return conn.execute("SELECT id, type, payload FROM event_log WHERE id > ? ORDER BY id LIMIT ?",
+                            (after_id, limit)).fetchall()
+    finally:
+        conn.close()
+
+
+def id_range(db):
+    """(oldest, newest) event ids still in the log; (0, 0) when it is empty."""
+    conn = db.get_conn()
+    try:
+        oldest, newest = conn.execute("SELECT min(id), max(id) FROM event_log").fetchone()
+        return oldest or 0, newest or 0
+    finally:
+        conn.close()
+
+
+def prune(db, keep=EVENT_LOG_KEEP):
+    with db.writer.hold():
+        conn = db.get_conn()
+        try:
+            conn.execute("DELETE FROM event_log WHERE id <= (SELECT max(id) FROM event_log) - ?", (keep,))
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def frame(event_id, type, payload):
+    return f"id: {event_id}\nevent: {type}\ndata: {payload}\n\n".encode()
+
+
+class Subscriber:
+    def __init__(self, after_id):
+        self.after_id = after_id
+        self.queue = asyncio.Queue(EVENT_QUEUE_SIZE)
+
+    def put(self, data):
+        """Non-blocking; on overflow the backlog is replaced by a single reset."""
+        try:
+            self.queue.put_nowait(data)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESET_FRAME)
+            metrics.EVENTS.inc(event="sse_reset", result="overflow")
+
+
+class EventBroker:
+    """Tails event_log and fans each new event out to the subscribers of this process."""
+
+    def __init__(self, db, poll_seconds=EVENT_POLL_SECONDS):
+        self.db = db
+        self.poll_seconds = poll_seconds
+        self.subscribers = set()
+        self.last_id = 0
+        self.wake = None
+        self.task = None
+
+    async def start(self):
+        self.wake = asyncio.Event()
+        self.last_id = (await run_db(id_range, self.db))[1]
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+    def notify(self):
+        """Polls now instead of at the next tick (called after writes in this process)."""
+        if self.wake:
+            self.wake.set()
+
+    async def _run(self):
+        last_prune = time.monotonic()
+        while True:
+            try:
+                await asyncio.wait_for(self.wake.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self.wake.clear()
+            try:
+                await self._poll()
+                if time.monotonic() - last_prune > EVENT_PRUNE_SECONDS:
+                    last_prune = time.monotonic()
+                    await run_write(prune, self.db)
+            except Exception:
+                log.exception("event broker poll failed")
+
+    async def _poll(self):
+        while True:
+            rows = await run_db(read_since, self.db, self.last_id)
+            for event_id, type, payload in rows:
+                data = frame(event_id, type, payload)
+                for sub in self.subscribers:
+                    sub.put(data)
+                self.last_id = event_id
+            if rows:
+                metrics.EVENTS.inc(len(rows), event="sse_published", result="ok")
+            if len(rows) < 1000:
+                return
+
+    async def stream(self, last_event_id=None):
+        """Async generator of SSE frames for one client: replay (if resuming), then live events."""
+        sub = Subscriber(self.last_id)
+        self.subscribers.add(sub)
+        metrics.SSE_SUBSCRIBERS.inc()
+        try:
+            yield b"retry: 3000\n\n"
+            if last_event_id is not None and last_event_id < sub.after_id:
+                async for data in self._replay(last_event_id, sub.after_id):
+                    yield data
+            while True:
+                try:
+                    yield await asyncio.wait_for(sub.queue.get(), EVENT_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield KEEPALIVE_FRAME
+        finally:
+            self.subscribers.discard(sub)
+            metrics.SSE_SUBSCRIBERS.dec()
+
+    async def _replay(self, after_id, upto_id):
+        """Events in (after_id, upto_id]; live delivery takes over after upto_id."""
+        oldest, _ = await run_db(id_range, self.db)
+        if oldest and after_id < oldest - 1:
+            metrics.EVENTS.inc(event="sse_reset", result="expired")
+            yield RESET_FRAME
+            return
+        while after_id < upto_id:
+            rows = await run_db(read_since, self.db, after_id)
+            for event_id, type, payload in rows:
+                if event_id > upto_id:
+                    return
+                yield frame(event_id, type, payload)
+                after_id = event_id
+            if not rows:
+                return
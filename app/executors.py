@@ -0,0 +1,133 @@
+"""
+Concurrency model for the API.
+
+The event loop never runs blocking work itself. Endpoints hand it to one of
+a few bounded pools:
+
+* DB pool  (DB_POOL_SIZE threads)   - SQLite reads and light pandas work on their
+                                      results. Each thread keeps its own
+                                      connection (see DataHandler.get_conn).
+* Write pool (1 thread)             - SQLite writes. SQLite has a single writer,
+                                      so one writer thread per process (plus the
+                                      cross-process DataHandler.writer lock) is a
+                                      queue in front of it; reads never wait
+                                      behind a blocked writer for a DB thread.
+* CPU pool (ANALYZE_WORKERS processes) - CSV parsing + NLP analysis of uploads.
+                                      Separate processes, so a large upload
+                                      cannot hold the GIL against API threads.
+                                      ANALYZE_WORKERS=0 runs it on a thread instead.
+
+* Auth pool (AUTH_POOL_SIZE threads) - bcrypt hashing/checking only. A login
+                                      storm queues here (at most AUTH_MAX_QUEUE
+                                      waiting, then 503) instead of taking DB threads.
+
+Report rendering keeps its own pool (REPORT_WORKERS, see report_jobs).
+Thread pools publish queue depth, busy workers, wait and run time per pool
+on /metrics (complaintiq_pool_*).
+"""
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from app import metrics, profiling
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))
+ANALYZE_WORKERS = int(os.getenv("ANALYZE_WORKERS", "2"))
+# "spawn" avoids forking a process that already runs threads
+ANALYZE_START_METHOD = os.getenv("ANALYZE_START_METHOD", "spawn")
+
+AUTH_POOL_SIZE = int(os.getenv("AUTH_POOL_SIZE", "2"))
+AUTH_MAX_QUEUE = int(os.getenv("AUTH_MAX_QUEUE", "64"))
+
+db_executor = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="db")
+write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="write")
+auth_executor = ThreadPoolExecutor(max_workers=AUTH_POOL_SIZE, thread_name_prefix="auth")
+
+
+class PoolBusy(Exception):
+    """Raised instead of queueing when a pool's backlog is full."""
+
+_cpu_executor = None
+_cpu_lock = threading.Lock()
+
+
+def get_cpu_executor():
+    """The analysis pool, created on first use."""
+    global _cpu_executor
+    with _cpu_lock:
+        if _cpu_executor is None:
+            if ANALYZE_WORKERS > 0:
+                _cpu_executor = ProcessPoolExecutor(
+                    max_workers=ANALYZE_WORKERS,
+                    mp_context=multiprocessing.get_context(ANALYZE_START_METHOD),
+                )
+            else:
+                _cpu_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="analyze")
+        return _cpu_executor
+
+
+def _instrumented(pool, fn):
+    """Wraps fn so the pool's queue/busy gauges and wait/run histograms track it."""
+    queued_at = time.perf_counter()
+    metrics.POOL_QUEUED.inc(pool=pool)
+
+    def run():
+        started = time.perf_counter()
+        metrics.POOL_QUEUED.dec(pool=pool)
+        metrics.POOL_BUSY.inc(pool=pool)
+        metrics.POOL_WAIT_SECONDS.observe(started - queued_at, pool=pool)
+        try:
+            return fn()
+        finally:
+            metrics.POOL_BUSY.dec(pool=pool)
+            metrics.POOL_RUN_SECONDS.observe(time.perf_counter() - started, pool=pool)
+    return run
+
+
+async def run_db(fn, *args, **kwargs):
+    """Runs a blocking DB call on the DB pool (profiled if the request is)."""
+    loop = asyncio.get_running_loop()
+    call = profiling.wrap(functools.partial(fn, *args, **kwargs))
+    return await loop.run_in_executor(db_executor, _instrumented("db", call))
+
+
+async def run_write(fn, *args, **kwargs):
+    """Runs a DB write on this process's single writer thread (profiled if the request is)."""
+    loop = asyncio.get_running_loop()
+    call = profiling.wrap(functools.partial(fn, *args, **kwargs))
+    return await loop.run_in_executor(write_executor, _instrumented("write", call))
+
+
+async def run_auth(fn, *args):
+    """Runs a password hash/check on the auth pool; raises PoolBusy if too many are waiting."""
+    if metrics.POOL_QUEUED.get(pool="auth") >= AUTH_MAX_QUEUE:
+        metrics.EVENTS.inc(event="auth_pool", result="rejected")
+        raise PoolBusy("auth")
+    loop = asyncio.get_running_loop()
+    call = profiling.wrap(functools.partial(fn, *args))
+    return await loop.run_in_executor(auth_executor, _instrumented("auth", call))
+
+
+async def run_cpu(fn, *args):
+    """Runs a picklable, CPU-heavy function on the analysis pool (profiled if the request is)."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_cpu_executor(), profiling.wrap(fn), *args)
+
+
+def warm_up(fn, *args):
+    """Starts every analysis worker ahead of the first upload by running fn(*args) on each."""
+    executor = get_cpu_executor()
+    return [executor.submit(fn, *args) for _ in range(max(ANALYZE_WORKERS, 1))]
+
+
+def shutdown():
+    db_executor.shutdown(wait=False, cancel_futures=True)
+    write_executor.shutdown(wait=True)
+    auth_executor.shutdown(wait=False, cancel_futures=True)
+    if _cpu_executor is not None:
+        # Wait for worker processes to exit so none outlive the server
+        _cpu_executor.shutdown(wait=True, cancel_futures=True)
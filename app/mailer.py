@@ -1,45 +1,49 @@
 import smtplib
 import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from string import Template
 from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from dotenv import load_dotenv
+from app import metrics
+from app.logs import get_logger
+
+log = get_logger(__name__)
 
 # --- CONFIGURATION ---
-# Load environment variables from the .env file
-load_dotenv()
+# Load environment variables from the .env file (app.main already has; python-dotenv is optional)
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
 
 # Securely fetch credentials
 SENDER_EMAIL = os.getenv("GMAIL_USER")
 SENDER_PASSWORD = os.getenv("GMAIL_PASSWORD")
-SMTP_SERVER = "smtp.gmail.com"
-SMTP_PORT = 587
-
-def send_resolution_email(to_email, customer_name, complaint_id, status, action_note):
-    """
-    Sends a formatted email to the customer when their ticket is updated.
-    """
-    
-    # Safety Check: Ensure credentials exist before trying to send
-    if not SENDER_EMAIL or not SENDER_PASSWORD:
-        print("❌ Error: Email credentials not found. Make sure you have a .env file.")
-        return False
+SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") == "1"   # set to 0 for a local SMTP stand-in
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
 
-    try:
-        # 1. Setup the Email
-        msg = MIMEMultipart()
-        msg['From'] = SENDER_EMAIL
-        msg['To'] = to_email
-        msg['Subject'] = f"Update on Complaint #{complaint_id}: {status}"
+# Connection reuse: sessions stay logged in between sends and are dropped
+# after SMTP_IDLE_SECONDS without traffic (servers close idle connections anyway)
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "1"))
+SMTP_IDLE_SECONDS = float(os.getenv("SMTP_IDLE_SECONDS", "60"))
+# Max messages per second across all sessions (0 = unlimited)
+MAIL_RATE_LIMIT = float(os.getenv("MAIL_RATE_LIMIT", "0"))
 
-        # 2. Create the Email Body
-        body = f"""
-        Dear {customer_name},
+# --- TEMPLATES (compiled once at import) ---
+SUBJECT_TEMPLATE = Template("Update on Complaint #$complaint_id: $status")
+BODY_TEMPLATE = Template("""
+        Dear $customer_name,
 
-        Your complaint (Ticket #{complaint_id}) has been updated.
+        Your complaint (Ticket #$complaint_id) has been updated.
 
         --------------------------------------------------
-        Current Status: {status}
-        Agent Note: {action_note}
+        Current Status: $status
+        Agent Note: $action_note
         --------------------------------------------------
 
         If your issue is marked as 'Resolved', no further action is needed.
@@ -47,21 +51,197 @@ def send_resolution_email(to_email, customer_name, complaint_id, status, action_
 
         Best regards,
         Bank Support Team
-        """
-        
-        msg.attach(MIMEText(body, 'plain'))
-
-        # 3. Connect to Server and Send
-        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-        server.starttls()  # Secure the connection
-        server.login(SENDER_EMAIL, SENDER_PASSWORD)
-        text = msg.as_string()
-        server.sendmail(SENDER_EMAIL, to_email, text)
-        server.quit()
-        
-        print(f"✅ Email sent successfully to {to_email}")
-        return True
+        """)
+
+
+def build_message(to_email, customer_name, complaint_id, status, action_note, sender=None):
+    """Renders the resolution email from the precompiled templates."""
+    fields = {
+        "customer_name": customer_name,
+        "complaint_id": complaint_id,
+        "status": status,
+        "action_note": action_note,
+    }
+    msg = MIMEText(BODY_TEMPLATE.safe_substitute(fields), 'plain')
+    msg['From'] = sender or SENDER_EMAIL
+    msg['To'] = to_email
+    msg['Subject'] = SUBJECT_TEMPLATE.safe_substitute(fields)
+    return msg
+
+
+class RateLimiter:
+    """Token bucket shared by every session; rate <= 0 disables limiting."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class SMTPUnavailable(Exception):
+    """Connecting or logging in to the SMTP server failed."""
+
+
+class SMTPSession:
+    """One authenticated SMTP connection, opened lazily and reused across sends."""
+
+    def __init__(self, host=None, port=None, user=None, password=None, starttls=None, rate_limiter=None):
+        self.host = host or SMTP_SERVER
+        self.port = port or SMTP_PORT
+        self.user = user if user is not None else SENDER_EMAIL
+        self.password = password if password is not None else SENDER_PASSWORD
+        self.starttls = SMTP_STARTTLS if starttls is None else starttls
+        self.rate_limiter = rate_limiter
+        self.server = None
+        self.last_used = 0.0
+
+    def connect(self):
+        self.close()
+        with metrics.timed("email_connect"):
+            server = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT)
+            if self.starttls:
+                server.starttls()  # Secure the connection
+            if self.user and self.password:
+                server.login(self.user, self.password)
+        self.server = server
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except Exception:
+                pass
+            self.server = None
+
+    def send(self, msg):
+        """Sends one message, reconnecting once if the server dropped us."""
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        if self.server is not None and time.monotonic() - self.last_used > SMTP_IDLE_SECONDS:
+            self.close()
+
+        for attempt in (1, 2):
+            if self.server is None:
+                try:
+                    self.connect()
+                except (OSError, smtplib.SMTPException) as e:
+                    raise SMTPUnavailable(str(e) or e.__class__.__name__) from e
+            try:
+                with metrics.timed("email_send", items=1):
+                    self.server.sendmail(msg['From'], [msg['To']], msg.as_string())
+                self.last_used = time.monotonic()
+                return
+            except (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError):
+                metrics.EVENTS.inc(event="smtp_reconnect", result=str(attempt))
+                # Stale connection: reconnect and retry once. Rejections (4xx/5xx)
+                # propagate; smtplib already RSETs the envelope for those.
+                self.server = None
+                if attempt == 2:
+                    raise
 
-    except Exception as e:
-        print(f"❌ Failed to send email: {e}")
-        return False
\ No newline at end of file
+    def send_batch(self, messages):
+        """Sends every message over this session; returns an error string (or None) per message."""
+        results = []
+        for n, msg in enumerate(messages):
+            try:
+                self.send(msg)
+                results.append(None)
+            except SMTPUnavailable as e:
+                # Fail the rest now: re-dialling per message (up to SMTP_TIMEOUT
+                # each) could keep the batch running past its outbox lease
+                results.extend([f"SMTP connect failed: {e}"] * (len(messages) - n))
+                break
+            except Exception as e:
+                results.append(str(e) or e.__class__.__name__)
+        return results
+
+
+class SMTPPool:
+    """Fixed set of SMTPSessions handed out one caller at a time."""
+
+    def __init__(self, size=SMTP_POOL_SIZE, rate=MAIL_RATE_LIMIT, **session_kwargs):
+        self.rate_limiter = RateLimiter(rate)
+        self.sessions = queue.Queue()
+        for _ in range(max(1, size)):
+            self.sessions.put(SMTPSession(rate_limiter=self.rate_limiter, **session_kwargs))
+
+    @contextmanager
+    def session(self):
+        s = self.sessions.get()
+        try:
+            yield s
+        finally:
+            self.sessions.put(s)
+
+    def close(self):
+        while not self.sessions.empty():
+            self.sessions.get_nowait().close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SMTPPool()
+        return _pool
+
+
+def send_resolution_batch(notifications):
+    """
+    Sends a batch of ticket-update emails over one pooled SMTP session.
+    Each notification is a dict with to_email, customer_name, complaint_id,
+    status and action_note. Returns an error string (or None) per notification.
+    """
+    if not SENDER_EMAIL or not SENDER_PASSWORD:
+        log.error("email credentials not found, check the .env file", extra={"batch": len(notifications)})
+        return ["Email credentials not configured"] * len(notifications)
+
+    messages = [
+        build_message(n["to_email"], n["customer_name"], n["complaint_id"], n["status"], n["action_note"])
+        for n in notifications
+    ]
+    with get_pool().session() as session:
+        results = session.send_batch(messages)
+
+    sent = sum(1 for r in results if r is None)
+    metrics.EVENTS.inc(sent, event="email", result="sent")
+    metrics.EVENTS.inc(len(messages) - sent, event="email", result="failed")
+    log.info("email batch sent", extra={"sent": sent, "failed": len(messages) - sent})
+    return results
+
+
+def send_resolution_email(to_email, customer_name, complaint_id, status, action_note):
+    """
+    Sends a formatted email to the customer when their ticket is updated.
+    """
+    result = send_resolution_batch([{
+        "to_email": to_email,
+        "customer_name": customer_name,
+        "complaint_id": complaint_id,
+        "status": status,
+        "action_note": action_note,
+    }])[0]
+
+    if result is None:
+        return True
+    log.warning("email failed", extra={"complaint_id": complaint_id, "error": result})
+    return False
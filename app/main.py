@@ -1,38 +1,96 @@
-from fastapi import FastAPI, UploadFile, File, Response
+from fastapi import FastAPI, UploadFile, File, Response, Header, Request
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+from contextlib import asynccontextmanager
+import asyncio
+import importlib.util
+import os
 import pandas as pd
-import io
+
+# Settings from .env apply to everything below (the mailer used to load it as a side effect of its import)
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
 from app.data_handler import DataHandler
 from app.chatbot_engine import ChatbotEngine
-from app.complaint_analyzer import ComplaintAnalyzer # <--- IMPORTED BACK
+from app import auth, events, executors, metrics, pipeline, profiling, rollups, rules
+from app.executors import run_db, run_cpu, run_auth, run_write, PoolBusy
+from app.warmup import WarmUp
+
+# Heavy optional parts (fpdf, the mailer, scipy, NLTK) are imported on first
+# use or by the background warm-up (see app/warmup.py), not here.
 
 # Optional: Report Generator
-try:
-    from app.report_generator import generate_pdf_report
-except ImportError:
-    generate_pdf_report = None
+from app.report_jobs import ReportJobManager, REPORTS_AVAILABLE, generator as report_generator
 
-try:
-    from app.mailer import send_resolution_email
-except ImportError:
-    send_resolution_email = None
+# Optional: Mailer
+MAILER_AVAILABLE = importlib.util.find_spec("app.mailer") is not None
+
+def send_resolution_batch(notifications):
+    from app import mailer
+    return mailer.send_resolution_batch(notifications)
+
+from app.outbox import OutboxWorker, outbox_stats
+
+# Trained category model (app/category_model.py); CATEGORY_MODEL=0 forces keywords only
+CATEGORY_MODEL = os.getenv("CATEGORY_MODEL", "1") == "1" and pipeline.CATEGORY_MODEL_AVAILABLE
 
-app = FastAPI()
+MAX_PAGE_SIZE = 500
+MAX_BULK_UPDATE = 500
 
 # 1. Initialize Database
-db = DataHandler()
+db = DataHandler(os.getenv("COMPLAINTIQ_DB", "complaints.db"))
+
+# 2. Analysis runs in the CPU pool; each worker keeps its own ComplaintAnalyzer
+#    synced with the DB keywords (see app/pipeline.py and app/executors.py)
+
+# 3. Background report renderer (off the request path)
+report_jobs = ReportJobManager(db) if REPORTS_AVAILABLE else None
+
+# 4. Email outbox worker (delivers notifications queued by ticket updates)
+outbox_worker = OutboxWorker(db, send_resolution_batch) if MAILER_AVAILABLE else None
 
-# 2. Initialize Custom Analyzer
-# We pass the current DB keywords to it immediately
-analyzer = ComplaintAnalyzer(keywords_dict=db.get_keywords())
+# 5. Live feed: tails the event log and pushes it to /events subscribers
+event_broker = events.EventBroker(db)
 
+# 6. Background warm-up; GET /ready answers 503 until the required parts are loaded
+warmup = WarmUp()
+warmup.add("analyzer", lambda: [f.result() for f in executors.warm_up(pipeline.warm)])
+warmup.add("snapshot", db.snapshot.get, required=False)
+if report_jobs: warmup.add("reports", report_generator, required=False)
+if outbox_worker: warmup.add("mailer", lambda: importlib.import_module("app.mailer"), required=False)
+
+@asynccontextmanager
+async def lifespan(app):
+    if outbox_worker and os.getenv("OUTBOX_WORKER", "1") == "1": outbox_worker.start()
+    warmup.start()
+    await event_broker.start()
+    yield
+    await event_broker.stop()
+    if outbox_worker: outbox_worker.stop()
+    if report_jobs: report_jobs.shutdown()
+    executors.shutdown()
+
+app = FastAPI(lifespan=lifespan)
+
+# Verifies "Authorization: Bearer <token>" (HMAC only, no DB); enforced if REQUIRE_SESSION=1
+app.add_middleware(auth.SessionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Per-endpoint latency histograms (served at /metrics)
+app.add_middleware(metrics.MetricsMiddleware)
+# Opt-in profiling of single requests (X-Profile-Token) or a sampled fraction
+app.add_middleware(profiling.ProfilingMiddleware)
 
 # --- MODELS ---
 class UserLogin(BaseModel):
@@ -53,48 +111,48 @@ class ComplaintUpdate(BaseModel):
     status: str
     action: str
 
+class BulkUpdate(BaseModel):
+    updates: List[ComplaintUpdate]
+
+class ReportRequest(BaseModel):
+    mode: str = "detail"              # "detail" (per-ticket) or "summary" (rollups)
+    start_date: Optional[str] = None  # YYYY-MM-DD, inclusive
+    end_date: Optional[str] = None
+    category: Optional[str] = None
+    priority: Optional[str] = None
+    status: Optional[str] = None
+
 # --- ENDPOINTS ---
 
 @app.get("/")
 def home():
     return {"message": "ComplaintIQ Backend is running"}
 
+@app.get("/ready")
+def ready():
+    """Readiness: 200 once the warm-up has loaded the required components, else 503 (with per-component state)."""
+    return JSONResponse(status_code=200 if warmup.ready() else 503, content=warmup.status())
+
 @app.post("/analyze")
 async def analyze_complaints(file: UploadFile = File(...)):
     # 1. Read File
-    try:
-        contents = await file.read()
-        df = pd.read_csv(io.BytesIO(contents))
-    except:
-        return {"error": "Invalid CSV file."}
+    contents = await file.read()
 
     # 2. CRITICAL: Sync Analyzer with Settings
     # This ensures new keywords from the Settings tab are used immediately
-    latest_keywords = db.get_keywords()
-    analyzer.update_keywords(latest_keywords)
+    latest_keywords, model_ref, rule_set = await run_db(_analysis_inputs)
 
-    analyzed_data = []
-    
-    # 3. Process Rows using the External Analyzer
-    for index, row in df.iterrows():
-        text = str(row.get('complaint', ''))
-        if not text or text.lower() == 'nan': continue
-        
-        # --- CALL THE CUSTOM ANALYZER ---
-        result = analyzer.analyze(text)
-        
-        # Add Customer Metadata
-        result["customer_name"] = str(row.get('Customer Name', 'Unknown'))
-        result["account_number"] = str(row.get('Account Number', 'N/A'))
-        result["email"] = str(row.get('Email', ''))
-        result["phone"] = str(row.get('Phone', ''))
-        
-        analyzed_data.append(result)
+    # 3. Parse + analyze in the CPU pool (off the event loop and the GIL)
+    analyzed_data, worker_metrics = await run_cpu(pipeline.analyze_upload, contents, latest_keywords, model_ref, rule_set)
+    metrics.REGISTRY.merge(worker_metrics)
+    if analyzed_data is None:
+        return {"error": "Invalid CSV file."}
 
     # 4. Save
     if analyzed_data:
         results_df = pd.DataFrame(analyzed_data)
-        db.save_results(results_df)
+        await run_write(db.save_results, results_df)
+        event_broker.notify()
         return {
             "message": "Success",
             "total_new_complaints": len(results_df),
@@ -103,90 +161,321 @@ async def analyze_complaints(file: UploadFile = File(...)):
     else:
         return {"error": "No valid data found."}
 
+def _analysis_inputs():
+    """Keywords, category model ref and rules for an upload.
+
+    One meta query per call; the keyword table and rules are only re-read when
+    their version counter moved (possibly bumped by another worker process).
+    """
+    versions = db.get_versions()
+    keywords = db.cached("keywords", versions.get("keywords_version", 0), db.get_keywords)
+    rule_set = db.cached("rules", versions.get("rules_version", 0), db.get_rules)
+    model_version = versions.get("category_model", 0)
+    model_ref = (db.db_name, model_version) if model_version and CATEGORY_MODEL else None
+    return keywords, model_ref, rule_set
+
+def _chat_response(query):
+    keywords = db.cached("keywords", db.get_version("keywords_version"), db.get_keywords)
+    engine = ChatbotEngine(db.snapshot.get(), keywords, db.snapshot.records)
+    with metrics.timed("chatbot_intent"):
+        return engine.respond(query)
+
 @app.post("/chat")
-def chat(query: str):
+async def chat(query: str):
     """Smart Chatbot Endpoint"""
-    current_data = db.load_data()
-    keywords = db.get_keywords() 
-    engine = ChatbotEngine(current_data, keywords)
-    
-    result = engine.respond(query)
+    result = await run_db(_chat_response, query)
     
     if isinstance(result, dict):
         return result 
     else:
         return {"response": result}
 
+@app.get("/data-version")
+async def get_data_version():
+    """Changes on every upload/update; clients use it to key their caches."""
+    return {"data_version": await run_db(db.get_version)}
+
+@app.get("/events")
+async def event_stream(last_event_id: Optional[int] = None, last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID")):
+    """Server-Sent Events feed of inserts, status changes and dashboard-stat deltas (see app/events.py)."""
+    resume = last_event_id
+    if resume is None and last_event_id_header and last_event_id_header.isdigit():
+        resume = int(last_event_id_header)
+    return StreamingResponse(event_broker.stream(resume), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.get("/dashboard-stats")
-def get_stats():
-    return db.get_metrics()
+async def get_stats():
+    return await run_db(db.get_metrics)
 
-@app.get("/all-complaints")
-def get_all():
+def _all_complaints():
     df = db.load_data()
     return [] if df.empty else df.to_dict(orient="records")
 
+@app.get("/all-complaints")
+async def get_all():
+    return await run_db(_all_complaints)
+
+@app.get("/complaints")
+async def list_complaints(page: int = 1, page_size: int = 50, status: Optional[str] = None,
+                          category: Optional[str] = None, priority: Optional[str] = None,
+                          q: Optional[str] = None):
+    """One page of tickets (newest first), filtered server-side."""
+    page, page_size = max(page, 1), min(max(page_size, 1), MAX_PAGE_SIZE)
+    filters = {k: v for k, v in {"status": status, "category": category, "priority": priority}.items() if v}
+    items, total = await run_db(db.query_complaints, filters, q, page, page_size)
+    return {"items": items, "total": total, "page": page, "page_size": page_size,
+            "pages": (total + page_size - 1) // page_size}
+
+@app.post("/complaints/bulk-update")
+async def bulk_update(req: BulkUpdate):
+    """Applies only the changed rows, in one transaction."""
+    if len(req.updates) > MAX_BULK_UPDATE:
+        return JSONResponse(status_code=400, content={"error": f"At most {MAX_BULK_UPDATE} updates per request"})
+    updated = await run_write(db.update_complaints, [u.model_dump() for u in req.updates])
+    if updated is None:
+        return {"error": "Failed to update database"}
+    if updated:
+        event_broker.notify()
+        if outbox_worker: outbox_worker.notify()
+    missing = sorted({u.id for u in req.updates} - set(updated))
+    return {"message": "Update successful", "updated": len(updated), "missing_ids": missing}
+
 @app.post("/update-complaint")
-def update_complaint_status(update_data: ComplaintUpdate):
-    """Updates status and sends email if resolved."""
+async def update_complaint_status(update_data: ComplaintUpdate):
+    """Updates status; Resolved/Escalated tickets get an email queued in the outbox."""
     
-    # 1. Update Database
-    success = db.update_complaint(
+    # Status change + outbox entry are committed together; delivery happens
+    # in the background so a slow SMTP server never blocks this request.
+    success = await run_write(
+        db.update_complaint,
         update_data.id, 
         update_data.status, 
         update_data.action
     )
     
     if success:
-        # 2. Check if we need to send email
-        # We only email if status is Resolved/Escalated AND we have the mailer module
-        if update_data.status in ["Resolved", "Escalated"] and send_resolution_email:
-            # Get customer details
-            details = db.get_complaint(update_data.id)
-            
-            if details and details.get("email"):
-                print(f"📧 Sending email to {details['email']}...")
-                try:
-                    send_resolution_email(
-                        to_email=details["email"],
-                        customer_name=details["customer_name"],
-                        complaint_id=update_data.id,
-                        status=update_data.status,
-                        action_note=update_data.action
-                    )
-                except Exception as e:
-                    print(f"⚠️ Email failed: {e}")
-        
+        event_broker.notify()
+        if outbox_worker: outbox_worker.notify()
         return {"message": "Update successful"}
     else:
         return {"error": "Failed to update database"}
 
+@app.get("/outbox-stats")
+async def get_outbox_stats():
+    """Email queue depth and delivery latency."""
+    return await run_db(outbox_stats, db)
+
 @app.get("/generate-report")
-def get_pdf_report():
-    if generate_pdf_report is None: return {"error": "Module missing."}
-    data = db.load_data()
-    if data.empty: return {"error": "No data"}
-    pdf_bytes = generate_pdf_report(data.to_dict(orient="records"))
-    return Response(content=pdf_bytes, media_type="application/pdf", headers={"Content-Disposition": "attachment; filename=complaint_report.pdf"})
+async def get_pdf_report(mode: str = "detail"):
+    if report_jobs is None: return {"error": "Module missing."}
+    if mode not in ("detail", "summary"): return {"error": "mode must be 'detail' or 'summary'"}
+    if await run_db(db.count_complaints) == 0: return {"error": "No data"}
+    # Rendered on the report pool (shared with /reports jobs, so identical
+    # requests render once), in batches straight to disk, cached per data
+    # version; FileResponse streams the file to the client in chunks.
+    job = await run_db(report_jobs.submit, {"mode": mode})
+    if job.state in ("queued", "running"): await asyncio.wrap_future(job.future)
+    if job.state != "done": return JSONResponse(status_code=500, content={"error": job.error})
+    return FileResponse(job.path, media_type="application/pdf", filename="complaint_report.pdf")
+
+@app.post("/reports")
+async def start_report(req: ReportRequest):
+    """Queues a report render; identical in-flight requests share one job."""
+    if report_jobs is None: return {"error": "Module missing."}
+    if req.mode not in ("detail", "summary"):
+        return JSONResponse(status_code=400, content={"error": "mode must be 'detail' or 'summary'"})
+    for d in (req.start_date, req.end_date):
+        if d:
+            try: datetime.strptime(d, "%Y-%m-%d")
+            except ValueError: return JSONResponse(status_code=400, content={"error": f"Invalid date '{d}', expected YYYY-MM-DD"})
+
+    params = {k: v for k, v in req.model_dump().items() if v}
+    job = await run_db(report_jobs.submit, params)
+    return JSONResponse(status_code=202, content=job.to_dict())
+
+@app.get("/reports/{job_id}")
+async def report_status(job_id: str):
+    job = report_jobs.get(job_id) if report_jobs else None
+    if job is None: return JSONResponse(status_code=404, content={"error": "Unknown report job"})
+    return job.to_dict()
+
+@app.get("/reports/{job_id}/download")
+async def download_report(job_id: str):
+    job = report_jobs.get(job_id) if report_jobs else None
+    if job is None: return JSONResponse(status_code=404, content={"error": "Unknown report job"})
+    if job.state != "done":
+        return JSONResponse(status_code=409, content={"error": f"Report is {job.state}", **job.to_dict()})
+    return FileResponse(job.path, media_type="application/pdf", filename="complaint_report.pdf")
+
+@app.get("/report-summary")
+async def get_report_summary():
+    """Executive breakdowns and trends as JSON, served from the rollup tables."""
+    return await run_db(db.get_rollup_summary)
+
+# --- ANALYTICS (chart-ready aggregates from the rollup tables) ---
+def _analytics_filters(start_date, end_date, category, priority, status):
+    """Returns (filters, error response)."""
+    for d in (start_date, end_date):
+        if d:
+            try: datetime.strptime(d, "%Y-%m-%d")
+            except ValueError: return None, JSONResponse(status_code=400, content={"error": f"Invalid date '{d}', expected YYYY-MM-DD"})
+    filters = {"start_date": start_date, "end_date": end_date, "category": category, "priority": priority, "status": status}
+    return {k: v for k, v in filters.items() if v}, None
+
+@app.get("/analytics/breakdown")
+async def analytics_breakdown(by: str = "category", start_date: Optional[str] = None, end_date: Optional[str] = None,
+                              category: Optional[str] = None, priority: Optional[str] = None, status: Optional[str] = None):
+    """Complaint counts per category, priority, status or sentiment."""
+    if by not in rollups.BREAKDOWN_DIMENSIONS:
+        return JSONResponse(status_code=400, content={"error": f"by must be one of {', '.join(rollups.BREAKDOWN_DIMENSIONS)}"})
+    filters, error = _analytics_filters(start_date, end_date, category, priority, status)
+    if error: return error
+    counts = await run_db(db.get_breakdown, by, filters)
+    return {"by": by, "filters": filters, "total": sum(counts.values()), "counts": counts}
+
+@app.get("/analytics/timeseries")
+async def analytics_timeseries(granularity: str = "day", group_by: Optional[str] = None,
+                               start_date: Optional[str] = None, end_date: Optional[str] = None,
+                               category: Optional[str] = None, priority: Optional[str] = None, status: Optional[str] = None):
+    """Complaint volume per day/week/month, optionally split by category/priority/status."""
+    if granularity not in rollups.GRANULARITIES:
+        return JSONResponse(status_code=400, content={"error": "granularity must be day, week or month"})
+    if group_by not in (None, "category", "priority", "status"):
+        return JSONResponse(status_code=400, content={"error": "group_by must be category, priority or status"})
+    filters, error = _analytics_filters(start_date, end_date, category, priority, status)
+    if error: return error
+    series = await run_db(db.get_timeseries, granularity, filters, group_by)
+    return {"granularity": granularity, "group_by": group_by, "filters": filters, "series": series}
+
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus text exposition of stage, endpoint and DB timings."""
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/profiles")
+def list_profiles(limit: int = 20, x_profile_token: Optional[str] = Header(None)):
+    """Recent request profiles (admin only)."""
+    if not profiling.check_token(x_profile_token): return Response(status_code=403)
+    return profiling.list_profiles(limit)
+
+@app.get("/profiles/{profile_id}/{kind}")
+def download_profile(profile_id: str, kind: str, x_profile_token: Optional[str] = Header(None)):
+    """A saved profile file; kind is 'pstats' or 'collapsed' (admin only)."""
+    if not profiling.check_token(x_profile_token): return Response(status_code=403)
+    path = profiling.profile_file(profile_id, kind)
+    if path is None: return JSONResponse(status_code=404, content={"error": "Unknown profile"})
+    return FileResponse(path, filename=os.path.basename(path))
 
 # --- AUTH ---
 @app.post("/login")
-def login(user: UserLogin):
-    u = db.authenticate_user(user.email, user.password)
-    return {"user": u} if u else Response(status_code=401)
+async def login(user: UserLogin):
+    """Checks the password on the auth pool and returns a signed session token."""
+    u = await run_db(db.get_user, user.email)
+    try:
+        ok = await run_auth(auth.check_password, user.password, u["password"] if u else None)
+    except PoolBusy:
+        return JSONResponse(status_code=503, content={"error": "Too many logins, retry shortly"},
+                            headers={"Retry-After": "2"})
+    if not ok:
+        return Response(status_code=401)
+    return {
+        "user": {"email": u["email"], "name": u["name"]},
+        "token": auth.issue_token(u["email"], u["name"]),
+        "expires_in": auth.SESSION_TTL_SECONDS,
+    }
 
 @app.post("/register")
-def register(user: UserRegister):
-    if db.create_user(user.email, user.password, user.full_name):
+async def register(user: UserRegister):
+    try:
+        hashed = await run_auth(auth.hash_password, user.password)
+    except PoolBusy:
+        return JSONResponse(status_code=503, content={"error": "Server busy, retry shortly"},
+                            headers={"Retry-After": "2"})
+    if await run_write(db.insert_user, user.email, hashed, user.full_name):
         return {"message": "User created"}
     return Response(status_code=400)
 
+def login_required(request):
+    """401 unless the caller has a verified session; admin endpoints check this even without REQUIRE_SESSION."""
+    if not request.scope.get("user"):
+        return JSONResponse(status_code=401, content={"error": "Login required"}, headers={"WWW-Authenticate": "Bearer"})
+
+@app.get("/session")
+def get_session(request: Request):
+    """The logged-in user, read from the bearer token (no DB or bcrypt call)."""
+    claims = request.scope.get("user")
+    if not claims: return Response(status_code=401)
+    return {"user": {"email": claims["sub"], "name": claims["name"]}, "expires_at": claims["exp"]}
+
 # --- SETTINGS ---
 @app.get("/keywords")
-def get_kw(): return db.get_keywords()
+async def get_kw(): return await run_db(db.get_keywords)
 
 @app.post("/add-keyword")
-def add_kw(k: KeywordRequest):
-    if db.add_keyword(k.category, k.word): 
+async def add_kw(k: KeywordRequest):
+    if await run_write(db.add_keyword, k.category, k.word): 
         return {"message": "Added"}
-    return {"error": "Failed"}
\ No newline at end of file
+    return {"error": "Failed"}
+
+# --- TRIAGE RULES ---
+@app.get("/rules")
+async def get_rules():
+    """The urgency and priority rules in evaluation order (see app/rules.py)."""
+    version, rule_set = await run_db(db.get_rules)
+    return {"version": version, **rule_set}
+
+@app.put("/rules/{kind}")
+async def replace_rules(kind: str, rule_list: List[dict], request: Request):
+    """Replaces one kind's rules; uploads pick them up on the next request (rules_version)."""
+    denied = login_required(request)
+    if denied: return denied
+    try:
+        version = await run_write(db.replace_rules, kind, rule_list)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    return {"version": version}
+
+@app.post("/rules/reset")
+async def reset_rules(request: Request):
+    """Restores the built-in default rules."""
+    denied = login_required(request)
+    if denied: return denied
+    for kind, rule_list in rules.DEFAULT_RULES.items():
+        version = await run_write(db.replace_rules, kind, rule_list)
+    return {"version": version}
+
+# --- CATEGORY MODEL ---
+@app.get("/category-model")
+async def get_category_model():
+    """The active model version (0 = keywords only) and every trained version with its holdout metrics."""
+    active = await run_db(db.get_version, "category_model")
+    return {"enabled": CATEGORY_MODEL, "active": active, "models": await run_db(db.list_category_models)}
+
+@app.post("/category-model/train")
+async def train_category_model(request: Request):
+    """Trains on resolved tickets + keywords in the CPU pool; activates it if the holdout accuracy is good enough."""
+    denied = login_required(request)
+    if denied: return denied
+    if not CATEGORY_MODEL:
+        return JSONResponse(status_code=400, content={"error": "Category model disabled or scipy not installed"})
+    category_model = await run_db(pipeline.category_model)   # first use imports scipy
+    examples = await run_db(db.get_training_examples, category_model.CATEGORY_MAX_TRAIN_ROWS)
+    if len(examples) < category_model.CATEGORY_MIN_TRAIN_ROWS:
+        return JSONResponse(status_code=400, content={
+            "error": f"Need at least {category_model.CATEGORY_MIN_TRAIN_ROWS} resolved tickets, have {len(examples)}"})
+    keywords = await run_db(db.get_keywords)
+    artifact, info, worker_metrics = await run_cpu(pipeline.train_category_model, examples, keywords)
+    metrics.REGISTRY.merge(worker_metrics)
+    activate = info.get("holdout_accuracy", 0) >= category_model.CATEGORY_MIN_ACCURACY
+    version = await run_write(db.save_category_model, artifact, info, activate)
+    return {"version": version, "active": activate, **info}
+
+@app.post("/category-model/activate/{version}")
+async def activate_category_model(version: int, request: Request):
+    """Switches the live model (0 = back to keywords only)."""
+    denied = login_required(request)
+    if denied: return denied
+    if not await run_write(db.activate_category_model, version):
+        return JSONResponse(status_code=404, content={"error": "Unknown model version"})
+    return {"active": version}
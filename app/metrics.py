@@ -0,0 +1,287 @@
+"""
+In-process metrics with a Prometheus text exporter (served at /metrics).
+
+Counters and histograms are plain Python objects guarded by a lock, so they
+cost about a microsecond per observation. Code that runs in the analysis
+worker processes records into that process's REGISTRY; the pipeline ships
+the recorded state back with its results (REGISTRY.drain / REGISTRY.merge).
+"""
+import bisect
+import functools
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Per-row stages (cleaning, matching, sentiment) take microseconds
+FAST_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05, 0.1)
+
+
+def _label_str(labelnames, key):
+    if not labelnames:
+        return ""
+    pairs = ",".join(f'{n}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                     for n, v in zip(labelnames, key))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self.values.get(tuple(labels.get(n, "") for n in self.labelnames), 0)
+
+    def drain(self):
+        with self.lock:
+            state, self.values = self.values, {}
+        return state
+
+    def merge(self, state):
+        with self.lock:
+            for key, value in state.items():
+                self.values[key] = self.values.get(key, 0) + value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_label_str(self.labelnames, key)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    """A value that goes up and down (queue depth, busy workers). Not shipped between processes."""
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self.lock:
+            self.values[key] = value
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def drain(self):
+        return {}
+
+    def render(self):
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.values = {}   # label key -> [per-bucket counts..., +Inf count, sum]
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[i] += 1
+            state[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        state = self.values.get(tuple(labels.get(n, "") for n in self.labelnames))
+        return sum(state[:-1]) if state else 0
+
+    def drain(self):
+        with self.lock:
+            state, self.values = self.values, {}
+        return state
+
+    def merge(self, state):
+        with self.lock:
+            for key, other in state.items():
+                mine = self.values.get(key)
+                if mine is None:
+                    self.values[key] = list(other)
+                else:
+                    for i, v in enumerate(other):
+                        mine[i] += v
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            items = sorted((k, list(v)) for k, v in self.values.items())
+        for key, state in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + ("+Inf",), state[:-1]):
+                cumulative += n
+                labels = _label_str(self.labelnames + ("le",), key + (bound,))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _label_str(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {state[-1]:.6f}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def counter(self, name, help, labelnames=()):
+        return self.metrics.setdefault(name, Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()):
+        return self.metrics.setdefault(name, Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.metrics.setdefault(name, Histogram(name, help, labelnames, buckets))
+
+    def drain(self):
+        """Takes (and resets) every metric's state, e.g. to ship it out of a worker process."""
+        return {name: m.drain() for name, m in self.metrics.items()}
+
+    def merge(self, states):
+        for name, state in (states or {}).items():
+            if name in self.metrics and state:
+                self.metrics[name].merge(state)
+
+    def render(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# --- PIPELINE STAGES ---
+STAGE_SECONDS = REGISTRY.histogram(
+    "complaintiq_stage_seconds", "Time spent per pipeline stage call", ["stage"])
+ROW_STAGE_SECONDS = REGISTRY.histogram(
+    "complaintiq_row_stage_seconds", "Per-complaint time in the analysis stages", ["stage"], FAST_BUCKETS)
+STAGE_ITEMS = REGISTRY.counter(
+    "complaintiq_stage_items_total", "Items (rows, emails, pages) processed per stage", ["stage"])
+
+# --- HTTP ---
+REQUEST_SECONDS = REGISTRY.histogram(
+    "complaintiq_http_request_seconds", "HTTP request latency", ["method", "route", "status"])
+
+# --- DATABASE ---
+DB_CONNECT_SECONDS = REGISTRY.histogram(
+    "complaintiq_db_connect_seconds", "Time to open a SQLite connection")
+DB_QUERY_SECONDS = REGISTRY.histogram(
+    "complaintiq_db_query_seconds", "DataHandler call latency", ["op"])
+DB_ERRORS = REGISTRY.counter(
+    "complaintiq_db_errors_total", "SQLite errors by operation and kind", ["op", "kind"])
+DB_WRITE_LOCK_SECONDS = REGISTRY.histogram(
+    "complaintiq_db_write_lock_seconds", "Time a write waited for the single-writer lock")
+
+# --- WORKER POOLS ---
+POOL_QUEUED = REGISTRY.gauge(
+    "complaintiq_pool_queued", "Tasks waiting for a worker", ["pool"])
+POOL_BUSY = REGISTRY.gauge(
+    "complaintiq_pool_busy", "Tasks currently running", ["pool"])
+POOL_WAIT_SECONDS = REGISTRY.histogram(
+    "complaintiq_pool_wait_seconds", "Time a task waited in the queue before a worker picked it up", ["pool"])
+POOL_RUN_SECONDS = REGISTRY.histogram(
+    "complaintiq_pool_run_seconds", "Task run time once picked up", ["pool"])
+
+# --- LIVE EVENTS ---
+SSE_SUBSCRIBERS = REGISTRY.gauge(
+    "complaintiq_sse_subscribers", "Open /events streams in this process")
+
+# --- COMPLAINT SNAPSHOT ---
+SNAPSHOT_ROWS = REGISTRY.gauge(
+    "complaintiq_snapshot_rows", "Rows in this process's in-memory complaint snapshot")
+SNAPSHOT_BYTES = REGISTRY.gauge(
+    "complaintiq_snapshot_bytes", "Memory held by the complaint snapshot frame")
+
+# --- EVERYTHING ELSE ---
+EVENTS = REGISTRY.counter(
+    "complaintiq_events_total", "Notable outcomes (cache hits, email results, ...)", ["event", "result"])
+
+
+@contextmanager
+def timed(stage, items=None):
+    """Records one call of a pipeline stage (and optionally how many items it handled)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+        if items:
+            STAGE_ITEMS.inc(items, stage=stage)
+
+
+def db_error(op, exc):
+    """Counts a SQLite failure; 'locked' covers busy-timeout expiry under write contention."""
+    msg = str(exc).lower()
+    kind = "locked" if "locked" in msg or "busy" in msg else exc.__class__.__name__
+    DB_ERRORS.inc(op=op, kind=kind)
+
+
+def timed_query(op):
+    """Decorator for DataHandler methods: latency histogram + error counter per op."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except sqlite3.Error as e:
+                db_error(op, e)
+                raise
+            finally:
+                DB_QUERY_SECONDS.observe(time.perf_counter() - start, op=op)
+        return wrapper
+    return decorator
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by method, route template and status."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            REQUEST_SECONDS.observe(time.perf_counter() - start,
+                                    method=scope["method"], route=path, status=status["code"])
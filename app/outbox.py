@@ -0,0 +1,212 @@
+"""
+Durable email outbox.
+
+Ticket updates enqueue their customer notification into `email_outbox` in the
+same transaction as the status change (see DataHandler.update_complaint), so
+the HTTP request never talks to SMTP. OutboxWorker drains the table in the
+background with retries, exponential backoff and a dead-letter state.
+
+Row lifecycle: pending -> sending -> sent
+                                  \\-> pending (retry, backed off) -> ... -> dead
+"""
+import os
+import random
+import threading
+import time
+
+from app.logs import get_logger
+
+log = get_logger(__name__)
+
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "2"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "20"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "6"))
+OUTBOX_BASE_DELAY = float(os.getenv("OUTBOX_BASE_DELAY", "5"))
+OUTBOX_MAX_DELAY = float(os.getenv("OUTBOX_MAX_DELAY", "900"))
+# A claimed row whose worker died is picked up again after this long
+OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", "120"))
+
+
+def create_outbox_table(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS email_outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        complaint_id INTEGER,
+        to_email TEXT,
+        customer_name TEXT,
+        status TEXT,
+        action_note TEXT,
+        state TEXT DEFAULT 'pending',
+        attempts INTEGER DEFAULT 0,
+        next_attempt_at REAL,
+        last_error TEXT,
+        created_at REAL,
+        sent_at REAL
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON email_outbox (state, next_attempt_at)")
+
+
+def enqueue(conn, complaint_id, to_email, customer_name, status, action_note):
+    """Adds a notification inside the caller's transaction."""
+    now = time.time()
+    conn.execute("""
+        INSERT INTO email_outbox (complaint_id, to_email, customer_name, status, action_note,
+                                  state, attempts, next_attempt_at, created_at)
+        VALUES (?, ?, ?, ?, ?, 'pending', 0, ?, ?)
+    """, (complaint_id, to_email, customer_name, status, action_note, now, now))
+
+
+def backoff_delay(attempts, base=OUTBOX_BASE_DELAY, cap=OUTBOX_MAX_DELAY):
+    """Exponential backoff with +/-20% jitter: base, 2*base, 4*base ... capped."""
+    delay = min(base * (2 ** max(attempts - 1, 0)), cap)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim_batch(db, limit=OUTBOX_BATCH_SIZE):
+    """Leases up to `limit` due messages to this worker and returns them as dicts."""
+    now = time.time()
+    with db.writer.hold():
+        conn = db.get_conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.execute("""
+                SELECT id, complaint_id, to_email, customer_name, status, action_note, attempts, created_at
+                FROM email_outbox
+                WHERE state IN ('pending', 'sending') AND next_attempt_at <= ?
+                ORDER BY next_attempt_at LIMIT ?
+            """, (now, limit))
+            cols = [description[0] for description in cursor.description]
+            rows = [dict(zip(cols, row)) for row in cursor.fetchall()]
+            conn.executemany("""
+                UPDATE email_outbox SET state = 'sending', attempts = attempts + 1, next_attempt_at = ?
+                WHERE id = ?
+            """, [(now + OUTBOX_LEASE_SECONDS, r["id"]) for r in rows])
+            conn.commit()
+            for r in rows:
+                r["attempts"] += 1
+            return rows
+        finally:
+            conn.close()
+
+
+def mark_sent(db, message_id):
+    with db.writer.hold():
+        conn = db.get_conn()
+        try:
+            conn.execute("UPDATE email_outbox SET state = 'sent', sent_at = ?, last_error = NULL WHERE id = ?",
+                         (time.time(), message_id))
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def mark_failed(db, message, error, max_attempts=OUTBOX_MAX_ATTEMPTS):
+    """Schedules a retry, or moves the message to 'dead' once attempts run out."""
+    with db.writer.hold():
+        conn = db.get_conn()
+        try:
+            if message["attempts"] >= max_attempts:
+                conn.execute("UPDATE email_outbox SET state = 'dead', last_error = ? WHERE id = ?",
+                             (error, message["id"]))
+                log.warning("outbox message dead-lettered",
+                            extra={"outbox_id": message["id"], "attempts": message["attempts"], "error": error})
+            else:
+                conn.execute("UPDATE email_outbox SET state = 'pending', next_attempt_at = ?, last_error = ? WHERE id = ?",
+                             (time.time() + backoff_delay(message["attempts"]), error, message["id"]))
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def outbox_stats(db, sample=200):
+    """Queue depth per state plus delivery latency (created -> sent) of recent sends."""
+    now = time.time()
+    conn = db.get_conn()
+    try:
+        depth = dict(conn.execute("SELECT state, count(*) FROM email_outbox GROUP BY state").fetchall())
+        oldest = conn.execute(
+            "SELECT min(created_at) FROM email_outbox WHERE state IN ('pending', 'sending')"
+        ).fetchone()[0]
+        latencies = sorted(r[0] for r in conn.execute("""
+            SELECT sent_at - created_at FROM email_outbox
+            WHERE state = 'sent' ORDER BY sent_at DESC LIMIT ?
+        """, (sample,)))
+    finally:
+        conn.close()
+
+    def pct(p):
+        return round(latencies[min(int(p * len(latencies)), len(latencies) - 1)], 3) if latencies else None
+
+    return {
+        "depth": {state: depth.get(state, 0) for state in ("pending", "sending", "sent", "dead")},
+        "oldest_pending_age_seconds": round(now - oldest, 3) if oldest else 0,
+        "delivery_latency_seconds": {
+            "sample": len(latencies),
+            "avg": round(sum(latencies) / len(latencies), 3) if latencies else None,
+            "p50": pct(0.50),
+            "p95": pct(0.95),
+            "max": round(latencies[-1], 3) if latencies else None,
+        },
+    }
+
+
+class OutboxWorker:
+    """Background thread that drains the outbox.
+
+    send_batch_fn(notifications) receives the claimed rows (dicts with
+    to_email, customer_name, complaint_id, status, action_note) and returns
+    one error string, or None on delivery, per row. An exception fails the
+    whole batch.
+    """
+
+    def __init__(self, db, send_batch_fn, poll_seconds=OUTBOX_POLL_SECONDS):
+        self.db = db
+        self.send_batch_fn = send_batch_fn
+        self.poll_seconds = poll_seconds
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._loop, name="outbox-worker", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=5):
+        self.stopping.set()
+        self.wakeup.set()
+        if self.thread:
+            self.thread.join(timeout)
+
+    def notify(self):
+        """Wakes the worker early (called right after an enqueue)."""
+        self.wakeup.set()
+
+    def _loop(self):
+        while not self.stopping.is_set():
+            try:
+                drained = self.drain_once()
+            except Exception:
+                log.exception("outbox worker error")
+                drained = 0
+            # Keep going while there is a backlog; otherwise sleep until poked or polled
+            if drained < OUTBOX_BATCH_SIZE:
+                self.wakeup.wait(self.poll_seconds)
+                self.wakeup.clear()
+
+    def drain_once(self):
+        batch = claim_batch(self.db)
+        if not batch:
+            return 0
+
+        try:
+            results = self.send_batch_fn(batch)
+        except Exception as e:
+            results = [str(e)] * len(batch)
+
+        for message, error in zip(batch, results):
+            if error is None:
+                mark_sent(self.db, message["id"])
+            else:
+                mark_failed(self.db, message, error)
+        return len(batch)
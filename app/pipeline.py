@@ -0,0 +1,115 @@
+"""
+Upload analysis pipeline: CSV bytes in, analyzed complaint records out.
+
+Runs inside the CPU pool (app.executors), usually in a separate process, so
+everything here must be importable and picklable on its own. Each worker keeps
+one ComplaintAnalyzer and only updates it when the keyword set, the active
+category model or the triage rules change.
+
+The analyzer (NLTK) and the category model (scipy) are imported on first use,
+so the API process can import this module without loading either.
+"""
+import importlib.util
+import io
+import multiprocessing
+
+import pandas as pd
+
+from app import metrics
+
+# Optional: trained category model (needs scipy)
+CATEGORY_MODEL_AVAILABLE = importlib.util.find_spec("scipy") is not None
+
+
+def category_model():
+    """app.category_model (imports scipy; check CATEGORY_MODEL_AVAILABLE first)."""
+    from app import category_model
+    return category_model
+
+
+_analyzer = None
+_analyzer_keywords = None
+
+
+def get_analyzer(keywords, model_ref=None, rule_set=None):
+    """This worker's analyzer, synced with the given keyword table, category model and rules.
+
+    model_ref is (db_name, version) of the active category model, or None for
+    keywords only; a new version is loaded from the DB once per worker.
+    rule_set is (rules_version, rules) from DataHandler.get_rules; the rules
+    are only recompiled when the version differs from the compiled one.
+    """
+    from app.complaint_analyzer import ComplaintAnalyzer
+    global _analyzer, _analyzer_keywords
+    if _analyzer is None:
+        _analyzer = ComplaintAnalyzer(keywords_dict=keywords)
+        _analyzer_keywords = keywords
+    elif keywords != _analyzer_keywords:
+        _analyzer.update_keywords(keywords)
+        _analyzer_keywords = keywords
+
+    version = model_ref[1] if model_ref and CATEGORY_MODEL_AVAILABLE else None
+    current = _analyzer.category_model.version if _analyzer.category_model else None
+    if version != current:
+        _analyzer.category_model = category_model().load(*model_ref) if version else None
+
+    if rule_set and rule_set[0] != _analyzer.rules.version:
+        _analyzer.update_rules(rule_set[1], rule_set[0])
+    return _analyzer
+
+
+def warm(keywords=None):
+    """Loads the analyzer (and its sentiment model) ahead of the first upload."""
+    get_analyzer(keywords)
+    return True
+
+
+def analyze_upload(contents, keywords, model_ref=None, rule_set=None):
+    """
+    Parses an uploaded CSV and analyzes every complaint in it (model_ref, rule_set: see get_analyzer).
+    Returns (records, metric_state): records is a list of result dicts, or
+    None if the file is not a valid CSV; metric_state is what this call
+    recorded when it ran in a worker process (merge it with
+    metrics.REGISTRY.merge), else None.
+    """
+    try:
+        with metrics.timed("csv_parse"):
+            df = pd.read_csv(io.BytesIO(contents))
+    except Exception:
+        metrics.EVENTS.inc(event="upload", result="invalid_csv")
+        return None, _worker_metrics()
+
+    analyzer = get_analyzer(keywords, model_ref, rule_set)
+    rows, texts = [], []
+
+    for index, row in df.iterrows():
+        text = str(row.get('complaint', ''))
+        if not text or text.lower() == 'nan': continue
+        rows.append(row)
+        texts.append(text)
+
+    # --- CALL THE CUSTOM ANALYZER (one batched sentiment pass) ---
+    analyzed_data = analyzer.analyze_batch(texts)
+
+    for result, row in zip(analyzed_data, rows):
+        # Add Customer Metadata
+        result["customer_name"] = str(row.get('Customer Name', 'Unknown'))
+        result["account_number"] = str(row.get('Account Number', 'N/A'))
+        result["email"] = str(row.get('Email', ''))
+        result["phone"] = str(row.get('Phone', ''))
+
+    metrics.STAGE_ITEMS.inc(len(analyzed_data), stage="analyze")
+    return analyzed_data, _worker_metrics()
+
+
+def train_category_model(examples, keywords):
+    """Trains a category model (see app/category_model.train); returns (artifact, info, metric_state)."""
+    from app.complaint_analyzer import ComplaintAnalyzer
+    with metrics.timed("category_train", items=len(examples)):
+        artifact, info = category_model().train(examples, keywords, ComplaintAnalyzer.clean_text)
+    return artifact, info, _worker_metrics()
+
+
+def _worker_metrics():
+    # In the API process the registry is already the one /metrics serves
+    return metrics.REGISTRY.drain() if multiprocessing.parent_process() else None
@@ -0,0 +1,252 @@
+"""
+Opt-in request profiling.
+
+A request is profiled when it carries the admin token (header `X-Profile-Token`
+or query parameter `profile_token`, matched against PROFILE_TOKEN), or when it
+is picked by PROFILE_SAMPLE_RATE (fraction of requests, default 0 = off).
+
+The request's blocking work runs on the DB/CPU pools (app.executors), so that
+is where it is profiled: run_db/run_cpu wrap the call in a Profiled, which runs
+cProfile plus a stack sampler on the worker thread (or process) and writes a
+part file. When the response has been sent the parts are merged into:
+
+    PROFILE_DIR/<id>.prof       pstats (python -m pstats, snakeviz, ...)
+    PROFILE_DIR/<id>.collapsed  collapsed stacks (flamegraph.pl, speedscope)
+    PROFILE_DIR/<id>.json       request metadata (listed by /profiles)
+"""
+import asyncio
+import contextvars
+import glob
+import hmac
+import json
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from urllib.parse import parse_qs
+
+from app import metrics
+from app.logs import get_logger
+
+PROFILE_DIR = os.path.abspath(os.getenv("PROFILE_DIR", "profiles"))
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")        # empty = on-demand profiling disabled
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+
+# Never profile the profiler's own endpoints, the metrics scrape or the long-lived event stream
+EXCLUDED_PATHS = ("/profiles", "/metrics", "/events")
+
+log = get_logger(__name__)
+
+_current = contextvars.ContextVar("profile_session", default=None)
+# cProfile allows one active profiler per process (enforced from Python 3.12);
+# calls profiled concurrently fall back to the stack sampler alone
+_cprofile_lock = threading.Lock()
+
+
+class Profiled:
+    """Picklable wrapper that profiles one call of fn on whatever thread/process runs it."""
+
+    def __init__(self, fn, prefix, interval=PROFILE_INTERVAL):
+        self.fn = fn
+        self.prefix = prefix
+        self.interval = interval
+
+    def __call__(self, *args, **kwargs):
+        import cProfile
+
+        base = sys._getframe()
+        stacks = Counter()
+        stop = threading.Event()
+        sampler = threading.Thread(
+            target=_sample, args=(threading.get_ident(), base, stacks, stop, self.interval), daemon=True)
+        profile = None
+
+        try:
+            sampler.start()
+            if _cprofile_lock.acquire(blocking=False):
+                profile = cProfile.Profile()
+                try:
+                    profile.enable()
+                except ValueError:      # another profiling tool is active
+                    profile = None
+                    _cprofile_lock.release()
+            return self.fn(*args, **kwargs)
+        finally:
+            if profile is not None:
+                profile.disable()
+                _cprofile_lock.release()
+            stop.set()
+            if sampler.ident is not None:
+                sampler.join()
+            part = f"{self.prefix}.{os.getpid()}.{threading.get_ident()}.{uuid.uuid4().hex[:6]}"
+            if profile is not None:
+                profile.dump_stats(part + ".prof.part")
+            with open(part + ".collapsed.part", "w") as f:
+                f.writelines(f"{stack} {n}\n" for stack, n in stacks.items())
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _sample(thread_id, base, stacks, stop, interval):
+    """Records the target thread's stack (above `base`) every `interval` seconds."""
+    while not stop.wait(interval):
+        frame = sys._current_frames().get(thread_id)
+        stack = []
+        while frame is not None and frame is not base:
+            stack.append(_frame_name(frame))
+            frame = frame.f_back
+        if stack:
+            stacks[";".join(reversed(stack))] += 1
+
+
+class ProfileSession:
+    """One profiled request: collects part files and merges them when the request ends."""
+
+    def __init__(self, method, path, query, trigger):
+        self.id = time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:8]
+        self.method = method
+        self.path = path
+        self.query = query
+        self.trigger = trigger
+        self.started = time.time()
+        self.prefix = os.path.join(PROFILE_DIR, self.id)
+
+    def finish(self, status, duration):
+        parts = sorted(glob.glob(self.prefix + ".*.prof.part"))
+        if parts:
+            stats = pstats.Stats(parts[0])
+            for part in parts[1:]:
+                stats.add(part)
+            stats.dump_stats(self.prefix + ".prof")
+
+        stacks = Counter()
+        for part in glob.glob(self.prefix + ".*.collapsed.part"):
+            with open(part) as f:
+                for line in f:
+                    stack, _, n = line.rstrip("\n").rpartition(" ")
+                    stacks[stack] += int(n)
+        with open(self.prefix + ".collapsed", "w") as f:
+            f.writelines(f"{stack} {n}\n" for stack, n in stacks.most_common())
+
+        for part in glob.glob(self.prefix + ".*.part"):
+            os.remove(part)
+
+        meta = {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "query": self.query,
+            "trigger": self.trigger,
+            "status": status,
+            "started_at": self.started,
+            "duration_ms": round(duration * 1000, 2),
+            "profiled_calls": len(parts),
+            "samples": sum(stacks.values()),
+            "files": {"pstats": self.id + ".prof" if parts else None, "collapsed": self.id + ".collapsed"},
+        }
+        with open(self.prefix + ".json", "w") as f:
+            json.dump(meta, f)
+        _prune(PROFILE_KEEP)
+        return meta
+
+
+def wrap(fn):
+    """Profiles fn if the current request is being profiled; otherwise returns it unchanged."""
+    session = _current.get()
+    return Profiled(fn, session.prefix) if session else fn
+
+
+def check_token(token):
+    return bool(PROFILE_TOKEN) and bool(token) and hmac.compare_digest(token, PROFILE_TOKEN)
+
+
+def list_profiles(limit=20):
+    """Metadata of the most recent profiles, newest first."""
+    metas = []
+    for path in sorted(glob.glob(os.path.join(PROFILE_DIR, "*.json")), reverse=True)[:limit]:
+        try:
+            with open(path) as f:
+                metas.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return metas
+
+
+def profile_file(profile_id, kind):
+    """Path of a saved profile file, or None. kind is 'pstats' or 'collapsed'."""
+    ext = {"pstats": ".prof", "collapsed": ".collapsed"}.get(kind)
+    if ext is None or os.path.basename(profile_id) != profile_id:
+        return None
+    path = os.path.join(PROFILE_DIR, profile_id + ext)
+    return path if os.path.exists(path) else None
+
+
+def _prune(keep):
+    metas = sorted(glob.glob(os.path.join(PROFILE_DIR, "*.json")), reverse=True)
+    for meta in metas[keep:]:
+        for path in glob.glob(meta[:-len(".json")] + ".*"):
+            os.remove(path)
+
+
+def _request_token(scope):
+    for name, value in scope.get("headers", []):
+        if name == b"x-profile-token":
+            return value.decode("latin-1")
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return (query.get("profile_token") or [None])[0]
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that starts a ProfileSession for requested or sampled requests."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(EXCLUDED_PATHS):
+            return await self.app(scope, receive, send)
+
+        if check_token(_request_token(scope)):
+            trigger = "requested"
+        elif PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+            trigger = "sampled"
+        else:
+            return await self.app(scope, receive, send)
+
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        # Drop the token from the saved query string
+        query = "&".join(p for p in scope.get("query_string", b"").decode("latin-1").split("&")
+                         if p and not p.startswith("profile_token="))
+        session = ProfileSession(scope["method"], scope["path"], query, trigger)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", session.id.encode())]
+            await send(message)
+
+        start = time.perf_counter()
+        token = _current.set(session)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            duration = time.perf_counter() - start
+            metrics.EVENTS.inc(event="profile", result=trigger)
+            try:
+                meta = await asyncio.get_running_loop().run_in_executor(
+                    None, session.finish, status["code"], duration)
+                log.info("request profiled", extra={"profile_id": session.id, "path": session.path,
+                                                    "trigger": trigger, "duration_ms": meta["duration_ms"]})
+            except Exception:
+                log.exception("could not save profile", extra={"profile_id": session.id})
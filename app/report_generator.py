@@ -1,7 +1,25 @@
 from fpdf import FPDF
 from datetime import datetime
+import hashlib
+import json
+import os
+import threading
+import zlib
+from app import metrics
+
+REPORT_CACHE_DIR = os.getenv("REPORT_CACHE_DIR", "report_cache")
+REPORT_CACHE_MAX = int(os.getenv("REPORT_CACHE_MAX", "20"))
+REPORT_BATCH_SIZE = int(os.getenv("REPORT_BATCH_SIZE", "2000"))
 
 class PDFReport(FPDF):
+    # --- Adjusted Column Widths (Total ~190mm) ---
+    w_id = 15
+    w_name = 35      # Reduced from 40
+    w_acc = 30       # <--- NEW COLUMN
+    w_cat = 25       # Reduced from 30
+    w_status = 20    # Reduced from 25
+    w_action = 65    # Reduced from 80 to fit page
+
     def header(self):
         # Title
         self.set_font('Arial', 'B', 16)
@@ -20,17 +38,14 @@ class PDFReport(FPDF):
         self.cell(0, 10, f'Page {self.page_no()}', 0, 0, 'C')
 
     def generate_table(self, data):
+        self.table_header()
+        self.table_rows(data)
+
+    def table_header(self):
         # Table Header
         self.set_font('Arial', 'B', 9) # Slightly smaller font for header to fit text
         self.set_fill_color(240, 240, 240) # Light Gray
-
-        # --- Adjusted Column Widths (Total ~190mm) ---
-        w_id = 15
-        w_name = 35      # Reduced from 40
-        w_acc = 30       # <--- NEW COLUMN
-        w_cat = 25       # Reduced from 30
-        w_status = 20    # Reduced from 25
-        w_action = 65    # Reduced from 80 to fit page
+        w_id, w_name, w_acc, w_cat, w_status, w_action = self.w_id, self.w_name, self.w_acc, self.w_cat, self.w_status, self.w_action
 
         self.cell(w_id, 10, 'ID', 1, 0, 'C', 1)
         self.cell(w_name, 10, 'Customer', 1, 0, 'C', 1)
@@ -39,6 +54,9 @@ class PDFReport(FPDF):
         self.cell(w_status, 10, 'Status', 1, 0, 'C', 1)
         self.cell(w_action, 10, 'Action Taken', 1, 1, 'C', 1)
 
+    def table_rows(self, data):
+        w_id, w_name, w_acc, w_cat, w_status, w_action = self.w_id, self.w_name, self.w_acc, self.w_cat, self.w_status, self.w_action
+
         # Table Rows
         self.set_font('Arial', '', 8) # Smaller font for data
         for row in data:
@@ -73,4 +91,222 @@ def generate_pdf_report(complaints_list):
     pdf.generate_table(complaints_list)
     
     # Return PDF as bytes string
-    return pdf.output(dest='S').encode('latin-1')
\ No newline at end of file
+    return pdf.output(dest='S').encode('latin-1')
+
+
+# ---------------------------------------------------------
+# STREAMING OUTPUT
+# ---------------------------------------------------------
+
+class _FileBuffer:
+    """Stands in for FPDF's in-memory string buffer and appends straight to a file."""
+
+    def __init__(self, f):
+        self.f = f
+        self.pos = 0
+
+    def __iadd__(self, s):
+        self.f.write(s.encode('latin-1'))
+        self.pos += len(s)
+        return self
+
+    def __len__(self):
+        return self.pos
+
+
+class StreamingPDFReport(PDFReport):
+    """PDFReport that writes each page to disk as soon as it is finished.
+
+    FPDF keeps every page in memory until output(); here finished pages are
+    flushed as PDF objects and dropped, so memory stays flat with row count.
+    """
+
+    def __init__(self, f):
+        super().__init__()
+        self.buffer = _FileBuffer(f)
+        self.page_objects = []
+        self._putheader()
+
+    def _endpage(self):
+        super()._endpage()
+        self._flush_page(self.page)
+
+    def _flush_page(self, n):
+        content = self.pages[n].encode('latin-1')
+        if self.compress:
+            content = zlib.compress(content)
+        self.pages[n] = ''
+
+        self._newobj()
+        self.page_objects.append(self.n)
+        self._out('<</Type /Page')
+        self._out('/Parent 1 0 R')
+        self._out('/Resources 2 0 R')
+        self._out('/Contents ' + str(self.n + 1) + ' 0 R>>')
+        self._out('endobj')
+
+        self._newobj()
+        self._out('<<' + ('/Filter /FlateDecode ' if self.compress else '') + '/Length ' + str(len(content)) + '>>')
+        self._putstream(content)
+        self._out('endobj')
+
+    def _putheader(self):
+        # Written once up front by __init__; _enddoc must not repeat it
+        if len(self.buffer) == 0:
+            super()._putheader()
+
+    def _putpages(self):
+        # Pages were already flushed by _endpage; only the page tree is left
+        self.offsets[1] = len(self.buffer)
+        self._out('1 0 obj')
+        self._out('<</Type /Pages')
+        self._out('/Kids [' + ''.join(f'{n} 0 R ' for n in self.page_objects) + ']')
+        self._out('/Count ' + str(len(self.page_objects)))
+        self._out('/MediaBox [0 0 %.2f %.2f]' % (self.fw_pt, self.fh_pt))
+        self._out('>>')
+        self._out('endobj')
+
+
+def write_pdf_report(path, batches, total, resolved, progress=None):
+    """Renders the report to `path` from an iterable of row batches.
+
+    progress(rows_done, pages) is called after every batch, if given.
+    """
+    with open(path, 'wb') as f:
+        pdf = StreamingPDFReport(f)
+        pdf.add_page()
+
+        pdf.set_font('Arial', '', 12)
+        pdf.cell(0, 10, f"Total Records: {total} | Resolved Cases: {resolved}", 0, 1, 'L')
+        pdf.ln(5)
+
+        pdf.table_header()
+        rows_done = 0
+        for batch in batches:
+            pdf.table_rows(batch)
+            rows_done += len(batch)
+            if progress:
+                progress(rows_done, pdf.page_no())
+
+        pdf.close()
+    return path
+
+
+def _summary_table(pdf, title, headers, widths, rows):
+    pdf.set_font('Arial', 'B', 11)
+    pdf.cell(0, 10, title, 0, 1, 'L')
+
+    pdf.set_font('Arial', 'B', 9)
+    pdf.set_fill_color(240, 240, 240)
+    for header, w in zip(headers, widths):
+        pdf.cell(w, 8, header, 1, 0, 'C', 1)
+    pdf.ln()
+
+    pdf.set_font('Arial', '', 8)
+    for row in rows:
+        for value, w in zip(row, widths):
+            pdf.cell(w, 7, str(value)[:30], 1)
+        pdf.ln()
+    pdf.ln(5)
+
+
+def write_summary_report(path, summary):
+    """Renders the executive summary (breakdowns + trends) from rollup data."""
+    with open(path, 'wb') as f:
+        pdf = StreamingPDFReport(f)
+        pdf.add_page()
+
+        total = summary["total"]
+        resolved = summary["by_status"].get("Resolved", 0)
+        pdf.set_font('Arial', '', 12)
+        pdf.cell(0, 10, f"Total Records: {total} | Resolved Cases: {resolved}", 0, 1, 'L')
+        pdf.ln(5)
+
+        _summary_table(pdf, "Cases by Status", ["Status", "Cases"], [60, 30],
+                       sorted(summary["by_status"].items()))
+        _summary_table(pdf, "Cases by Priority", ["Priority", "Cases"], [60, 30],
+                       summary["by_priority"].items())
+        _summary_table(pdf, "Cases by Category", ["Category", "Cases"], [60, 30],
+                       sorted(summary["by_category"].items(), key=lambda kv: -kv[1]))
+        _summary_table(pdf, "Category x Priority x Status", ["Category", "Priority", "Status", "Cases"],
+                       [50, 40, 40, 30],
+                       [(r["category"], r["priority"], r["status"], r["count"]) for r in summary["matrix"]])
+        _summary_table(pdf, "Daily Volume (last 30 days)", ["Day", "Cases"], [60, 30],
+                       [(r["day"], r["count"]) for r in summary["daily"]])
+        _summary_table(pdf, "Weekly Volume (last 12 weeks)", ["Week", "Cases"], [60, 30],
+                       [(r["week"], r["count"]) for r in summary["weekly"]])
+
+        pdf.close()
+    return path
+
+
+# ---------------------------------------------------------
+# REPORT CACHE
+# ---------------------------------------------------------
+
+def report_cache_key(data_version, params=None):
+    """Cache key for a report: data version + render parameters + report date."""
+    key = {
+        "data_version": data_version,
+        "date": datetime.now().strftime("%Y-%m-%d"),
+        "params": params or {},
+    }
+    return hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+def _prune_cache(cache_dir, keep):
+    files = [os.path.join(cache_dir, f) for f in os.listdir(cache_dir) if f.endswith('.pdf')]
+    files.sort(key=os.path.getmtime, reverse=True)
+    for stale in files[keep:]:
+        for f in (stale, os.path.splitext(stale)[0] + '.json'):   # PDF + its job state (report_jobs)
+            try:
+                os.remove(f)
+            except OSError:
+                pass
+
+
+def cached_report_path(db, params=None, cache_dir=None):
+    """Where the report for the current data version would be cached."""
+    cache_dir = cache_dir or REPORT_CACHE_DIR
+    return os.path.join(cache_dir, report_cache_key(db.get_version(), params or {}) + '.pdf')
+
+
+def get_report(db, params=None, cache_dir=None, progress=None):
+    """Returns the path of a rendered report, building it only on a cache miss.
+
+    params["mode"] selects "detail" (per-ticket table) or "summary" (rollups);
+    the remaining keys are row filters understood by DataHandler.filter_clause.
+    """
+    params = params or {}
+    cache_dir = cache_dir or REPORT_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    filters = {k: v for k, v in params.items() if k != "mode"}
+
+    path = cached_report_path(db, params, cache_dir)
+    if os.path.exists(path):
+        metrics.EVENTS.inc(event="report_cache", result="hit")
+        return path
+    metrics.EVENTS.inc(event="report_cache", result="miss")
+
+    # Render to a temp file private to this thread, then publish atomically
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with metrics.timed("report_render"):
+            if params.get("mode") == "summary":
+                write_summary_report(tmp_path, db.get_rollup_summary(filters))
+            else:
+                write_pdf_report(
+                    tmp_path,
+                    db.iter_complaints(batch_size=REPORT_BATCH_SIZE, filters=filters),
+                    total=db.count_complaints(filters=filters),
+                    resolved=0 if filters.get('status') not in (None, '', 'Resolved')
+                    else db.count_complaints(status='Resolved', filters=filters),
+                    progress=progress,
+                )
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    _prune_cache(cache_dir, REPORT_CACHE_MAX)
+    return path
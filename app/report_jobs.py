@@ -0,0 +1,168 @@
+"""
+Background report rendering.
+
+POST /reports queues a render on a small worker pool instead of building the
+PDF on the request thread. A job's id is the report cache key (data version +
+parameters + date), so identical concurrent requests collapse into one render
+and a finished job maps directly onto its cached file.
+
+Job state is also written next to the PDF (`<job_id>.json`), so with several
+API worker processes a status or download request can be answered by a
+worker other than the one that queued the render.
+"""
+import importlib.util
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+REPORT_JOBS_KEPT = int(os.getenv("REPORT_JOBS_KEPT", "100"))
+JOB_ID = re.compile(r"[0-9a-f]{40}")
+# The renderer (and fpdf) is imported on first use or by the startup warm-up
+REPORTS_AVAILABLE = importlib.util.find_spec("fpdf") is not None
+
+
+def generator():
+    from app import report_generator
+    return report_generator
+
+
+class ReportJob:
+    def __init__(self, job_id, params):
+        self.id = job_id
+        self.params = params
+        self.state = "queued"      # queued -> running -> done | failed
+        self.rows_total = None
+        self.rows_done = 0
+        self.pages = 0
+        self.path = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.future = None         # set while a render is queued/running
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "state": self.state,
+            "params": self.params,
+            "rows_done": self.rows_done,
+            "rows_total": self.rows_total,
+            "pages": self.pages,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+    @classmethod
+    def from_dict(cls, state, path):
+        job = cls(state["job_id"], state["params"])
+        for key in ("state", "rows_done", "rows_total", "pages", "error", "created_at", "finished_at"):
+            setattr(job, key, state.get(key))
+        job.path = state.get("path") or path if job.state == "done" else None
+        return job
+
+
+class ReportJobManager:
+    def __init__(self, db, max_workers=REPORT_WORKERS):
+        self.db = db
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="report")
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def submit(self, params):
+        """Queues a render for `params`, or returns the job already covering it."""
+        path = generator().cached_report_path(self.db, params)
+        job_id = os.path.splitext(os.path.basename(path))[0]
+
+        with self.lock:
+            job = self.jobs.get(job_id)
+            # Re-use anything that is still in flight or whose file is still cached
+            if job and (job.state in ("queued", "running") or (job.state == "done" and os.path.exists(job.path))):
+                return job
+
+            job = ReportJob(job_id, params)
+            job.path = path
+            if os.path.exists(path):
+                job.state, job.finished_at = "done", time.time()
+            else:
+                # Queue the render before the job becomes visible, so anyone who
+                # finds it queued or running also finds a future to wait on
+                self._publish(job)
+                job.future = self.executor.submit(self._run, job)
+            self.jobs[job_id] = job
+            self._prune()
+        return job
+
+    def get(self, job_id):
+        """The job with this id, tracked here or published by another worker process."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+        return job or self._load(job_id)
+
+    @staticmethod
+    def _sidecar(path, job_id):
+        return os.path.join(os.path.dirname(path), job_id + ".json")
+
+    def _publish(self, job):
+        """Writes the job's state next to its PDF (atomically, for other workers)."""
+        sidecar = self._sidecar(job.path, job.id)
+        try:
+            os.makedirs(os.path.dirname(sidecar) or ".", exist_ok=True)
+            tmp = f"{sidecar}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump({**job.to_dict(), "path": job.path}, f)
+            os.replace(tmp, sidecar)
+        except OSError:
+            pass
+
+    def _load(self, job_id):
+        if not JOB_ID.fullmatch(job_id):
+            return None
+        path = os.path.join(os.path.dirname(generator().cached_report_path(self.db)), job_id + ".pdf")
+        try:
+            with open(self._sidecar(path, job_id)) as f:
+                job = ReportJob.from_dict(json.load(f), path)
+            path = job.path or path
+        except (OSError, ValueError, KeyError):
+            return None
+        # A job published as done whose file has since been pruned is gone
+        if job.state == "done" and not os.path.exists(path):
+            return None
+        return job
+
+    def _run(self, job):
+        job.state = "running"
+        self._publish(job)
+        try:
+            filters = {k: v for k, v in job.params.items() if k != "mode"}
+            if job.params.get("mode") != "summary":
+                job.rows_total = self.db.count_complaints(filters=filters)
+
+            def progress(rows_done, pages):
+                job.rows_done, job.pages = rows_done, pages
+
+            job.path = generator().get_report(self.db, job.params, progress=progress)
+            job.rows_done = job.rows_total or job.rows_done
+            job.state = "done"
+        except Exception as e:
+            job.error = str(e)
+            job.state = "failed"
+        finally:
+            job.finished_at = time.time()
+            self._publish(job)
+
+    def _prune(self):
+        """Forgets the oldest finished jobs once more than REPORT_JOBS_KEPT are tracked."""
+        finished = sorted(
+            (j for j in self.jobs.values() if j.state in ("done", "failed")),
+            key=lambda j: j.finished_at or 0,
+        )
+        for job in finished[:max(0, len(self.jobs) - REPORT_JOBS_KEPT)]:
+            del self.jobs[job.id]
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,231 @@
+"""
+Incremental rollups of the complaints table.
+
+Small tables are kept in step with every insert/update, inside the same
+transaction as the write itself:
+
+* daily_rollup     - counts per (day, category, priority, status)
+* rollup_totals    - all-time counts per (category, priority, status)
+* sentiment_rollup - counts per (day, category, priority, sentiment); sentiment
+                     never changes after analysis, so only inserts touch it
+
+Their size depends on the number of days and distinct labels, never on the
+number of complaints, so summaries read from them cost the same at 1k or 10M rows.
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+
+DAILY_TREND_DAYS = 30
+WEEKLY_TREND_WEEKS = 12
+
+BREAKDOWN_DIMENSIONS = ("category", "priority", "status", "sentiment")
+# strftime patterns for the time-series buckets
+GRANULARITIES = {"day": "%Y-%m-%d", "week": "%Y-W%W", "month": "%Y-%m"}
+
+
+def create_rollup_tables(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS daily_rollup (
+        day TEXT,
+        category TEXT,
+        priority TEXT,
+        status TEXT,
+        count INTEGER DEFAULT 0,
+        PRIMARY KEY (day, category, priority, status)
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS rollup_totals (
+        category TEXT,
+        priority TEXT,
+        status TEXT,
+        count INTEGER DEFAULT 0,
+        PRIMARY KEY (category, priority, status)
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS sentiment_rollup (
+        day TEXT,
+        category TEXT,
+        priority TEXT,
+        sentiment TEXT,
+        count INTEGER DEFAULT 0,
+        PRIMARY KEY (day, category, priority, sentiment)
+    )
+    """)
+
+
+def add_counts(conn, counts):
+    """Applies {(day, category, priority, status): delta} to both rollup tables."""
+    totals = Counter()
+    for (day, category, priority, status), delta in counts.items():
+        if delta:
+            totals[(category, priority, status)] += delta
+
+    conn.executemany("""
+        INSERT INTO daily_rollup (day, category, priority, status, count) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(day, category, priority, status) DO UPDATE SET count = count + excluded.count
+    """, [(*key, delta) for key, delta in counts.items() if delta])
+    conn.executemany("""
+        INSERT INTO rollup_totals (category, priority, status, count) VALUES (?, ?, ?, ?)
+        ON CONFLICT(category, priority, status) DO UPDATE SET count = count + excluded.count
+    """, [(*key, delta) for key, delta in totals.items() if delta])
+
+
+def add_sentiment_counts(conn, counts):
+    """Applies {(day, category, priority, sentiment): delta} to sentiment_rollup."""
+    conn.executemany("""
+        INSERT INTO sentiment_rollup (day, category, priority, sentiment, count) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(day, category, priority, sentiment) DO UPDATE SET count = count + excluded.count
+    """, [(*key, delta) for key, delta in counts.items() if delta])
+
+
+def record_status_change(conn, day, category, priority, old_status, new_status):
+    """Moves one complaint from its old status bucket to the new one."""
+    if old_status == new_status:
+        return
+    add_counts(conn, {
+        (day, category, priority, old_status): -1,
+        (day, category, priority, new_status): 1,
+    })
+
+
+def rebuild_rollups(conn):
+    """Recomputes the rollup tables from scratch (used for backfill)."""
+    conn.execute("DELETE FROM daily_rollup")
+    conn.execute("DELETE FROM rollup_totals")
+    rebuild_sentiment_rollup(conn)
+    conn.execute("""
+        INSERT INTO daily_rollup (day, category, priority, status, count)
+        SELECT coalesce(substr(date_logged, 1, 10), ''), coalesce(category, ''),
+               coalesce(priority, ''), coalesce(status, ''), count(*)
+        FROM complaints GROUP BY 1, 2, 3, 4
+    """)
+    conn.execute("""
+        INSERT INTO rollup_totals (category, priority, status, count)
+        SELECT coalesce(category, ''), coalesce(priority, ''), coalesce(status, ''), count(*)
+        FROM complaints GROUP BY 1, 2, 3
+    """)
+
+
+def rebuild_sentiment_rollup(conn):
+    conn.execute("DELETE FROM sentiment_rollup")
+    conn.execute("""
+        INSERT INTO sentiment_rollup (day, category, priority, sentiment, count)
+        SELECT coalesce(substr(date_logged, 1, 10), ''), coalesce(category, ''),
+               coalesce(priority, ''), coalesce(sentiment, ''), count(*)
+        FROM complaints GROUP BY 1, 2, 3, 4
+    """)
+
+
+def _rollup_where(filters, with_days, columns=("category", "priority", "status")):
+    where, args = ["count > 0"], []
+    if with_days and filters.get("start_date"):
+        where.append("day >= ?")
+        args.append(filters["start_date"])
+    if with_days and filters.get("end_date"):
+        where.append("day <= ?")
+        args.append(filters["end_date"])
+    for col in columns:
+        if filters.get(col):
+            where.append(f"{col} = ?")
+            args.append(filters[col])
+    return " WHERE " + " AND ".join(where), args
+
+
+def rollup_summary(conn, filters=None, days=DAILY_TREND_DAYS, weeks=WEEKLY_TREND_WEEKS):
+    """Builds the executive summary (breakdowns + trends) from the rollup tables.
+
+    Accepts the same filters as DataHandler.filter_clause. Without a date range
+    the breakdowns come from rollup_totals; with one they are summed from
+    daily_rollup, which is still bounded by the number of days in the range.
+    """
+    filters = filters or {}
+    if filters.get("start_date") or filters.get("end_date"):
+        clause, args = _rollup_where(filters, with_days=True)
+        source = f"""
+            SELECT category, priority, status, sum(count) FROM daily_rollup{clause}
+            GROUP BY 1, 2, 3 ORDER BY 1, 2, 3
+        """
+    else:
+        clause, args = _rollup_where(filters, with_days=False)
+        source = f"""
+            SELECT category, priority, status, count FROM rollup_totals{clause}
+            ORDER BY category, priority, status
+        """
+    matrix = [
+        {"category": c, "priority": p, "status": s, "count": n}
+        for c, p, s, n in conn.execute(source, args)
+    ]
+
+    by_category, by_priority, by_status = Counter(), Counter(), Counter()
+    for row in matrix:
+        by_category[row["category"]] += row["count"]
+        by_priority[row["priority"]] += row["count"]
+        by_status[row["status"]] += row["count"]
+
+    # Trends end at the filter's end_date (or today) and look back a fixed window
+    end = filters.get("end_date") or datetime.now().date().isoformat()
+    end_day = datetime.strptime(end, "%Y-%m-%d").date()
+    clause, args = _rollup_where(filters, with_days=True)
+
+    daily_start = (end_day - timedelta(days=days - 1)).isoformat()
+    daily = [
+        {"day": d, "count": n}
+        for d, n in conn.execute(f"""
+            SELECT day, sum(count) FROM daily_rollup{clause} AND day >= ? AND day <= ?
+            GROUP BY day ORDER BY day
+        """, (*args, daily_start, end))
+    ]
+    weekly_start = (end_day - timedelta(weeks=weeks)).isoformat()
+    weekly = [
+        {"week": w, "count": n}
+        for w, n in conn.execute(f"""
+            SELECT strftime('%Y-W%W', day), sum(count) FROM daily_rollup{clause} AND day >= ? AND day <= ?
+            GROUP BY 1 ORDER BY 1
+        """, (*args, weekly_start, end))
+    ]
+
+    return {
+        "total": sum(by_status.values()),
+        "by_status": dict(by_status),
+        "by_category": dict(by_category),
+        "by_priority": dict(sorted(by_priority.items())),
+        "matrix": matrix,
+        "daily": daily,
+        "weekly": weekly,
+    }
+
+
+def breakdown(conn, by, filters=None):
+    """Counts per value of `by` (category/priority/status/sentiment) under the filters.
+
+    Returns None for a sentiment breakdown filtered by status: sentiment_rollup
+    has no status dimension, so the caller must count from complaints instead.
+    """
+    filters = filters or {}
+    dated = bool(filters.get("start_date") or filters.get("end_date"))
+    if by == "sentiment":
+        if filters.get("status"):
+            return None
+        clause, args = _rollup_where(filters, with_days=True, columns=("category", "priority"))
+        table = "sentiment_rollup"
+    else:
+        clause, args = _rollup_where(filters, with_days=dated)
+        table = "daily_rollup" if dated else "rollup_totals"
+    rows = conn.execute(f"SELECT {by}, sum(count) FROM {table}{clause} GROUP BY 1 ORDER BY 2 DESC", args)
+    return {value: n for value, n in rows}
+
+
+def timeseries(conn, granularity="day", filters=None, group_by=None):
+    """Complaint counts per day/week/month (optionally split by category/priority/status)."""
+    clause, args = _rollup_where(filters or {}, with_days=True)
+    period = f"strftime('{GRANULARITIES[granularity]}', day)"
+    if group_by:
+        rows = conn.execute(f"""
+            SELECT {period}, {group_by}, sum(count) FROM daily_rollup{clause}
+            GROUP BY 1, 2 ORDER BY 1, 2
+        """, args)
+        return [{"period": p, group_by: k, "count": n} for p, k, n in rows]
+    rows = conn.execute(f"SELECT {period}, sum(count) FROM daily_rollup{clause} GROUP BY 1 ORDER BY 1", args)
+    return [{"period": p, "count": n} for p, n in rows]
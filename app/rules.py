@@ -0,0 +1,194 @@
+"""
+Declarative urgency / priority rules, compiled to pandas boolean masks.
+
+Rules live in the `rules` table so operations can change triage without a
+deploy. There are two ordered lists, evaluated first-match-wins:
+
+* urgency  - decides "urgency" (then: {"urgency": ...})
+* priority - decides "priority" and "action" (then: {"priority": ..., "action": ...})
+
+A rule is {"name": ..., "when": {conditions}, "then": {outcome}}. All
+conditions of a rule must hold; a rule with no conditions matches everything.
+
+    category / sentiment / urgency   a value or a list of values
+    keywords_any                     words looked for as substrings of the cleaned text
+    min_hits                         how many distinct keywords_any words must appear (default 1)
+    score_min / score_max            bounds on the sentiment score (-1 .. 1, inclusive)
+
+`urgency` conditions are only allowed in priority rules (urgency is decided
+first). Rows no rule matches get DEFAULT_OUTCOMES. DEFAULT_RULES reproduces
+the original hard-coded chain exactly.
+
+compile_rules() turns a rule set into a CompiledRules once; evaluate() then
+builds one mask per distinct condition over the whole batch and picks the
+first matching rule per row with np.select. Single complaints use match_one(),
+which applies the same rules without building a DataFrame.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+KINDS = ("urgency", "priority")
+LIST_CONDITIONS = ("category", "sentiment", "urgency")
+CONDITIONS = LIST_CONDITIONS + ("keywords_any", "min_hits", "score_min", "score_max")
+OUTCOME_FIELDS = {"urgency": ("urgency",), "priority": ("priority", "action")}
+DEFAULT_OUTCOMES = {
+    "urgency": {"urgency": "Low"},
+    "priority": {"priority": "P4 - Low", "action": "Auto-response or FAQ handling"},
+}
+
+DEFAULT_RULES = {
+    "urgency": [
+        {"name": "urgent words", "when": {"keywords_any": ["fraud", "scam", "unauthorized", "blocked", "urgent", "hacked"]},
+         "then": {"urgency": "High"}},
+        {"name": "stalled words", "when": {"keywords_any": ["delay", "issue", "pending", "failed"]},
+         "then": {"urgency": "Medium"}},
+        {"name": "default", "when": {}, "then": {"urgency": "Low"}},
+    ],
+    "priority": [
+        {"name": "fraud", "when": {"category": "Fraud"},
+         "then": {"priority": "P1 - Critical", "action": "Immediate escalation to fraud/security team"}},
+        {"name": "high urgency", "when": {"urgency": "High"},
+         "then": {"priority": "P1 - Critical", "action": "Immediate escalation to fraud/security team"}},
+        {"name": "unhappy and stalled", "when": {"sentiment": "Negative", "urgency": "Medium"},
+         "then": {"priority": "P2 - High", "action": "Assign to senior customer support team"}},
+        {"name": "neutral", "when": {"sentiment": "Neutral"},
+         "then": {"priority": "P3 - Medium", "action": "Standard support handling"}},
+        {"name": "default", "when": {},
+         "then": {"priority": "P4 - Low", "action": "Auto-response or FAQ handling"}},
+    ],
+}
+
+
+def validate(kind, rules):
+    """Checks a rule list; raises ValueError with a readable message if it is malformed."""
+    if kind not in KINDS:
+        raise ValueError(f"Unknown rule kind '{kind}' (expected one of {', '.join(KINDS)})")
+    if not isinstance(rules, list):
+        raise ValueError("Rules must be a list")
+    for n, rule in enumerate(rules, 1):
+        if not isinstance(rule, dict) or not isinstance(rule.get("when", {}), dict):
+            raise ValueError(f"Rule {n}: expected {{name, when, then}}")
+        when, then = rule.get("when", {}), rule.get("then") or {}
+        unknown = set(when) - set(CONDITIONS)
+        if unknown:
+            raise ValueError(f"Rule {n}: unknown condition(s) {sorted(unknown)}")
+        if kind == "urgency" and "urgency" in when:
+            raise ValueError(f"Rule {n}: urgency rules cannot test urgency")
+        if "min_hits" in when and "keywords_any" not in when:
+            raise ValueError(f"Rule {n}: min_hits needs keywords_any")
+        for key in ("score_min", "score_max", "min_hits"):
+            if key in when and not isinstance(when[key], (int, float)):
+                raise ValueError(f"Rule {n}: {key} must be a number")
+        if "keywords_any" in when and not (isinstance(when["keywords_any"], list) and when["keywords_any"]):
+            raise ValueError(f"Rule {n}: keywords_any must be a non-empty list of words")
+        missing = [f for f in OUTCOME_FIELDS[kind] if not then.get(f)]
+        if missing:
+            raise ValueError(f"Rule {n}: 'then' needs {missing}")
+
+
+def _values(value):
+    return tuple(value) if isinstance(value, (list, tuple)) else (value,)
+
+
+class CompiledRules:
+    """A rule set ready to evaluate; `version` is the rules_version it was built from."""
+
+    def __init__(self, rules, version=0):
+        for kind in KINDS:
+            validate(kind, rules.get(kind, []))
+        self.version = version
+        self.rules = {kind: [self._prepare(r) for r in rules.get(kind, [])] for kind in KINDS}
+
+    @staticmethod
+    def _prepare(rule):
+        when = dict(rule.get("when", {}))
+        for key in LIST_CONDITIONS:
+            if key in when:
+                when[key] = _values(when[key])
+        if "keywords_any" in when:
+            when["keywords_any"] = tuple(w.lower() for w in when["keywords_any"])
+        return when, rule["then"]
+
+    # --- BATCH ---
+
+    def evaluate(self, cleaned, category, sentiment, score):
+        """Urgency, priority and action arrays for a batch (all inputs are equal-length sequences)."""
+        frame = pd.DataFrame({"cleaned": list(cleaned), "category": list(category),
+                              "sentiment": list(sentiment), "score": np.asarray(score, dtype=float)})
+        masks = {}
+        urgency = self._select("urgency", frame, masks)["urgency"]
+        frame["urgency"] = urgency
+        outcome = self._select("priority", frame, masks)
+        return urgency, outcome["priority"], outcome["action"]
+
+    def _select(self, kind, frame, masks):
+        conditions, outcomes = [], []
+        for when, then in self.rules[kind]:
+            conditions.append(self._mask(when, frame, masks))
+            outcomes.append(then)
+        return {field: np.select(conditions, [then[field] for then in outcomes],
+                                 default=DEFAULT_OUTCOMES[kind][field]).tolist() if conditions
+                else [DEFAULT_OUTCOMES[kind][field]] * len(frame)
+                for field in OUTCOME_FIELDS[kind]}
+
+    def _mask(self, when, frame, masks):
+        mask = np.ones(len(frame), dtype=bool)
+        for key, value in when.items():
+            if key == "min_hits":
+                continue
+            # Masks are shared between rules that test the same thing (e.g. the same word list)
+            cache_key = (key, value, when.get("min_hits", 1)) if key == "keywords_any" else (key, value)
+            if cache_key not in masks:
+                masks[cache_key] = self._condition(key, value, when, frame)
+            mask &= masks[cache_key]
+        return mask
+
+    @staticmethod
+    def _condition(key, value, when, frame):
+        if key in LIST_CONDITIONS:
+            return frame[key].isin(value).to_numpy()
+        if key == "score_min":
+            return (frame["score"] >= value).to_numpy()
+        if key == "score_max":
+            return (frame["score"] <= value).to_numpy()
+        # keywords_any
+        min_hits = when.get("min_hits", 1)
+        if min_hits <= 1:
+            pattern = "|".join(re.escape(w) for w in value)
+            return frame["cleaned"].str.contains(pattern, regex=True).to_numpy()
+        hits = sum(frame["cleaned"].str.contains(w, regex=False).to_numpy().astype(int) for w in set(value))
+        return hits >= min_hits
+
+    # --- SINGLE ROW ---
+
+    def match_one(self, cleaned, category, sentiment, score):
+        """(urgency, priority, action) for one complaint, same semantics as evaluate()."""
+        row = {"category": category, "sentiment": sentiment, "score": score}
+        row["urgency"] = self._first("urgency", cleaned, row)["urgency"]
+        outcome = self._first("priority", cleaned, row)
+        return row["urgency"], outcome["priority"], outcome["action"]
+
+    def _first(self, kind, cleaned, row):
+        for when, then in self.rules[kind]:
+            if self._test(when, cleaned, row):
+                return then
+        return DEFAULT_OUTCOMES[kind]
+
+    @staticmethod
+    def _test(when, cleaned, row):
+        for key, value in when.items():
+            if key in LIST_CONDITIONS and row[key] not in value:
+                return False
+            if key == "score_min" and not row["score"] >= value:
+                return False
+            if key == "score_max" and not row["score"] <= value:
+                return False
+            if key == "keywords_any" and sum(w in cleaned for w in set(value)) < when.get("min_hits", 1):
+                return False
+        return True
+
+
+def compile_rules(rules=None, version=0):
+    return CompiledRules(rules or DEFAULT_RULES, version)
@@ -0,0 +1,174 @@
+"""
+Sentiment backends for ComplaintAnalyzer.
+
+A backend turns a list of (already cleaned) complaint texts into labels
+("Positive" / "Neutral" / "Negative") via `classify(texts)`, or labels plus a
+score in [-1, 1] (negative to positive; used by the priority rules) via
+`classify_with_scores(texts)`:
+
+* VaderBackend       - NLTK VADER lexicon; fast, no model download (default)
+* TransformerBackend - a local HuggingFace sequence-classification model on CPU
+
+Pick one with SENTIMENT_BACKEND=vader|transformer. The transformer backend
+needs torch + transformers; if they are missing (or the model cannot be
+loaded) get_backend() logs a warning and falls back to VADER.
+
+Transformer batching: texts are tokenized once, sorted by token length and
+packed into batches of at most SENTIMENT_MAX_BATCH texts whose padded size
+fits a token budget, so short complaints are not padded to the longest one
+in the upload. The budget adapts to the measured tokens/second so each
+forward pass stays near SENTIMENT_BATCH_BUDGET_MS (the latency budget), which
+keeps a shared CPU worker responsive between batches. Results are returned
+in input order.
+
+SENTIMENT_QUANTIZE=1 applies int8 dynamic quantization to the Linear layers
+(smaller and usually ~2x faster on CPU, slightly different scores) and
+SENTIMENT_THREADS caps torch's intra-op threads, which matters when several
+CPU-pool workers each run a model.
+"""
+import os
+import time
+
+from app import metrics
+from app.logs import get_logger
+
+log = get_logger(__name__)
+
+SENTIMENT_BACKEND = os.getenv("SENTIMENT_BACKEND", "vader")
+SENTIMENT_MODEL = os.getenv("SENTIMENT_MODEL", "distilbert-base-uncased-finetuned-sst-2-english")
+SENTIMENT_MAX_BATCH = int(os.getenv("SENTIMENT_MAX_BATCH", "32"))
+SENTIMENT_BATCH_BUDGET_MS = float(os.getenv("SENTIMENT_BATCH_BUDGET_MS", "250"))
+SENTIMENT_MAX_LENGTH = int(os.getenv("SENTIMENT_MAX_LENGTH", "256"))
+SENTIMENT_QUANTIZE = os.getenv("SENTIMENT_QUANTIZE", "0") == "1"
+SENTIMENT_THREADS = int(os.getenv("SENTIMENT_THREADS", "0"))   # 0 = torch default
+# Two-class models (positive/negative) call a prediction Neutral below this confidence
+SENTIMENT_NEUTRAL_BELOW = float(os.getenv("SENTIMENT_NEUTRAL_BELOW", "0.75"))
+
+LABELS = ("Positive", "Neutral", "Negative")
+
+
+def vader_label(compound):
+    return "Positive" if compound >= 0.05 else "Negative" if compound <= -0.05 else "Neutral"
+
+
+class VaderBackend:
+    name = "vader"
+
+    def __init__(self):
+        # nltk pulls in scipy.stats (~1.5 s); only pay for it where analysis runs
+        from nltk.sentiment import SentimentIntensityAnalyzer
+        self.analyzer = SentimentIntensityAnalyzer()
+
+    def classify(self, texts):
+        return self.classify_with_scores(texts)[0]
+
+    def classify_with_scores(self, texts):
+        scores = [self.analyzer.polarity_scores(t)['compound'] for t in texts]
+        return [vader_label(score) for score in scores], scores
+
+
+class TransformerBackend:
+    name = "transformer"
+
+    def __init__(self, model=SENTIMENT_MODEL, max_batch=SENTIMENT_MAX_BATCH, budget_ms=SENTIMENT_BATCH_BUDGET_MS,
+                 quantize=SENTIMENT_QUANTIZE, threads=SENTIMENT_THREADS, max_length=SENTIMENT_MAX_LENGTH):
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+        if threads:
+            torch.set_num_threads(threads)
+        self.torch = torch
+        self.tokenizer = AutoTokenizer.from_pretrained(model)
+        self.model = AutoModelForSequenceClassification.from_pretrained(model).eval()
+        if quantize:
+            self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.max_batch = max_batch
+        self.budget = budget_ms / 1000
+        self.max_length = max_length
+        num_labels = self.model.config.num_labels
+        self.labels = [self._map_label(self.model.config.id2label[i], num_labels) for i in range(num_labels)]
+        self.binary = "Neutral" not in self.labels
+        # Padded tokens per batch; starts at one full batch of short texts, then tracks the budget
+        self.token_budget = max_batch * 32
+        self.name = f"transformer:{model}{':int8' if quantize else ''}"
+
+    # Generic LABEL_<n> names, by number of classes
+    GENERIC_LABELS = {2: ("Negative", "Positive"), 3: ("Negative", "Neutral", "Positive")}
+
+    @classmethod
+    def _map_label(cls, label, num_labels):
+        """Positive/Negative/Neutral for a model label; raises ValueError if it has no clear polarity."""
+        name = label.lower()
+        if name.startswith("pos"):
+            return "Positive"
+        if name.startswith("neg"):
+            return "Negative"
+        if name.startswith("neu"):
+            return "Neutral"
+        index = name[len("label_"):] if name.startswith("label_") else ""
+        generic = cls.GENERIC_LABELS.get(num_labels, ())
+        if index.isdigit() and int(index) < len(generic):
+            return generic[int(index)]
+        raise ValueError(f"Cannot map sentiment label {label!r} of a {num_labels}-class model")
+
+    def batches(self, lengths):
+        """Index batches over texts sorted by length, each within max_batch and the token budget."""
+        order = sorted(range(len(lengths)), key=lengths.__getitem__)
+        batch = []
+        for i in order:
+            # Sorted ascending, so the newest text sets the padded width
+            if batch and (len(batch) >= self.max_batch or (len(batch) + 1) * lengths[i] > self.token_budget):
+                yield batch
+                batch = []
+            batch.append(i)
+        if batch:
+            yield batch
+
+    def classify(self, texts):
+        return self.classify_with_scores(texts)[0]
+
+    def classify_with_scores(self, texts):
+        """Labels plus P(positive) - P(negative) per text."""
+        if not texts:
+            return [], []
+        encoded = self.tokenizer(list(texts), truncation=True, max_length=self.max_length)["input_ids"]
+        lengths = [len(ids) for ids in encoded]
+        results, scores = [None] * len(texts), [0.0] * len(texts)
+        positive = [i for i, label in enumerate(self.labels) if label == "Positive"]
+        negative = [i for i, label in enumerate(self.labels) if label == "Negative"]
+        with self.torch.inference_mode():
+            for batch in self.batches(lengths):
+                start = time.perf_counter()
+                inputs = self.tokenizer.pad({"input_ids": [encoded[i] for i in batch]}, return_tensors="pt")
+                probs = self.model(**inputs).logits.softmax(-1)
+                confidence, predicted = probs.max(-1)
+                polarity = probs[:, positive].sum(-1) - probs[:, negative].sum(-1)
+                for i, p, c, score in zip(batch, predicted.tolist(), confidence.tolist(), polarity.tolist()):
+                    label = self.labels[p]
+                    results[i] = "Neutral" if self.binary and c < SENTIMENT_NEUTRAL_BELOW else label
+                    scores[i] = score
+                elapsed = time.perf_counter() - start
+                self._adapt(len(batch) * max(lengths[i] for i in batch), elapsed)
+                metrics.STAGE_SECONDS.observe(elapsed, stage="sentiment_batch")
+                metrics.STAGE_ITEMS.inc(len(batch), stage="sentiment_batch")
+        return results, scores
+
+    def _adapt(self, tokens, elapsed):
+        """Moves the token budget toward what fits in the latency budget at the measured speed."""
+        if elapsed <= 0:
+            return
+        target = tokens / elapsed * self.budget
+        self.token_budget = max(self.max_length, int(0.7 * self.token_budget + 0.3 * target))
+
+
+def get_backend(name=None):
+    """The configured backend; falls back to VADER if the transformer cannot be loaded."""
+    name = (name or SENTIMENT_BACKEND).lower()
+    if name == "transformer":
+        try:
+            return TransformerBackend()
+        except Exception as e:
+            log.warning("transformer sentiment unavailable; using VADER", extra={"error": str(e)})
+    elif name != "vader":
+        log.warning("unknown SENTIMENT_BACKEND; using VADER", extra={"backend": name})
+    return VaderBackend()
@@ -0,0 +1,59 @@
+"""
+Multi-process serving.
+
+    python -m app.serve --workers 4 --host 0.0.0.0 --port 8000
+
+Runs the API in several uvicorn worker processes. What they share goes
+through the database:
+
+* Cache coherence - keywords, triage rules and the active category model are
+  cached per process and keyed by the meta version counters, which writers
+  bump in the same transaction as their change (DataHandler.cached).
+* Writes - each process sends writes to one writer thread (executors.run_write)
+  and the threads of all processes queue on DataHandler.writer, a file lock
+  next to the DB, so SQLite never sees two writers and "database is locked"
+  does not happen under load. Reads run in parallel in every process.
+* Sessions - tokens must verify in every worker, so a SESSION_SECRET is
+  generated for the workers if none is set (sessions end on restart).
+* Live feed and report jobs read their state from the DB / report cache, so
+  any worker can serve /events and /reports/{job_id}.
+
+With more than one worker, ANALYZE_WORKERS defaults to 1 (each worker has its
+own analysis pool).
+"""
+import argparse
+import os
+import secrets
+
+import uvicorn
+
+from app.data_handler import DataHandler
+from app.logs import get_logger
+
+log = get_logger(__name__)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the ComplaintIQ API with several worker processes")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_WORKERS", "2")))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    # Workers inherit this environment (this process serves no requests, so
+    # its own secret does not matter)
+    if args.workers > 1:
+        if not os.getenv("SESSION_SECRET"):
+            os.environ["SESSION_SECRET"] = secrets.token_hex(32)
+            log.warning("SESSION_SECRET not set; generated one shared by all workers (sessions end on restart)")
+        os.environ.setdefault("ANALYZE_WORKERS", "1")
+
+    # Create/seed the schema once, before the workers start
+    DataHandler(os.getenv("COMPLAINTIQ_DB", "complaints.db"))
+
+    uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers, log_level=args.log_level)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Compact, shared in-memory copy of the complaints table for read paths.
+
+Scanning read paths (the chatbot) used to run `SELECT * FROM complaints` per
+request, building a fresh frame with a separate Python string in every cell.
+DataHandler.snapshot keeps one frame per process instead:
+
+* low-cardinality columns (CATEGORICAL_COLUMNS) are pandas categoricals:
+  small integer codes plus one copy of each distinct value
+* near-unique short columns (STRING_COLUMNS) stay plain object columns; as
+  categoricals they would cost a codes array on top of every value
+* id is int64 and date_logged is datetime64
+* long free text (LAZY_COLUMNS) stays in SQLite; records() reads it only for
+  the rows being returned
+
+Refresh is incremental. Every write stamps the rows it touches with the next
+meta.row_version (DataHandler.bump_row_version), so get() costs one meta
+lookup when nothing changed and otherwise reads only the rows whose
+row_version moved past the snapshot's. A refresh builds a new frame and swaps
+it in; frames are never modified, so callers share one without copying (and
+must treat it as read-only).
+"""
+import json
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from app import metrics
+
+CATEGORICAL_COLUMNS = ("category", "sentiment", "urgency", "priority", "status")
+STRING_COLUMNS = ("customer_name", "account_number")
+LAZY_COLUMNS = ("complaint", "action", "email", "phone")
+SNAPSHOT_COLUMNS = CATEGORICAL_COLUMNS + STRING_COLUMNS
+# Row layout of records() (the complaints table without its bookkeeping columns)
+TABLE_COLUMNS = ("id", "complaint", "category", "sentiment", "urgency", "priority", "action", "status",
+                 "date_logged", "customer_name", "account_number", "email", "phone")
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+LOAD_CHUNK_ROWS = 200_000
+LAZY_FETCH_IDS = 50_000
+SIZE_SAMPLE_ROWS = 10_000
+
+
+def _codes_dtype(n_categories):
+    return np.int8 if n_categories < 127 else np.int16 if n_categories < 32767 else np.int32
+
+
+def _merge_categorical(old, positions, updated, appended):
+    """old with `updated` written at `positions` and `appended` added at the end."""
+    categories = old.categories
+    incoming = pd.Index(pd.unique(np.asarray([v for v in updated + appended if v is not None], dtype=object)))
+    incoming = incoming.difference(categories, sort=False)
+    if len(incoming):
+        categories = categories.append(incoming)
+    dtype = _codes_dtype(len(categories))
+    codes = np.concatenate([old.codes.astype(dtype, copy=False),
+                            categories.get_indexer(pd.Index(appended, dtype=object)).astype(dtype)])
+    if len(positions):
+        codes[positions] = categories.get_indexer(pd.Index(updated, dtype=object))
+    return pd.Categorical.from_codes(codes, dtype=pd.CategoricalDtype(categories))
+
+
+def _merge_strings(old, positions, updated, appended):
+    values = np.concatenate([old.to_numpy(dtype=object), np.asarray(appended, dtype=object)])
+    if len(positions):
+        values[positions] = np.asarray(updated, dtype=object)
+    return pd.Series(values, dtype=object, copy=False)
+
+
+def _dates(values):
+    return pd.to_datetime(pd.Index(values, dtype=object), format=DATE_FORMAT, errors="coerce").to_numpy()
+
+
+def empty_frame():
+    data = {"id": np.zeros(0, dtype=np.int64), "date_logged": np.zeros(0, dtype="datetime64[ns]")}
+    for name in CATEGORICAL_COLUMNS:
+        data[name] = pd.Categorical.from_codes(np.zeros(0, dtype=np.int8), dtype=pd.CategoricalDtype([]))
+    for name in STRING_COLUMNS:
+        data[name] = pd.Series(np.zeros(0, dtype=object), dtype=object)
+    return pd.DataFrame(data, copy=False)
+
+
+def frame_bytes(frame):
+    """Approximate deep size of a snapshot frame.
+
+    String values are sized from an evenly spaced sample: walking every one
+    would cost more than the refresh itself.
+    """
+    total = int(frame.drop(columns=list(STRING_COLUMNS)).memory_usage(deep=True).sum())
+    for name in STRING_COLUMNS:
+        values = frame[name].to_numpy()
+        sample = values[::max(1, len(values) // SIZE_SAMPLE_ROWS)]
+        total += values.nbytes + (sum(map(sys.getsizeof, sample)) * len(values) // len(sample) if len(sample) else 0)
+    return total
+
+
+def merge(frame, rows):
+    """A new frame: `frame` plus rows (id, date_logged, *SNAPSHOT_COLUMNS) sorted by id.
+
+    Ids already present replace their row; the rest are appended.
+    """
+    columns = list(zip(*rows))
+    ids = np.asarray(columns[0], dtype=np.int64)
+    old_ids = frame["id"].to_numpy()
+    positions = np.minimum(np.searchsorted(old_ids, ids), max(len(old_ids) - 1, 0))
+    exists = (old_ids[positions] == ids) if len(old_ids) else np.zeros(len(ids), dtype=bool)
+    positions, new = positions[exists], ~exists
+
+    def split(values):
+        if not len(positions):
+            return [], list(values)
+        values = list(values)
+        return [v for v, e in zip(values, exists) if e], [v for v, e in zip(values, exists) if not e]
+
+    data = {"id": np.concatenate([old_ids, ids[new]])}
+    updated, appended = split(columns[1])
+    dates = np.concatenate([frame["date_logged"].to_numpy(), _dates(appended)])
+    if len(positions):
+        dates[positions] = _dates(updated)
+    data["date_logged"] = dates
+    for name, values in zip(SNAPSHOT_COLUMNS, columns[2:]):
+        merge_column = _merge_categorical if name in CATEGORICAL_COLUMNS else _merge_strings
+        data[name] = merge_column(frame[name].array, positions, *split(values))
+
+    merged = pd.DataFrame(data, copy=False)
+    # Ids are assigned in commit order, so appends normally keep the frame sorted
+    if len(old_ids) and new.any() and ids[new].min() <= old_ids[-1]:
+        merged = merged.sort_values("id", ignore_index=True)
+    return merged
+
+
+class ComplaintSnapshot:
+    def __init__(self, db):
+        self.db = db
+        self.frame = empty_frame()
+        self.version = -1            # rows with row_version <= this are in the frame
+        self.lock = threading.Lock()
+
+    def get(self):
+        """The current snapshot (shared: do not modify it)."""
+        conn = self.db.get_conn()
+        try:
+            # One read transaction, so the counter and the rows read agree
+            conn.execute("BEGIN")
+            row = conn.execute("SELECT value FROM meta WHERE key = 'row_version'").fetchone()
+            version = row[0] if row else 0
+            if version <= self.version:
+                return self.frame
+            with self.lock:
+                if version > self.version:
+                    self._refresh(conn, version)
+            return self.frame
+        finally:
+            conn.close()
+
+    def _refresh(self, conn, version):
+        start, frame, changed = time.perf_counter(), self.frame, 0
+        # The first load reads the table in id order. Later ones read only the
+        # changed rows via the row_version index (left to itself, SQLite scans
+        # the whole table to avoid sorting) and sort them here.
+        columns = f"id, date_logged, {', '.join(SNAPSHOT_COLUMNS)}"
+        if self.version < 0:
+            cursor = conn.execute(f"SELECT {columns} FROM complaints ORDER BY id")
+        else:
+            cursor = conn.execute(f"SELECT {columns} FROM complaints INDEXED BY idx_complaints_row_version "
+                                  "WHERE row_version > ?", (self.version,))
+        while True:
+            rows = cursor.fetchmany(LOAD_CHUNK_ROWS)
+            if not rows:
+                break
+            frame = merge(frame, sorted(rows) if self.version >= 0 else rows)
+            changed += len(rows)
+        self.frame, self.version = frame, version
+        metrics.STAGE_SECONDS.observe(time.perf_counter() - start, stage="snapshot_refresh")
+        metrics.STAGE_ITEMS.inc(changed, stage="snapshot_refresh")
+        metrics.SNAPSHOT_ROWS.set(len(frame))
+        metrics.SNAPSHOT_BYTES.set(frame_bytes(frame))
+
+    def records(self, frame):
+        """Full rows (as dicts, TABLE_COLUMNS order) for a slice of the snapshot; lazy text comes from SQLite."""
+        if not len(frame):
+            return []
+        ids = frame["id"].tolist()
+        text = {}
+        conn = self.db.get_conn()
+        try:
+            for start in range(0, len(ids), LAZY_FETCH_IDS):
+                cursor = conn.execute(
+                    f"SELECT id, {', '.join(LAZY_COLUMNS)} FROM complaints "
+                    "WHERE id IN (SELECT value FROM json_each(?))", (json.dumps(ids[start:start + LAZY_FETCH_IDS]),))
+                text.update((row[0], row[1:]) for row in cursor)
+        finally:
+            conn.close()
+
+        missing = (None,) * len(LAZY_COLUMNS)
+        lazy = list(zip(*(text.get(i, missing) for i in ids)))
+        dates = frame["date_logged"]
+        values = {
+            "id": ids,
+            "date_logged": dates.dt.strftime(DATE_FORMAT).astype(object).where(dates.notna(), None).tolist(),
+            **{name: lazy[n] for n, name in enumerate(LAZY_COLUMNS)},
+            **{name: frame[name].astype(object).where(frame[name].notna(), None).tolist()
+               for name in CATEGORICAL_COLUMNS},
+            **{name: frame[name].tolist() for name in STRING_COLUMNS},
+        }
+        return [dict(zip(TABLE_COLUMNS, row)) for row in zip(*(values[c] for c in TABLE_COLUMNS))]
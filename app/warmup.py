@@ -0,0 +1,84 @@
+"""
+Background warm-up and readiness.
+
+Importing app.main only loads what routing a request needs. The heavy parts
+load on first use: the sentiment model (in each analysis worker), the
+complaint snapshot, the report renderer and the mailer. WarmUp loads them
+ahead of time on a background thread once the server is up, and GET /ready
+reports each component's state. The endpoint answers 503 until every
+*required* component is loaded, so an orchestrator can hold traffic back
+from a fresh worker without delaying its startup. A required component that
+fails (e.g. a transient download error) is retried with exponential backoff
+until it loads; optional ones are tried once.
+
+WARMUP=0 skips the warm-up; everything then loads on first use and /ready
+reports ready immediately.
+"""
+import os
+import threading
+import time
+
+from app.logs import get_logger
+
+log = get_logger(__name__)
+
+WARMUP = os.getenv("WARMUP", "1") == "1"
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "2"))
+WARMUP_RETRY_MAX_SECONDS = float(os.getenv("WARMUP_RETRY_MAX_SECONDS", "60"))
+
+
+class WarmUp:
+    def __init__(self, enabled=WARMUP):
+        self.enabled = enabled
+        self.steps = []
+        self.components = {}
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+
+    def add(self, name, fn, required=True):
+        """Registers fn() to run during warm-up; `required` components gate readiness."""
+        self.steps.append((name, fn))
+        self.components[name] = {"state": "pending" if self.enabled else "skipped", "required": required}
+
+    def start(self):
+        self.started_at = time.time()
+        if self.enabled:
+            threading.Thread(target=self._run, name="warmup", daemon=True).start()
+
+    def _run(self):
+        failed = [(name, fn) for name, fn in self.steps if not self._load(name, fn)]
+        retry = [(name, fn) for name, fn in failed if self.components[name]["required"]]
+        delay = WARMUP_RETRY_SECONDS
+        while retry:
+            time.sleep(delay)
+            retry = [(name, fn) for name, fn in retry if not self._load(name, fn)]
+            delay = min(delay * 2, WARMUP_RETRY_MAX_SECONDS)
+        log.info("warm-up finished", extra={"seconds": round(time.time() - self.started_at, 2)})
+
+    def _load(self, name, fn):
+        """Runs one step; returns whether it succeeded."""
+        attempts = self.components[name].get("attempts", 0) + 1
+        self._update(name, state="loading", attempts=attempts)
+        start = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            self._update(name, state="failed", error=str(e))
+            log.warning("warm-up failed", extra={"component": name, "attempt": attempts, "error": str(e)})
+            return False
+        self._update(name, state="ready", error=None, seconds=round(time.perf_counter() - start, 3))
+        return True
+
+    def _update(self, name, **fields):
+        with self.lock:
+            self.components[name] = {**self.components[name], **fields}
+
+    def ready(self):
+        with self.lock:
+            return all(c["state"] in ("ready", "skipped") for c in self.components.values() if c["required"])
+
+    def status(self):
+        with self.lock:
+            components = {name: dict(c) for name, c in self.components.items()}
+        return {"ready": self.ready(), "uptime_seconds": round(time.time() - self.started_at, 2),
+                "components": components}
@@ -0,0 +1,86 @@
+"""
+Category engine vs keyword matching on the synthetic corpus.
+
+Trains the hashed TF-IDF model on generated complaints labelled with their
+true topic (standing in for resolved tickets) plus the analyzer's default
+keyword table, then categorizes a separate test set both ways and reports
+complaints/second and accuracy against the true topic. The model is timed
+for the whole batch (vectorize + one sparse product), and the accuracy with
+the low-confidence keyword fallback is what an upload would actually get.
+
+    python -m benchmarks.bench_category --train 20000 --test 100000
+"""
+import argparse
+import json
+import time
+
+from benchmarks import datagen
+
+
+def best_of(fn, repeat):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def accuracy(labels, truth):
+    return round(sum(a == b for a, b in zip(labels, truth)) / len(truth), 4)
+
+
+def run(train_rows, test_rows, seed, repeat):
+    from app import category_model
+    from app.complaint_analyzer import ComplaintAnalyzer
+    from app.sentiment import VaderBackend
+
+    analyzer = ComplaintAnalyzer(sentiment_backend=VaderBackend())
+    train = list(datagen.generate_rows(train_rows, seed=seed, with_topic=True))
+    test = list(datagen.generate_rows(test_rows, seed=seed + 1, with_topic=True))
+    texts = [analyzer.clean_text(r["complaint"]) for r in test]
+    truth = [r["topic"] for r in test]
+
+    train_seconds, (artifact, info) = best_of(
+        lambda: category_model.train([(r["complaint"], r["topic"]) for r in train], analyzer.categories,
+                                     analyzer.clean_text), 1)
+    model = category_model.CategoryModel.loads(artifact, info["classes"])
+
+    kw_seconds, keyword_labels = best_of(lambda: [analyzer.categorize(t) for t in texts], repeat)
+    model_seconds, (model_labels, confident) = best_of(lambda: model.predict(texts, fallback=keyword_labels), repeat)
+    X = category_model.tfidf(category_model.term_counts(texts), model.idf)
+    product_seconds, _ = best_of(lambda: X @ model.W, repeat)
+    raw_labels, _ = model.predict(texts)
+
+    return {
+        "train_rows": train_rows,
+        "test_rows": test_rows,
+        "training": {"seconds": round(train_seconds, 2), "artifact_kb": round(len(artifact) / 1024, 1), **info},
+        "keywords": {"complaints_per_s": round(len(texts) / kw_seconds), "accuracy": accuracy(keyword_labels, truth),
+                     "general_pct": round(100 * keyword_labels.count("General") / len(texts), 2)},
+        "model": {
+            "complaints_per_s": round(len(texts) / model_seconds),
+            "sparse_product_ms": round(product_seconds * 1000, 2),
+            "accuracy": accuracy(raw_labels, truth),
+            "accuracy_with_fallback": accuracy(model_labels, truth),
+            "confident_pct": round(100 * float(confident.mean()), 2),
+            "general_pct": round(100 * model_labels.count("General") / len(texts), 2),
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--train", type=int, default=20000)
+    parser.add_argument("--test", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", help="also write the report to this JSON file")
+    args = parser.parse_args()
+
+    report = run(args.train, args.test, args.seed, args.repeat)
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
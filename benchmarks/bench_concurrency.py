@@ -0,0 +1,143 @@
+"""
+Does a large upload stall the rest of the API?
+
+Starts uvicorn on a temporary database, measures /dashboard-stats latency
+with several polling clients while idle, then again while a large CSV is
+being analyzed and saved, and prints p50/p95/p99 for both phases.
+
+    python -m benchmarks.bench_concurrency --rows 50000 --clients 8
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks import datagen
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    if not samples:
+        return {}
+
+    def pct(p):
+        return round(samples[min(int(p * len(samples)), len(samples) - 1)] * 1000, 2)
+
+    return {"count": len(samples), "p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99),
+            "max_ms": round(samples[-1] * 1000, 2)}
+
+
+def start_server(port, workdir, extra_env=None, workers=1):
+    """Runs the API under uvicorn against a throwaway database in `workdir`; returns once /ready says so."""
+    env = dict(os.environ)
+    env.update({
+        "COMPLAINTIQ_DB": os.path.join(workdir, "complaints.db"),
+        "REPORT_CACHE_DIR": os.path.join(workdir, "report_cache"),
+        "OUTBOX_WORKER": "0",
+        "PYTHONPATH": REPO_ROOT,
+    })
+    env.update(extra_env or {})
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=REPO_ROOT, env=env,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/ready")
+            if conn.getresponse().status == 200:
+                return proc
+        except OSError:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("uvicorn did not start")
+
+
+def make_csv(rows, seed=7):
+    return datagen.csv_bytes(rows, seed)
+
+
+def post_csv(port, payload, timeout=600):
+    boundary = "----complaintiq-bench"
+    body = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"bench.csv\"\r\n"
+        f"Content-Type: text/csv\r\n\r\n"
+    ).encode() + payload + f"\r\n--{boundary}--\r\n".encode()
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    conn.request("POST", "/analyze", body=body,
+                 headers={"Content-Type": f"multipart/form-data; boundary={boundary}"})
+    res = conn.getresponse()
+    return res.status, json.loads(res.read() or b"{}")
+
+
+def poll(port, path, stop, samples):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    while not stop.is_set():
+        start = time.perf_counter()
+        conn.request("GET", path)
+        conn.getresponse().read()
+        samples.append(time.perf_counter() - start)
+
+
+def measure(port, clients, stop):
+    samples = []
+    threads = [threading.Thread(target=poll, args=(port, "/dashboard-stats", stop, samples)) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    return threads, samples
+
+
+def run(rows=50_000, clients=8, idle_seconds=5.0, port=8765, extra_env=None):
+    with tempfile.TemporaryDirectory() as workdir:
+        proc = start_server(port, workdir, extra_env)
+        try:
+            post_csv(port, make_csv(200))  # seed + warm the analysis workers
+
+            stop = threading.Event()
+            threads, idle = measure(port, clients, stop)
+            time.sleep(idle_seconds)
+            stop.set()
+            for t in threads:
+                t.join()
+
+            payload = make_csv(rows)
+            stop = threading.Event()
+            threads, busy = measure(port, clients, stop)
+            start = time.perf_counter()
+            status, body = post_csv(port, payload)
+            upload_s = time.perf_counter() - start
+            stop.set()
+            for t in threads:
+                t.join()
+
+            return {
+                "rows": rows,
+                "clients": clients,
+                "upload": {"status": status, "seconds": round(upload_s, 2),
+                           "saved": body.get("total_new_complaints")},
+                "dashboard_idle": percentiles(idle),
+                "dashboard_during_upload": percentiles(busy),
+            }
+        finally:
+            proc.terminate()
+            proc.wait(30)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--idle-seconds", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.clients, args.idle_seconds, args.port), indent=2))
@@ -0,0 +1,69 @@
+"""
+Mailer throughput: one SMTP handshake per email vs. a reused, batched session.
+
+Runs against the local SMTP stand-in, whose --connect-delay approximates the
+TCP + STARTTLS + AUTH round trips of a real provider.
+
+    python -m benchmarks.bench_mailer --messages 300 --connect-delay 0.05
+"""
+import argparse
+import json
+import time
+
+from app.mailer import SMTPSession, build_message
+from benchmarks.smtp_standin import SMTPStandIn
+
+
+def _messages(n):
+    return [
+        build_message(f"customer{i}@example.com", f"Customer {i}", i, "Resolved", "Refund processed", sender="bank@example.com")
+        for i in range(n)
+    ]
+
+
+def bench_per_message(port, messages):
+    """The old behaviour: connect -> login -> send -> quit for every email."""
+    start = time.perf_counter()
+    for msg in messages:
+        session = SMTPSession(host="127.0.0.1", port=port, user="bank@example.com", password="x", starttls=False)
+        session.send(msg)
+        session.close()
+    return time.perf_counter() - start
+
+
+def bench_batched(port, messages):
+    """One pooled session, whole batch over a single connection."""
+    start = time.perf_counter()
+    session = SMTPSession(host="127.0.0.1", port=port, user="bank@example.com", password="x", starttls=False)
+    errors = session.send_batch(messages)
+    session.close()
+    assert not any(errors), errors
+    return time.perf_counter() - start
+
+
+def run(n_messages=300, connect_delay=0.05):
+    server = SMTPStandIn(connect_delay=connect_delay).start()
+    try:
+        messages = _messages(n_messages)
+        before = bench_per_message(server.port, messages)
+        connections_before = server.connections
+        after = bench_batched(server.port, messages)
+        return {
+            "messages": n_messages,
+            "connect_delay_s": connect_delay,
+            "per_message": {"seconds": round(before, 4), "msgs_per_s": round(n_messages / before, 1),
+                            "connections": connections_before},
+            "batched": {"seconds": round(after, 4), "msgs_per_s": round(n_messages / after, 1),
+                        "connections": server.connections - connections_before},
+            "speedup": round(before / after, 2),
+        }
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=300)
+    parser.add_argument("--connect-delay", type=float, default=0.05)
+    args = parser.parse_args()
+    print(json.dumps(run(args.messages, args.connect_delay), indent=2))
@@ -0,0 +1,90 @@
+"""
+Sentiment backends compared on the synthetic corpus.
+
+Runs VADER and the transformer backend in several configurations (one text
+per forward pass vs dynamic batching, fp32 vs int8, thread counts) over the
+same seeded complaints and reports complaints/second and how often each one
+agrees with VADER (the labels the app has always produced), plus where they
+disagree. Transformer runs are skipped when torch/transformers are missing.
+
+    python -m benchmarks.bench_sentiment --rows 2000
+    python -m benchmarks.bench_sentiment --rows 2000 --threads 1,4 --model cardiffnlp/twitter-roberta-base-sentiment-latest
+"""
+import argparse
+import json
+import time
+from collections import Counter
+
+from benchmarks import datagen
+
+
+def corpus(rows, seed, backend):
+    """Generated complaints, cleaned the way ComplaintAnalyzer cleans them before scoring."""
+    from app.complaint_analyzer import ComplaintAnalyzer
+    analyzer = ComplaintAnalyzer(sentiment_backend=backend)
+    return [analyzer.clean_text(r["complaint"]) for r in datagen.generate_rows(rows, seed=seed)]
+
+
+def timed_run(backend, texts):
+    backend.classify(texts[:16])   # warm-up (first call pays for lazy init)
+    start = time.perf_counter()
+    labels = backend.classify(texts)
+    elapsed = time.perf_counter() - start
+    return labels, {"seconds": round(elapsed, 3), "complaints_per_s": round(len(texts) / elapsed, 1)}
+
+
+def agreement(labels, reference):
+    same = sum(a == b for a, b in zip(labels, reference))
+    return {
+        "agreement_pct": round(100 * same / len(reference), 2),
+        "distribution": dict(Counter(labels)),
+        "disagreements": {f"vader={b} -> {a}": n
+                          for (a, b), n in Counter(zip(labels, reference)).most_common() if a != b},
+    }
+
+
+def run(rows, seed, model, threads, max_batch, budget_ms):
+    from app import sentiment
+
+    vader = sentiment.VaderBackend()
+    texts = corpus(rows, seed, vader)
+    results = {}
+    vader_labels, stats = timed_run(vader, texts)
+    results["vader"] = {**stats, "distribution": dict(Counter(vader_labels))}
+
+    configs = [("unbatched", {"max_batch": 1}), ("batched", {}), ("batched_int8", {"quantize": True})]
+    for n in threads:
+        for label, options in configs:
+            name = f"transformer_{label}_t{n}"
+            try:
+                backend = sentiment.TransformerBackend(model=model, threads=n,
+                                                       **{"max_batch": max_batch, "budget_ms": budget_ms, **options})
+            except ImportError as e:
+                results["transformer"] = {"skipped": str(e)}
+                return {"rows": len(texts), "seed": seed, "results": results}
+            labels, stats = timed_run(backend, texts)
+            results[name] = {**stats, "speedup_vs_vader": round(stats["complaints_per_s"] / results["vader"]["complaints_per_s"], 3),
+                             **agreement(labels, vader_labels)}
+    return {"rows": len(texts), "seed": seed, "model": model, "max_batch": max_batch,
+            "budget_ms": budget_ms, "results": results}
+
+
+if __name__ == "__main__":
+    from app.sentiment import SENTIMENT_BATCH_BUDGET_MS, SENTIMENT_MAX_BATCH, SENTIMENT_MODEL
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--model", default=SENTIMENT_MODEL)
+    parser.add_argument("--threads", default="1,4", help="comma-separated torch thread counts to try")
+    parser.add_argument("--max-batch", type=int, default=SENTIMENT_MAX_BATCH)
+    parser.add_argument("--budget-ms", type=float, default=SENTIMENT_BATCH_BUDGET_MS)
+    parser.add_argument("--out", help="also write the report to this JSON file")
+    args = parser.parse_args()
+
+    report = run(args.rows, args.seed, args.model, [int(n) for n in args.threads.split(",")],
+                 args.max_batch, args.budget_ms)
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,120 @@
+"""
+Complaint snapshot vs a full-table DataFrame per read.
+
+Fills a temporary database with `rows` analyzed complaints (a generated set
+cycled to size, inserted directly), then compares:
+
+* current  - what the chatbot did per request: DataHandler.load_data()
+             (every column, one Python string per cell) + ChatbotEngine
+* snapshot - DataHandler.snapshot: categorical codes for low-cardinality
+             columns, numeric id/date, names and accounts as plain strings,
+             complaint text read lazily for the rows a reply returns
+
+Reports frame memory (pandas deep size), cold load time, per-query chatbot
+latency for both, and the snapshot's incremental refresh after ticket
+updates and after an upload.
+
+    python -m benchmarks.bench_snapshot --rows 1000000
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks import datagen
+
+INSERT_BATCH = 50_000
+
+
+def best_of(fn, repeat):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best * 1000, 2), result
+
+
+def fill(db, rows, seed):
+    """Inserts `rows` complaints by cycling a generated, analyzed sample (much faster than analyzing them all)."""
+    sample = datagen.analyzed_rows(min(rows, 20_000), seed)
+    stamp = "2026-01-01 09:00:00"
+    conn = db.get_conn()
+    try:
+        source = itertools.islice(itertools.cycle(sample), rows)
+        while True:
+            batch = list(itertools.islice(source, INSERT_BATCH))
+            if not batch:
+                break
+            conn.executemany("""
+                INSERT INTO complaints (complaint, category, sentiment, urgency, priority, action, status,
+                                        date_logged, customer_name, account_number, email, phone)
+                VALUES (?, ?, ?, ?, ?, ?, 'Open', ?, ?, ?, ?, ?)
+            """, [(r["complaint"], r["category"], r["sentiment"], r["urgency"], r["priority"], r["action"], stamp,
+                   r["customer_name"], r["account_number"], r["email"], r["phone"]) for r in batch])
+        conn.commit()
+    finally:
+        conn.close()
+    return sample
+
+
+def run(rows, seed, repeat):
+    from app.chatbot_engine import ChatbotEngine
+    from app.data_handler import DataHandler
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db = DataHandler(os.path.join(workdir, "snapshot.db"))
+        sample = fill(db, rows, seed)
+        keywords = db.get_keywords()
+        probe = sample[len(sample) // 2]
+        queries = {
+            "summary": "give me a summary",
+            "count": "how many fraud complaints",
+            "account": f"status of account {probe['account_number']}",
+            "name": f"complaints from {probe['customer_name'].lower()}",
+            "fallback": "hello there",
+        }
+
+        load_ms, frame = best_of(db.load_data, 1)
+        current = {"load_ms": load_ms, "frame_mb": round(frame.memory_usage(deep=True).sum() / 2**20, 1)}
+        del frame
+        for intent, query in queries.items():
+            current[f"{intent}_ms"] = best_of(lambda: ChatbotEngine(db.load_data(), keywords).respond(query), repeat)[0]
+
+        cold_ms, snap = best_of(db.snapshot.get, 1)
+        snapshot = {"load_ms": cold_ms, "frame_mb": round(snap.memory_usage(deep=True).sum() / 2**20, 1),
+                    "unchanged_get_ms": best_of(db.snapshot.get, repeat)[0]}
+        for intent, query in queries.items():
+            snapshot[f"{intent}_ms"] = best_of(
+                lambda: ChatbotEngine(db.snapshot.get(), keywords, db.snapshot.records).respond(query), repeat)[0]
+
+        rng = random.Random(seed)
+        db.update_complaints([{"id": rng.randint(1, rows), "status": "Resolved", "action": "bench"} for _ in range(100)],
+                             notify=False)
+        snapshot["refresh_after_100_updates_ms"] = best_of(db.snapshot.get, 1)[0]
+        db.save_results(pd.DataFrame(sample[:1000]))
+        snapshot["refresh_after_1000_inserts_ms"] = best_of(db.snapshot.get, 1)[0]
+
+    return {"rows": rows, "current": current, "snapshot": snapshot,
+            "memory_ratio": round(current["frame_mb"] / snapshot["frame_mb"], 1) if snapshot["frame_mb"] else None}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=datagen.parse_size, default=1_000_000, help="1k, 10k, 100k, 1m or a row count")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", help="also write the report to this JSON file")
+    args = parser.parse_args()
+
+    report = run(args.rows, args.seed, args.repeat)
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
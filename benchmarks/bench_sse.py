@@ -0,0 +1,137 @@
+"""
+How much does the live feed cost with many dashboards open?
+
+Starts uvicorn on a temporary database, connects `subscribers` clients to
+GET /events, then measures the server's CPU time while they sit idle and
+while `updates` ticket changes are pushed to all of them. Reports delivery
+completeness, delivery latency (update sent -> event received, per client)
+and server CPU per second idle / per thousand deliveries. Also checks that a
+client resuming with Last-Event-ID gets the events it missed replayed.
+
+    python -m benchmarks.bench_sse --subscribers 500 --updates 50
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import tempfile
+import time
+
+from benchmarks import datagen
+from benchmarks.bench_concurrency import percentiles, post_csv, start_server
+
+
+def cpu_seconds(pid):
+    """User + system CPU of a process (Linux /proc); None where unavailable."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+async def subscribe(port, sent, received, ready, last_event_id=None):
+    """One SSE client: records (latency) for every bench update it sees."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port, limit=1 << 20)
+    headers = f"Last-Event-ID: {last_event_id}\r\n" if last_event_id is not None else ""
+    writer.write(f"GET /events HTTP/1.1\r\nHost: bench\r\nAccept: text/event-stream\r\n{headers}\r\n".encode())
+    await writer.drain()
+    ready.release()
+    event_id, event = None, None
+    try:
+        while True:
+            line = (await reader.readline()).decode().rstrip("\r\n")
+            if not line and reader.at_eof():
+                return
+            if line.startswith("id: "):
+                event_id = int(line[4:])
+            elif line.startswith("event: "):
+                event = line[7:]
+            elif line.startswith("data: ") and event == "status_changed":
+                data = json.loads(line[6:])
+                if data.get("action") in sent:
+                    received.append((event_id, time.perf_counter() - sent[data["action"]]))
+    finally:
+        writer.close()
+
+
+def send_update(port, complaint_id, action, status="In Progress"):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    conn.request("POST", "/update-complaint", json.dumps({"id": complaint_id, "status": status, "action": action}),
+                 {"Content-Type": "application/json"})
+    conn.getresponse().read()
+
+
+async def run(port, proc, subscribers, updates, interval, idle_seconds):
+    sent, received, ready = {}, [], asyncio.Semaphore(0)
+    clients = [asyncio.create_task(subscribe(port, sent, received, ready)) for _ in range(subscribers)]
+    for _ in clients:
+        await ready.acquire()
+    await asyncio.sleep(1)
+
+    cpu_start = cpu_seconds(proc.pid)
+    await asyncio.sleep(idle_seconds)
+    cpu_idle = cpu_seconds(proc.pid)
+
+    start = time.perf_counter()
+    for i in range(updates):
+        action = f"bench-{i}"
+        sent[action] = time.perf_counter()
+        await asyncio.to_thread(send_update, port, i % 100 + 1, action)
+        await asyncio.sleep(interval)
+    # Let the last events drain to every client
+    deadline = time.perf_counter() + 10
+    while len(received) < subscribers * updates and time.perf_counter() < deadline:
+        await asyncio.sleep(0.1)
+    burst_seconds = time.perf_counter() - start
+    cpu_burst = cpu_seconds(proc.pid)
+
+    # A late client resuming from the first bench event must get the rest replayed
+    first_id = min(event_id for event_id, _ in received) if received else 0
+    replayed = []
+    late = asyncio.create_task(subscribe(port, sent, replayed, ready, last_event_id=first_id))
+    await ready.acquire()
+    await asyncio.sleep(2)
+
+    for task in clients + [late]:
+        task.cancel()
+    await asyncio.gather(*clients, late, return_exceptions=True)
+
+    expected = subscribers * updates
+    report = {
+        "subscribers": subscribers,
+        "updates": updates,
+        "deliveries": len(received),
+        "delivered_pct": round(100 * len(received) / expected, 2) if expected else None,
+        "latency": percentiles([latency for _, latency in received]),
+        "replayed_after_reconnect": f"{len(replayed)}/{updates - 1}",
+    }
+    if cpu_start is not None:
+        report["server_cpu"] = {
+            "idle_cpu_pct": round(100 * (cpu_idle - cpu_start) / idle_seconds, 2),
+            "burst_cpu_pct": round(100 * (cpu_burst - cpu_idle) / burst_seconds, 2),
+            "cpu_ms_per_1k_deliveries": round(1000 * 1000 * (cpu_burst - cpu_idle) / max(len(received), 1), 2),
+        }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=500)
+    parser.add_argument("--updates", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between updates")
+    parser.add_argument("--idle", type=float, default=5, help="seconds to measure idle CPU")
+    parser.add_argument("--port", type=int, default=8797)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        proc = start_server(args.port, workdir)
+        try:
+            post_csv(args.port, datagen.csv_bytes(200))
+            report = asyncio.run(run(args.port, proc, args.subscribers, args.updates, args.interval, args.idle))
+        finally:
+            proc.terminate()
+            proc.wait(30)
+    print(json.dumps(report, indent=2))
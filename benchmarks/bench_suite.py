@@ -0,0 +1,365 @@
+"""
+Benchmark suite: micro-benchmarks of the core classes plus end-to-end runs
+through FastAPI's TestClient, on seeded synthetic data (benchmarks/datagen.py).
+
+    python -m benchmarks.bench_suite --size 1k
+    python -m benchmarks.bench_suite --size 100k --only micro.
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json
+
+Every benchmark reports wall-time stats over --repeat runs (min/median/mean, in
+seconds) and, where it makes sense, items/second. Results are written as JSON
+(default benchmarks/results/<size>-<timestamp>.json) together with the git
+commit, Python version and machine, so runs can be compared for regressions.
+Everything runs against throwaway databases in a temp directory.
+
+startup.import is a budget, not just a measurement: the run exits non-zero if
+`import app.main` in a fresh interpreter takes longer than IMPORT_BUDGET_S
+(median) or imports any of LAZY_MODULES.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import datagen
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+
+# The legacy in-memory PDF builder gets slow and memory hungry on big tables
+PDF_MAX_ROWS = 20_000
+
+# Cold start: median seconds for `import app.main` (~0.7 s measured on one
+# core), and modules it must leave to first use / the warm-up (app/warmup.py)
+IMPORT_BUDGET_S = float(os.getenv("IMPORT_BUDGET_S", "1.2"))
+LAZY_MODULES = ("nltk", "scipy", "fpdf", "bcrypt", "torch", "transformers",
+                "app.complaint_analyzer", "app.category_model", "app.report_generator", "app.mailer")
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Registers fn(ctx) under `name`; names are dotted (micro.*, e2e.*) for --only filtering."""
+    def register(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+
+def measure(fn, repeat, items=None, setup=None):
+    """Runs fn `repeat` times (after setup(), if given) and summarizes the wall times."""
+    runs = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        fn(arg) if setup else fn()
+        runs.append(time.perf_counter() - start)
+    result = {
+        "runs": len(runs),
+        "min_s": round(min(runs), 6),
+        "median_s": round(statistics.median(runs), 6),
+        "mean_s": round(statistics.fmean(runs), 6),
+    }
+    if items:
+        result["items"] = items
+        result["items_per_s"] = round(items / statistics.median(runs), 1)
+    return result
+
+
+class Context:
+    """Data shared between benchmarks, built lazily so --only runs stay cheap."""
+
+    def __init__(self, rows, seed, repeat, workdir):
+        self.rows = rows
+        self.seed = seed
+        self.repeat = repeat
+        self.workdir = workdir
+        self._cache = {}
+
+    def get(self, key, build):
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    @property
+    def raw(self):
+        return self.get("raw", lambda: list(datagen.generate_rows(self.rows, self.seed)))
+
+    @property
+    def analyzed(self):
+        return self.get("analyzed", lambda: datagen.analyzed_rows(self.rows, self.seed))
+
+    @property
+    def db(self):
+        """A DataHandler holding the analyzed data set."""
+        def build():
+            import pandas as pd
+            from app.data_handler import DataHandler
+            db = DataHandler(os.path.join(self.workdir, "populated.db"))
+            db.save_results(pd.DataFrame(self.analyzed))
+            return db
+        return self.get("db", build)
+
+
+# --- STARTUP ---
+
+@benchmark("startup.import")
+def bench_import(ctx):
+    """`import app.main` in fresh interpreters; the first run also creates the schema."""
+    script = ("import json, sys, time; start = time.perf_counter(); import app.main; "
+              f"print(json.dumps([time.perf_counter() - start, [m for m in {LAZY_MODULES!r} if m in sys.modules]]))")
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT, COMPLAINTIQ_DB=os.path.join(ctx.workdir, "startup.db"))
+    runs, eager = [], set()
+    for _ in range(max(ctx.repeat, 3) + 1):
+        out = subprocess.run([sys.executable, "-c", script], cwd=REPO_ROOT, env=env,
+                             capture_output=True, text=True, check=True).stdout
+        seconds, loaded = json.loads(out.strip().splitlines()[-1])
+        runs.append(seconds)
+        eager.update(loaded)
+    restarts = runs[1:]
+    median = statistics.median(restarts)
+    return {
+        "runs": len(restarts),
+        "first_start_s": round(runs[0], 6),
+        "min_s": round(min(restarts), 6),
+        "median_s": round(median, 6),
+        "mean_s": round(statistics.fmean(restarts), 6),
+        "budget_s": IMPORT_BUDGET_S,
+        "eager_heavy_modules": sorted(eager),
+        "within_budget": median <= IMPORT_BUDGET_S and not eager,
+    }
+
+
+# --- MICRO: ComplaintAnalyzer ---
+
+@benchmark("micro.analyze")
+def bench_analyze(ctx):
+    from app.complaint_analyzer import ComplaintAnalyzer
+    analyzer = ComplaintAnalyzer()
+    texts = [r["complaint"] for r in ctx.raw]
+    return measure(lambda: [analyzer.analyze(t) for t in texts], ctx.repeat, items=len(texts))
+
+
+@benchmark("micro.analyze_batch")
+def bench_analyze_batch(ctx):
+    from app.complaint_analyzer import ComplaintAnalyzer
+    analyzer = ComplaintAnalyzer()
+    texts = [r["complaint"] for r in ctx.raw]
+    return measure(lambda: analyzer.analyze_batch(texts), ctx.repeat, items=len(texts))
+
+
+@benchmark("micro.rules")
+def bench_rules(ctx):
+    """Triage rules only: one vectorized pass over the batch (sentiment/category precomputed)."""
+    from app.complaint_analyzer import ComplaintAnalyzer
+    analyzer = ComplaintAnalyzer()
+    cleaned = [analyzer.clean_text(r["complaint"]) for r in ctx.raw]
+    categories = [analyzer.categorize(t) for t in cleaned]
+    sentiments, scores = analyzer.sentiment.classify_with_scores(cleaned)
+    return measure(lambda: analyzer.rules.evaluate(cleaned, categories, sentiments, scores),
+                   ctx.repeat, items=len(cleaned))
+
+
+# --- MICRO: DataHandler ---
+
+@benchmark("micro.save_results")
+def bench_save_results(ctx):
+    import pandas as pd
+    from app.data_handler import DataHandler
+    df = pd.DataFrame(ctx.analyzed)
+    counter = iter(range(1_000_000))
+
+    def fresh_db():
+        return DataHandler(os.path.join(ctx.workdir, f"save_{next(counter)}.db"))
+
+    return measure(lambda db: db.save_results(df), ctx.repeat, items=len(df), setup=fresh_db)
+
+
+@benchmark("micro.load_data")
+def bench_load_data(ctx):
+    db = ctx.db
+    return measure(db.load_data, ctx.repeat, items=ctx.rows)
+
+
+@benchmark("micro.get_metrics")
+def bench_get_metrics(ctx):
+    db = ctx.db
+    calls = 100
+    result = measure(lambda: [db.get_metrics() for _ in range(calls)], ctx.repeat)
+    result["per_call_ms"] = round(result["median_s"] / calls * 1000, 4)
+    return result
+
+
+# --- MICRO: ChatbotEngine (one entry per intent) ---
+
+def _chat_queries(ctx):
+    sample = ctx.raw[len(ctx.raw) // 2]
+    return {
+        "summary": "give me a summary",
+        "count": "how many complaints in total",
+        "priority": "show critical cases",
+        "account": f"status of account {sample['Account Number']}",
+        "name": f"complaints from {sample['Customer Name'].lower()}",
+        "category": "any loan problems",
+        "fallback": "hello there",
+    }
+
+
+@benchmark("micro.chatbot")
+def bench_chatbot(ctx):
+    from app.chatbot_engine import ChatbotEngine
+    db = ctx.db
+    engine = ChatbotEngine(db.load_data(), db.get_keywords())
+    results = {}
+    for intent, query in _chat_queries(ctx).items():
+        results[intent] = measure(lambda: engine.respond(query), ctx.repeat)
+    results["engine_setup"] = measure(lambda: ChatbotEngine(db.load_data(), db.get_keywords()), ctx.repeat)
+    results["engine_setup_snapshot"] = measure(
+        lambda: ChatbotEngine(db.snapshot.get(), db.get_keywords(), db.snapshot.records), ctx.repeat)
+    return results
+
+
+# --- MICRO: reports ---
+
+@benchmark("micro.generate_pdf_report")
+def bench_generate_pdf_report(ctx):
+    from app.report_generator import generate_pdf_report
+    data = ctx.db.load_data().head(PDF_MAX_ROWS).to_dict(orient="records")
+    return measure(lambda: generate_pdf_report(data), ctx.repeat, items=len(data))
+
+
+@benchmark("micro.get_report")
+def bench_get_report(ctx):
+    """Streaming detail and rollup summary renders (cache bypassed with a fresh dir per run)."""
+    from app.report_generator import get_report
+    db = ctx.db
+    counter = iter(range(1_000_000))
+
+    def fresh_dir():
+        return os.path.join(ctx.workdir, f"reports_{next(counter)}")
+
+    return {
+        "detail": measure(lambda d: get_report(db, {"mode": "detail"}, cache_dir=d), ctx.repeat,
+                          items=ctx.rows, setup=fresh_dir),
+        "summary": measure(lambda d: get_report(db, {"mode": "summary"}, cache_dir=d), ctx.repeat,
+                           setup=fresh_dir),
+    }
+
+
+# --- END TO END (TestClient) ---
+
+def _client(ctx):
+    def build():
+        # app.main reads its settings at import time
+        os.environ["COMPLAINTIQ_DB"] = os.path.join(ctx.workdir, "e2e.db")
+        os.environ["REPORT_CACHE_DIR"] = os.path.join(ctx.workdir, "e2e_reports")
+        os.environ["OUTBOX_WORKER"] = "0"
+        from fastapi.testclient import TestClient
+        from app.main import app
+        client = TestClient(app)
+        client.__enter__()  # runs the lifespan (worker warm-up)
+        return client
+    return ctx.get("client", build)
+
+
+@benchmark("e2e.analyze")
+def bench_e2e_analyze(ctx):
+    client = _client(ctx)
+    payload = ctx.get("csv", lambda: datagen.csv_bytes(ctx.rows, ctx.seed))
+
+    def upload():
+        res = client.post("/analyze", files={"file": ("bench.csv", payload, "text/csv")})
+        assert res.status_code == 200 and "error" not in res.json(), res.text[:200]
+
+    # One upload only: every repeat would add another copy of the data
+    return measure(upload, 1, items=ctx.rows)
+
+
+def _get(client, path, method="GET", **kwargs):
+    def call():
+        res = client.request(method, path, **kwargs)
+        assert res.status_code == 200, (path, res.status_code, res.text[:200])
+    return call
+
+
+@benchmark("e2e.endpoints")
+def bench_e2e_endpoints(ctx):
+    client = _client(ctx)
+    if client.get("/dashboard-stats").json().get("total", 0) == 0:
+        bench_e2e_analyze(ctx)
+    calls = {
+        "dashboard_stats": _get(client, "/dashboard-stats"),
+        "report_summary": _get(client, "/report-summary"),
+        "chat_summary": _get(client, "/chat", "POST", params={"query": "summary"}),
+        "chat_name": _get(client, "/chat", "POST", params={"query": _chat_queries(ctx)["name"]}),
+        "all_complaints": _get(client, "/all-complaints"),
+        "generate_report_summary": _get(client, "/generate-report", params={"mode": "summary"}),
+        "generate_report_detail": _get(client, "/generate-report", params={"mode": "detail"}),
+    }
+    return {name: measure(call, ctx.repeat) for name, call in calls.items()}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(size="1k", seed=42, repeat=3, only=None):
+    rows = datagen.parse_size(size)
+    selected = [n for n in BENCHMARKS if not only or any(n.startswith(o) for o in only)]
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        ctx = Context(rows, seed, repeat, workdir)
+        for name in selected:
+            start = time.perf_counter()
+            print(f"⏱️  {name} ...", file=sys.stderr, flush=True)
+            results[name] = BENCHMARKS[name](ctx)
+            print(f"   done in {time.perf_counter() - start:.1f}s", file=sys.stderr, flush=True)
+        client = ctx._cache.get("client")
+        if client:
+            client.__exit__(None, None, None)
+
+    return {
+        "meta": {
+            "size": size,
+            "rows": rows,
+            "seed": seed,
+            "repeat": repeat,
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": f"{platform.system()} {platform.machine()}, {os.cpu_count()} cpus",
+        },
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="1k", help="1k, 10k, 100k, 1m or a row count")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", action="append", help="benchmark name prefix (repeatable), e.g. micro. or e2e.analyze")
+    parser.add_argument("--out", help="results file (default benchmarks/results/<size>-<timestamp>.json)")
+    args = parser.parse_args()
+
+    report = run(args.size, args.seed, args.repeat, args.only)
+    out = args.out or os.path.join(RESULTS_DIR, f"{args.size}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    print(f"📄 Results saved to {out}", file=sys.stderr)
+
+    over = [name for name, result in report["results"].items() if result.get("within_budget") is False]
+    if over:
+        print(f"❌ Over budget: {', '.join(over)}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,67 @@
+"""
+Does throughput scale with API worker processes?
+
+Runs the same load-test scenario (benchmarks/scenarios/scaling.json by
+default: closed loop, almost no think time) against `python -m app.serve`
+with 1, 2, 4 ... workers, each on a fresh database, and reports throughput,
+scaling efficiency (throughput / (workers x single-worker throughput)),
+p95 latency and errors. "database is locked" failures would show up as
+errors on the write endpoints; with the shared writer lock there should be
+none. Scaling is bounded by the machine's cores (printed as `cpus`).
+
+    python -m benchmarks.bench_workers --workers 1 2 4 --duration 30
+"""
+import argparse
+import json
+import os
+
+from benchmarks import loadtest
+
+WRITE_ENDPOINTS = ("POST /update-complaint", "POST /analyze")
+
+
+def run(scenario, worker_counts):
+    runs = []
+    for n in worker_counts:
+        scenario.setdefault("server", {})["workers"] = n
+        report = loadtest.run(scenario)
+        endpoints = report["endpoints"]
+        runs.append({
+            "workers": n,
+            "throughput_rps": report["throughput_rps"],
+            "error_rate": report["error_rate"],
+            "write_errors": sum(endpoints.get(e, {}).get("errors", 0) for e in WRITE_ENDPOINTS),
+            "p95_ms": {label: e.get("p95_ms") for label, e in endpoints.items()},
+        })
+
+    base = runs[0]["throughput_rps"] / runs[0]["workers"] if runs and runs[0]["throughput_rps"] else None
+    for r in runs:
+        r["speedup"] = round(r["throughput_rps"] / runs[0]["throughput_rps"], 2) if base else None
+        r["efficiency"] = round(r["throughput_rps"] / (r["workers"] * base), 2) if base else None
+    return {"cpus": os.cpu_count(), "agents": scenario["agents"],
+            "duration_seconds": scenario["duration_seconds"], "runs": runs}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", default=os.path.join(os.path.dirname(__file__), "scenarios", "scaling.json"))
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--agents", type=int, help="override the scenario's agent count")
+    parser.add_argument("--duration", type=float, help="override duration_seconds")
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--out", help="also write the report to this JSON file")
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        scenario = json.load(f)
+    scenario["port"] = args.port
+    if args.agents:
+        scenario["agents"] = args.agents
+    if args.duration:
+        scenario["duration_seconds"] = args.duration
+
+    report = run(scenario, args.workers)
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
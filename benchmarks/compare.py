@@ -0,0 +1,75 @@
+"""
+Compares two bench_suite result files and flags regressions.
+
+    python -m benchmarks.compare benchmarks/results/base.json benchmarks/results/new.json --threshold 0.15
+
+Prints the median time of every benchmark in both runs and the change. Exits
+with status 1 if any benchmark got slower by more than --threshold (a fraction),
+so it can gate CI.
+"""
+import argparse
+import json
+import sys
+
+
+def flatten(results, prefix=""):
+    """{name: median_s} for every leaf measurement (nested groups become dotted names)."""
+    flat = {}
+    for name, value in results.items():
+        key = f"{prefix}{name}"
+        if isinstance(value, dict) and "median_s" in value:
+            flat[key] = value["median_s"]
+        elif isinstance(value, dict):
+            flat.update(flatten(value, key + "."))
+    return flat
+
+
+def compare(base, new, threshold=0.10):
+    """Returns (rows, regressions); each row is (name, base_s, new_s, change)."""
+    a, b = flatten(base["results"]), flatten(new["results"])
+    rows, regressions = [], []
+    for name in sorted(a.keys() | b.keys()):
+        old, cur = a.get(name), b.get(name)
+        change = (cur - old) / old if old and cur is not None else None
+        rows.append((name, old, cur, change))
+        if change is not None and change > threshold:
+            regressions.append(name)
+    return rows, regressions
+
+
+def _fmt(seconds):
+    if seconds is None:
+        return "-"
+    return f"{seconds * 1000:.2f} ms" if seconds < 1 else f"{seconds:.3f} s"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    for label, run in (("base", base), ("new", new)):
+        meta = run.get("meta", {})
+        print(f"{label}: {meta.get('commit')} {meta.get('timestamp')} rows={meta.get('rows')} {meta.get('machine')}")
+    if base.get("meta", {}).get("rows") != new.get("meta", {}).get("rows"):
+        print("⚠️ Runs used different data sizes; changes are not comparable.")
+
+    rows, regressions = compare(base, new, args.threshold)
+    width = max((len(r[0]) for r in rows), default=10)
+    print(f"\n{'benchmark':<{width}}  {'base':>12}  {'new':>12}  {'change':>8}")
+    for name, old, cur, change in rows:
+        flag = " ❌" if name in regressions else ""
+        pct = f"{change:+.1%}" if change is not None else "-"
+        print(f"{name:<{width}}  {_fmt(old):>12}  {_fmt(cur):>12}  {pct:>8}{flag}")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} benchmark(s) slower than +{args.threshold:.0%}")
+        sys.exit(1)
+    print("\n✅ No regressions")
@@ -0,0 +1,132 @@
+"""
+Seeded synthetic banking complaints for benchmarks.
+
+Rows look like the CSVs agents upload (Customer Name, Account Number, Email,
+Phone, complaint). Complaint text is assembled from the default keyword
+vocabularies plus urgency words, so every category/priority path in
+ComplaintAnalyzer gets exercised. Lengths vary from a few words to a long
+paragraph, and a fraction of rows re-submits an earlier complaint from the
+same customer. The same seed always gives the same file.
+
+    python -m benchmarks.datagen --size 100k --out complaints_100k.csv
+"""
+import argparse
+import csv
+import io
+import random
+
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+FIRST_NAMES = ["Aarav", "Priya", "Rohan", "Ananya", "Vikram", "Sneha", "Arjun", "Kavya", "Rahul", "Meera",
+               "Rudresh", "Isha", "Karan", "Divya", "Aditya", "Pooja", "Sanjay", "Neha", "Amit", "Lakshmi",
+               "John", "Maria", "David", "Sarah", "Mohammed", "Fatima", "Chen", "Olga", "Kwame", "Lucia"]
+LAST_NAMES = ["Sharma", "Patel", "Reddy", "Iyer", "Gupta", "Singh", "Nair", "Kumar", "Das", "Mehta",
+              "Joshi", "Rao", "Khan", "Fernandes", "Smith", "Garcia", "Wang", "Okafor", "Ivanova", "Rossi"]
+DOMAINS = ["gmail.com", "yahoo.com", "outlook.com", "example.com", "rediffmail.com"]
+
+# Topic vocabulary per category (a superset of the seeded keyword table)
+TOPICS = {
+    "Loan": ["my home loan emi", "the interest on my personal loan", "loan repayment schedule",
+             "emi auto-debit", "car loan interest rate"],
+    "Credit Card": ["my credit card", "the debit card", "card limit", "credit card statement",
+                    "annual fee on my card"],
+    "Account": ["my savings account balance", "a deposit at the branch", "fund transfer",
+                "account statement", "salary account"],
+    "Fraud": ["an unauthorized transaction", "a scam call asking for my otp", "my account was hacked",
+              "a fraud withdrawal", "phishing email using the bank name"],
+    "Customer Service": ["customer service", "support team", "the response from the call centre",
+                         "branch staff", "the complaint I raised last week"],
+    "General": ["the mobile app", "net banking", "the new branch timings", "cheque book request",
+                "kyc update"],
+}
+PROBLEMS = ["is not working", "failed again", "is still pending", "was charged twice", "shows a wrong amount",
+            "has a delay of two weeks", "has an issue nobody fixes", "was blocked without notice",
+            "is fine now, thank you", "needs clarification"]
+# Most complaints carry no explicit urgency cue
+URGENCY = [""] * 9 + ["This is urgent.", "Please treat this as fraud.", "My card is blocked.",
+                      "I was hacked.", "Still pending.", "The delay is unacceptable."]
+FILLER = ["I have been a customer for years.", "I visited the branch twice.", "Nobody called me back.",
+          "Please refund the amount at the earliest.", "I am very disappointed with the service.",
+          "Reference number is attached.", "Kindly look into this.", "The staff were polite but unhelpful.",
+          "I expect a resolution within 48 hours.", "Thanks for your help."]
+
+
+def _labeled_complaint(rng):
+    """(topic category, complaint text)"""
+    category = rng.choice(list(TOPICS))
+    parts = [f"{rng.choice(TOPICS[category]).capitalize()} {rng.choice(PROBLEMS)}."]
+    parts.append(rng.choice(URGENCY))
+    # Long tail of lengths: most complaints are 1-3 sentences, some are paragraphs
+    extra = min(int(rng.expovariate(0.6)), 12)
+    parts.extend(rng.choice(FILLER) for _ in range(extra))
+    return category, " ".join(p for p in parts if p)
+
+
+def generate_rows(rows, seed=42, duplicate_rate=0.03, with_topic=False):
+    """Yields `rows` complaint dicts with CSV column names (plus "topic", the true category, if asked)."""
+    rng = random.Random(seed)
+    customers = max(rows // 3, 1)
+    recent = []
+    for i in range(rows):
+        if recent and rng.random() < duplicate_rate:
+            # Customer re-submits the same complaint
+            yield dict(rng.choice(recent))
+            continue
+        c = rng.randrange(customers)
+        first, last = FIRST_NAMES[c % len(FIRST_NAMES)], LAST_NAMES[(c // len(FIRST_NAMES)) % len(LAST_NAMES)]
+        row = {
+            "Customer Name": f"{first} {last}",
+            "Account Number": str(3_000_000_000 + c * 7919 % 6_999_999_999),
+            "Email": f"{first.lower()}.{last.lower()}{c}@{DOMAINS[c % len(DOMAINS)]}",
+            "Phone": f"+91 9{c % 1_000_000_000:09d}",
+        }
+        topic, row["complaint"] = _labeled_complaint(rng)
+        if with_topic:
+            row["topic"] = topic
+        recent.append(row)
+        if len(recent) > 1000:
+            recent.pop(0)
+        yield row
+
+
+COLUMNS = ["Customer Name", "Account Number", "Email", "Phone", "complaint"]
+
+
+def write_csv(f, rows, seed=42):
+    writer = csv.DictWriter(f, fieldnames=COLUMNS)
+    writer.writeheader()
+    writer.writerows(generate_rows(rows, seed))
+
+
+def csv_bytes(rows, seed=42):
+    """The generated file as upload-ready bytes."""
+    buf = io.StringIO()
+    write_csv(buf, rows, seed)
+    return buf.getvalue().encode()
+
+
+def analyzed_rows(rows, seed=42):
+    """Generated complaints run through ComplaintAnalyzer, shaped like analyze_upload's output."""
+    from app.complaint_analyzer import ComplaintAnalyzer
+    analyzer = ComplaintAnalyzer()
+    out = []
+    for row in generate_rows(rows, seed):
+        result = analyzer.analyze(row["complaint"])
+        result.update(customer_name=row["Customer Name"], account_number=row["Account Number"],
+                      email=row["Email"], phone=row["Phone"])
+        out.append(result)
+    return out
+
+
+def parse_size(size):
+    return SIZES.get(str(size).lower()) or int(size)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="1k", help="1k, 10k, 100k, 1m or a row count")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+    with open(args.out, "w", newline="") as f:
+        write_csv(f, parse_size(args.size), args.seed)
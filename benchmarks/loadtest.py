@@ -0,0 +1,258 @@
+"""
+Load test: many concurrent agent sessions against a local uvicorn instance.
+
+Starts the API on a throwaway database (seeded with synthetic complaints),
+then runs `agents` threads for `duration_seconds`. Each agent picks a session
+type from the scenario file by weight and loops through its steps with think
+time in between. Reports throughput, p50/p95/p99 latency and error rate per
+endpoint, plus SQLite lock contention read from the server's /metrics
+(with several workers, /metrics is per process: that part covers whichever
+worker answered the scrape).
+
+    python -m benchmarks.loadtest --config benchmarks/scenarios/agents_50.json
+    python -m benchmarks.loadtest --config benchmarks/scenarios/agents_50.json --agents 20 --duration 30
+
+Scenario file (JSON):
+    agents, duration_seconds, ramp_up_seconds, think_time_seconds [min, max],
+    seed_rows, server {workers, env}, sessions {name: {weight, steps: [...]}}
+
+Step actions: dashboard, complaints {status, page_size}, update {count, statuses}, chat {queries},
+report_summary, report {mode}, upload {rows}.
+"""
+import argparse
+import http.client
+import json
+import random
+import re
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+from benchmarks import datagen
+from benchmarks.bench_concurrency import percentiles, post_csv, start_server
+
+
+class Agent(threading.Thread):
+    """One simulated agent with its own keep-alive connection."""
+
+    def __init__(self, n, port, scenario, stats, stop, start_delay):
+        super().__init__(name=f"agent-{n}", daemon=True)
+        self.port = port
+        self.scenario = scenario
+        self.stats = stats
+        self.stop = stop
+        self.start_delay = start_delay
+        self.rng = random.Random(scenario.get("seed", 1) * 1000 + n)
+        self.conn = None
+        sessions = scenario["sessions"]
+        self.session_name = self.rng.choices(list(sessions), weights=[s["weight"] for s in sessions.values()])[0]
+        self.steps = sessions[self.session_name]["steps"]
+
+    def request(self, label, method, path, body=None, headers=None, timeout=120):
+        start = time.perf_counter()
+        error = None
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=timeout)
+            self.conn.request(method, path, body=body, headers=headers or {})
+            res = self.conn.getresponse()
+            payload = res.read()
+            if res.status >= 400:
+                error = f"HTTP {res.status}"
+            else:
+                data = json.loads(payload) if res.getheader("content-type", "").startswith("application/json") else None
+                if isinstance(data, dict) and "error" in data:
+                    error = str(data["error"])[:80]
+        except (OSError, http.client.HTTPException) as e:
+            error = e.__class__.__name__
+            self.conn = None
+            data = None
+        self.stats.record(label, time.perf_counter() - start, error)
+        return None if error else data
+
+    def run(self):
+        if self.stop.wait(self.start_delay):
+            return
+        think = self.scenario.get("think_time_seconds", [0.5, 2.0])
+        while not self.stop.is_set():
+            for step in self.steps:
+                if self.stop.is_set():
+                    break
+                getattr(self, "do_" + step["action"])(step)
+                self.stop.wait(self.rng.uniform(*think))
+
+    # --- ACTIONS ---
+
+    def do_dashboard(self, step):
+        stats = self.request("GET /dashboard-stats", "GET", "/dashboard-stats")
+        if stats:
+            self.stats.total_rows = max(self.stats.total_rows, stats.get("total", 0))
+
+    def do_complaints(self, step):
+        status = step.get("status", "Open").replace(" ", "+")
+        self.request("GET /complaints", "GET", f"/complaints?status={status}&page_size={step.get('page_size', 50)}")
+
+    def do_update(self, step):
+        statuses = step.get("statuses", ["In Progress", "Resolved"])
+        for _ in range(step.get("count", 1)):
+            if not self.stats.total_rows:
+                return
+            body = json.dumps({"id": self.rng.randint(1, self.stats.total_rows),
+                               "status": self.rng.choice(statuses), "action": "Handled in load test"})
+            self.request("POST /update-complaint", "POST", "/update-complaint", body,
+                         {"Content-Type": "application/json"})
+
+    def do_chat(self, step):
+        query = self.rng.choice(step.get("queries", ["summary"]))
+        self.request("POST /chat", "POST", "/chat?query=" + query.replace(" ", "+"))
+
+    def do_report_summary(self, step):
+        self.request("GET /report-summary", "GET", "/report-summary")
+
+    def do_report(self, step):
+        mode = step.get("mode", "summary")
+        self.request(f"GET /generate-report?mode={mode}", "GET", f"/generate-report?mode={mode}")
+
+    def do_upload(self, step):
+        payload = datagen.csv_bytes(step.get("rows", 1000), seed=self.rng.randrange(1 << 30))
+        start = time.perf_counter()
+        try:
+            status, body = post_csv(self.port, payload)
+            error = None if status == 200 and "error" not in body else f"HTTP {status}"
+        except (OSError, http.client.HTTPException) as e:
+            error = e.__class__.__name__
+        self.stats.record("POST /analyze", time.perf_counter() - start, error)
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+        self.total_rows = 0
+
+    def record(self, label, seconds, error=None):
+        with self.lock:
+            self.latencies[label].append(seconds)
+            if error:
+                self.errors[label][error] += 1
+
+
+def scrape_metrics(port):
+    """Parses the Prometheus text from /metrics into {(name, labels): value}."""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    conn.request("GET", "/metrics")
+    text = conn.getresponse().read().decode()
+    values = {}
+    for line in text.splitlines():
+        m = re.match(r"^(\w+)(\{.*\})? ([0-9.eE+-]+)$", line)
+        if m:
+            values[(m.group(1), m.group(2) or "")] = float(m.group(3))
+    return values
+
+
+def lock_contention(before, after):
+    """SQLite lock errors and write-path latency over the run, from the /metrics delta."""
+    def delta(name, labels_like=""):
+        return sum(v - before.get(k, 0) for k, v in after.items() if k[0] == name and labels_like in k[1])
+
+    writes = {}
+    for op in ("update_complaint", "save_results"):
+        count = delta("complaintiq_db_query_seconds_count", f'op="{op}"')
+        total = delta("complaintiq_db_query_seconds_sum", f'op="{op}"')
+        writes[op] = {"calls": int(count), "avg_ms": round(total / count * 1000, 2) if count else None}
+    lock_waits = delta("complaintiq_db_write_lock_seconds_count")
+    return {
+        "locked_errors": int(delta("complaintiq_db_errors_total", 'kind="locked"')),
+        "write_lock_wait_avg_ms": round(delta("complaintiq_db_write_lock_seconds_sum") / lock_waits * 1000, 2)
+        if lock_waits else None,
+        "db_errors": int(delta("complaintiq_db_errors_total")),
+        "write_ops": writes,
+    }
+
+
+def run(scenario):
+    agents = scenario["agents"]
+    duration = scenario["duration_seconds"]
+    ramp = scenario.get("ramp_up_seconds", 0)
+    port = scenario.get("port", 8799)
+    server = scenario.get("server", {})
+
+    with tempfile.TemporaryDirectory() as workdir:
+        proc = start_server(port, workdir, server.get("env"), server.get("workers", 1))
+        try:
+            if scenario.get("seed_rows"):
+                post_csv(port, datagen.csv_bytes(scenario["seed_rows"], scenario.get("seed", 1)))
+            before = scrape_metrics(port)
+
+            stats, stop = Stats(), threading.Event()
+            threads = [Agent(i, port, scenario, stats, stop, ramp * i / agents) for i in range(agents)]
+            start = time.perf_counter()
+            for t in threads:
+                t.start()
+            time.sleep(duration)
+            stop.set()
+            for t in threads:
+                t.join(180)
+            elapsed = time.perf_counter() - start
+
+            after = scrape_metrics(port)
+        finally:
+            proc.terminate()
+            proc.wait(30)
+
+    endpoints = {}
+    for label in sorted(stats.latencies):
+        samples = stats.latencies[label]
+        errors = sum(stats.errors[label].values())
+        endpoints[label] = {
+            **percentiles(samples),
+            "rps": round(len(samples) / elapsed, 2),
+            "errors": errors,
+            "error_rate": round(errors / len(samples), 4),
+            "error_kinds": dict(stats.errors[label]),
+        }
+    total = sum(len(s) for s in stats.latencies.values())
+    total_errors = sum(e["errors"] for e in endpoints.values())
+    sessions = defaultdict(int)
+    for t in threads:
+        sessions[t.session_name] += 1
+
+    return {
+        "agents": agents,
+        "sessions": dict(sessions),
+        "duration_seconds": round(elapsed, 1),
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 2),
+        "error_rate": round(total_errors / total, 4) if total else 0,
+        "endpoints": endpoints,
+        "sqlite": lock_contention(before, after),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", required=True, help="scenario JSON file")
+    parser.add_argument("--agents", type=int, help="override the scenario's agent count")
+    parser.add_argument("--duration", type=float, help="override duration_seconds")
+    parser.add_argument("--workers", type=int, help="override the number of uvicorn workers")
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--out", help="also write the report to this JSON file")
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        scenario = json.load(f)
+    scenario["port"] = args.port
+    if args.agents:
+        scenario["agents"] = args.agents
+    if args.duration:
+        scenario["duration_seconds"] = args.duration
+    if args.workers:
+        scenario.setdefault("server", {})["workers"] = args.workers
+
+    report = run(scenario)
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
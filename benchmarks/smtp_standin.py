@@ -0,0 +1,98 @@
+"""
+Minimal local SMTP stand-in for benchmarks and manual testing.
+
+Speaks just enough SMTP (EHLO/HELO, AUTH, MAIL, RCPT, DATA, RSET, NOOP, QUIT)
+for smtplib, accepts any credentials and keeps delivered messages in memory.
+`connect_delay` sleeps before the greeting to mimic the cost of a real
+TCP + STARTTLS + AUTH handshake; `fail_every` rejects every Nth message.
+
+    python -m benchmarks.smtp_standin --port 2525 --connect-delay 0.05
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def send(self, line):
+        self.wfile.write((line + "\r\n").encode())
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        if server.connect_delay:
+            time.sleep(server.connect_delay)
+        self.send("220 localhost ComplaintIQ SMTP stand-in")
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            cmd = line.decode(errors="replace").strip()
+            verb = cmd.split(" ", 1)[0].upper()
+
+            if verb in ("EHLO", "HELO"):
+                self.wfile.write(b"250-localhost\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME\r\n")
+            elif verb == "AUTH":
+                self.send("235 2.7.0 Authentication successful")
+            elif verb in ("MAIL", "RCPT", "RSET", "NOOP"):
+                self.send("250 OK")
+            elif verb == "DATA":
+                self.send("354 End data with <CR><LF>.<CR><LF>")
+                chunks = []
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data in (b".\r\n", b".\n"):
+                        break
+                    chunks.append(data)
+                with server.lock:
+                    server.received += 1
+                    reject = server.fail_every and server.received % server.fail_every == 0
+                    if not reject:
+                        server.messages.append(b"".join(chunks))
+                self.send("451 Temporary failure" if reject else "250 OK: queued")
+            elif verb == "QUIT":
+                self.send("221 Bye")
+                return
+            else:
+                self.send("502 Command not implemented")
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=0, connect_delay=0.0, fail_every=0):
+        super().__init__((host, port), _Handler)
+        self.connect_delay = connect_delay
+        self.fail_every = fail_every
+        self.lock = threading.Lock()
+        self.messages = []
+        self.received = 0
+        self.connections = 0
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=2525)
+    parser.add_argument("--connect-delay", type=float, default=0.0)
+    parser.add_argument("--fail-every", type=int, default=0)
+    args = parser.parse_args()
+
+    server = SMTPStandIn(port=args.port, connect_delay=args.connect_delay, fail_every=args.fail_every)
+    print(f"SMTP stand-in listening on 127.0.0.1:{server.port}")
+    server.serve_forever()
@@ -2,13 +2,180 @@ import streamlit as st
 import requests
 import pandas as pd
 import io
+import json
+import queue
+import threading
+import time
+from collections import deque
 import plotly.express as px
+from requests.adapters import HTTPAdapter
 
 # -------------------------
 # CONFIG & CONSTANTS
 # -------------------------
 API_URL = "http://127.0.0.1:8000"
 
+def auth_headers():
+    """Bearer header for the session token issued at login."""
+    token = st.session_state.get("token")
+    return {"Authorization": f"Bearer {token}"} if token else {}
+
+# -------------------------
+# API CLIENT (keep-alive + caching)
+# -------------------------
+@st.cache_resource
+def http():
+    """One keep-alive connection pool shared by every rerun and user session."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def record_timing(label, started, cached=False):
+    st.session_state.setdefault("run_timings", []).append((label, time.perf_counter() - started, cached))
+
+def api(method, path, timeout=120, **kwargs):
+    """Uncached backend call over the shared session (writes, uploads, chat)."""
+    started = time.perf_counter()
+    try:
+        return http().request(method, f"{API_URL}{path}", headers=auth_headers(), timeout=timeout, **kwargs)
+    finally:
+        record_timing(f"{method} {path}", started)
+
+@st.cache_data(ttl=3, show_spinner=False)
+def data_version(_headers):
+    """Backend data version; it changes on every upload/edit. Re-polled at most every 3s."""
+    return http().get(f"{API_URL}/data-version", headers=_headers, timeout=10).json()["data_version"]
+
+@st.cache_data(ttl=300, max_entries=64, show_spinner=False)
+def _cached_get(path, params, version, _headers):
+    st.session_state.cache_miss = True
+    res = http().get(f"{API_URL}{path}", params=dict(params), headers=_headers, timeout=120)
+    res.raise_for_status()
+    return res.json()
+
+def cached_get(path, **params):
+    """GET keyed on (path, params, data version): reruns reuse the response until data changes."""
+    started = time.perf_counter()
+    st.session_state.cache_miss = False
+    headers = auth_headers()
+    result = _cached_get(path, tuple(sorted(params.items())), data_version(headers), headers)
+    record_timing(f"GET {path}", started, cached=not st.session_state.cache_miss)
+    return result
+
+def invalidate():
+    """Call after a write so this session sees its own change immediately."""
+    data_version.clear()
+
+def show_timings():
+    """Sidebar overlay with the cost of this rerun and of each API call in it."""
+    timings = st.session_state.get("run_timings", [])
+    total = time.perf_counter() - st.session_state.run_started
+    api_time = sum(t for _, t, _ in timings)
+    with st.sidebar.expander(f"⏱️ Rerun {total * 1000:.0f} ms (API {api_time * 1000:.0f} ms)"):
+        for label, seconds, cached in timings:
+            st.caption(f"{'💾' if cached else '🌐'} {label}: {seconds * 1000:.1f} ms")
+        if not timings:
+            st.caption("No API calls")
+
+# -------------------------
+# LIVE FEED (Server-Sent Events)
+# -------------------------
+# A reader whose session has not rerun for this long (tab closed, reloaded or
+# expired) hangs up; the next rerun of a live session starts a new one
+LIVE_IDLE_SECONDS = 30
+
+def _feed_done(stop, heartbeat):
+    return stop.is_set() or time.monotonic() - heartbeat["at"] > LIVE_IDLE_SECONDS
+
+def _read_events(headers, events, stop, heartbeat):
+    """Background reader for GET /events; reconnects with Last-Event-ID so nothing is missed."""
+    last_id = None
+    while not _feed_done(stop, heartbeat):
+        try:
+            resume = {"Last-Event-ID": str(last_id)} if last_id is not None else {}
+            with requests.get(f"{API_URL}/events", headers={**headers, **resume}, stream=True, timeout=(5, 60)) as res:
+                event_id, event, data = None, None, None
+                # The server sends a keepalive at least every 15s, so an idle reader notices soon
+                for line in res.iter_lines(decode_unicode=True):
+                    if _feed_done(stop, heartbeat):
+                        return
+                    if line.startswith("id: "):
+                        event_id = int(line[4:])
+                    elif line.startswith("event: "):
+                        event = line[7:]
+                    elif line.startswith("data: "):
+                        data = json.loads(line[6:])
+                    elif not line and event:
+                        try:
+                            events.put_nowait((event_id, event, data))
+                        except queue.Full:
+                            # Too far behind to patch incrementally: tell the UI to refetch
+                            with events.mutex:
+                                events.queue.clear()
+                            events.put_nowait((event_id, "reset", {}))
+                        if event_id is not None:
+                            last_id = event_id
+                        event_id, event, data = None, None, None
+        except Exception:
+            pass
+        stop.wait(3)
+
+def start_live_feed():
+    """One SSE reader thread per browser session; events are queued in session state.
+
+    Every rerun (and every live-stats fragment run) refreshes the heartbeat
+    that keeps the reader alive.
+    """
+    thread = st.session_state.get("live_thread")
+    if thread and thread.is_alive():
+        st.session_state.live_heartbeat["at"] = time.monotonic()
+        return
+    st.session_state.live_queue = queue.Queue(maxsize=1000)
+    st.session_state.live_stop = threading.Event()
+    st.session_state.live_heartbeat = {"at": time.monotonic()}
+    st.session_state.live_activity = deque(maxlen=8)
+    st.session_state.live_stats = None
+    st.session_state.live_thread = threading.Thread(
+        target=_read_events, daemon=True,
+        args=(auth_headers(), st.session_state.live_queue, st.session_state.live_stop, st.session_state.live_heartbeat))
+    st.session_state.live_thread.start()
+
+def stop_live_feed():
+    if st.session_state.get("live_stop"):
+        st.session_state.live_stop.set()
+    st.session_state.live_thread = None
+
+def apply_live_events():
+    """Patches the dashboard counters and activity list with the queued events."""
+    stats = st.session_state.live_stats
+    changed = False
+    while True:
+        try:
+            event_id, event, data = st.session_state.live_queue.get_nowait()
+        except queue.Empty:
+            break
+        changed = True
+        if event == "reset":
+            stats = None
+            continue
+        if event == "complaints_added":
+            st.session_state.live_activity.appendleft(f"📥 {data['count']} new complaint(s)")
+        elif event == "status_changed":
+            st.session_state.live_activity.appendleft(f"🎫 #{data['id']} {data['old_status']} → {data['status']}")
+        # Counters fetched after this event already include it
+        if stats and event_id > stats["event_id"]:
+            for key, delta in data.get("metrics", {}).items():
+                stats[key] += delta
+            stats["event_id"] = event_id
+    if changed:
+        invalidate()
+    if stats is None:
+        stats = dict(cached_get("/dashboard-stats"))
+    st.session_state.live_stats = stats
+    return stats
+
 st.set_page_config(
     page_title="ComplaintIQ | Banking Intelligence",
     page_icon="🏦",
@@ -87,6 +254,8 @@ apply_custom_styling()
 if "page" not in st.session_state: st.session_state.page = "login"
 if "authenticated" not in st.session_state: st.session_state.authenticated = False
 if "messages" not in st.session_state: st.session_state.messages = []
+st.session_state.run_started = time.perf_counter()
+st.session_state.run_timings = []
 
 # -------------------------
 # AUTHENTICATION UI
@@ -117,7 +286,7 @@ def show_login_page():
                     else:
                         try:
                             # REAL API CALL
-                            res = requests.post(f"{API_URL}/login", json={"email": email, "password": password})
+                            res = api("POST", "/login", json={"email": email, "password": password})
                             
                             if res.status_code == 200:
                                 data = res.json()
@@ -125,6 +294,7 @@ def show_login_page():
                                     st.success("Welcome back!")
                                     st.session_state.authenticated = True
                                     st.session_state.user_info = data["user"]
+                                    st.session_state.token = data.get("token")
                                     st.rerun()
                                 else:
                                     st.error("Login failed: Invalid response from server.")
@@ -159,12 +329,11 @@ def show_login_page():
                         try:
                             # REAL API CALL
                             payload = {"email": new_email, "password": new_pass, "full_name": name}
-                            res = requests.post(f"{API_URL}/register", json=payload)
+                            res = api("POST", "/register", json=payload)
                             
                             if res.status_code == 200:
                                 st.success("✅ Account created! Redirecting to login...")
                                 st.session_state.page = "login"
-                                import time
                                 time.sleep(2)
                                 st.rerun()
                             else:
@@ -194,6 +363,57 @@ def highlight_critical(val):
     color = '#ff4b4b' if val == 'P1 - Critical' else ''
     return f'color: {color}; font-weight: bold'
 
+# -------------------------
+# HELPER: Report Job Status
+# -------------------------
+@st.fragment(run_every="2s")
+def show_report_job():
+    """Polls the background report job; only this fragment reruns while it renders."""
+    job_id = st.session_state.get("report_job")
+    if not job_id:
+        return
+    try:
+        job = http().get(f"{API_URL}/reports/{job_id}", headers=auth_headers(), timeout=10).json()
+    except:
+        st.warning("Backend offline")
+        return
+
+    if job.get("state") == "done":
+        # Fetch the file once per job, not on every fragment rerun
+        if st.session_state.get("report_pdf", (None,))[0] != job_id:
+            pdf = http().get(f"{API_URL}/reports/{job_id}/download", headers=auth_headers(), timeout=120)
+            st.session_state.report_pdf = (job_id, pdf.content)
+        st.download_button("📥 Download PDF Report", st.session_state.report_pdf[1], "ComplaintIQ_Report.pdf", "application/pdf")
+    elif job.get("state") == "failed":
+        st.error(f"Report failed: {job.get('error')}")
+    elif job.get("state") in ("queued", "running"):
+        total = job.get("rows_total") or 0
+        done = job.get("rows_done") or 0
+        st.progress(min(done / total, 1.0) if total else 0.0,
+                    text=f"Rendering... {done}/{total or '?'} rows, {job.get('pages', 0)} pages")
+    else:
+        st.session_state.pop("report_job", None)
+
+# -------------------------
+# HELPER: Live Dashboard Counters
+# -------------------------
+@st.fragment(run_every="2s")
+def show_live_stats():
+    """Dashboard counters patched from the event stream; only this fragment reruns."""
+    start_live_feed()
+    try:
+        stats = apply_live_events()
+    except: stats = {"total":0, "critical":0, "resolved":0}
+
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Total Complaints", stats['total'], border=True)
+    c2.metric("Critical Attention", stats['critical'], delta="High Priority", delta_color="inverse", border=True)
+    c3.metric("Tickets Resolved", stats['resolved'], delta="Completed", border=True)
+    if st.session_state.live_activity:
+        with st.expander("🔴 Live activity", expanded=False):
+            for line in st.session_state.live_activity:
+                st.caption(line)
+
 # -------------------------
 # MAIN DASHBOARD
 # -------------------------
@@ -216,6 +436,8 @@ def show_dashboard():
         st.caption("Logged in as: **Admin**")
         if st.button("Logout", type="primary"):
             st.session_state.authenticated = False
+            st.session_state.token = None
+            stop_live_feed()
             st.rerun()
 
     # --- 1. DASHBOARD TAB ---
@@ -223,17 +445,8 @@ def show_dashboard():
         st.title("📊 Operational Overview")
         st.markdown("Welcome back. Here is the current system status.")
         
-        # Fetch Metrics
-        try:
-            response = requests.get(f"{API_URL}/dashboard-stats")
-            stats = response.json() if response.status_code == 200 else {"total":0, "critical":0, "resolved":0}
-        except: stats = {"total":0, "critical":0, "resolved":0}
-
-        # Metrics Row
-        c1, c2, c3 = st.columns(3)
-        c1.metric("Total Complaints", stats['total'], border=True)
-        c2.metric("Critical Attention", stats['critical'], delta="High Priority", delta_color="inverse", border=True)
-        c3.metric("Tickets Resolved", stats['resolved'], delta="Completed", border=True)
+        # Metrics Row (kept current by the live feed, no full rerun needed)
+        show_live_stats()
 
         st.markdown("---")
         
@@ -249,14 +462,13 @@ def show_dashboard():
                 with st.spinner("AI Agent is classifying & notifying..."):
                     files = {"file": uploaded_file.getvalue()}
                     try:
-                        res = requests.post(f"{API_URL}/analyze", files={"file": uploaded_file})
+                        res = api("POST", "/analyze", files={"file": uploaded_file}, timeout=600)
                         if res.status_code == 200:
+                            invalidate()
                             data = res.json()
-                            st.success(f"✅ Processed {data['total_new_complaints']} records!")
+                            # A toast survives the rerun, so no need to pause for the user to read it
+                            st.toast(f"✅ Processed {data['total_new_complaints']} records!")
                             st.session_state.latest_data = data['sample_output']
-
-                            import time
-                            time.sleep(1.5) # Wait so user sees the "Success" message
                             st.rerun()
                         
                         else:
@@ -280,36 +492,54 @@ def show_dashboard():
     elif menu == "Analytics & Reports":
         st.title("📈 Intelligence & Reporting")
         
-        # Report Button
-        c_text, c_btn = st.columns([4, 1])
-        with c_text: st.caption("Visualize trends and generate PDF reports for management.")
-        with c_btn:
-            try:
-                report_res = requests.get(f"{API_URL}/generate-report")
-                if report_res.status_code == 200:
-                    st.download_button("📄 Download PDF Report", report_res.content, "ComplaintIQ_Report.pdf", "application/pdf")
-            except: st.warning("Backend offline")
-
-        # Fetch Data
+        st.caption("Visualize trends and generate PDF reports for management.")
+
+        # Report Builder (rendered by a background job, so charts load right away)
+        with st.expander("📄 PDF Report"):
+            with st.form("report_form"):
+                c1, c2, c3 = st.columns(3)
+                mode = c1.selectbox("Report Type", ["summary", "detail"], format_func=lambda m: "Executive Summary" if m == "summary" else "Full Ticket List")
+                date_range = c2.date_input("Date Range", value=[])
+                status_filter = c3.selectbox("Status", ["All", "Open", "In Progress", "Resolved", "Escalated"])
+                if st.form_submit_button("Generate Report"):
+                    payload = {"mode": mode}
+                    if len(date_range) == 2:
+                        payload["start_date"], payload["end_date"] = (d.isoformat() for d in date_range)
+                    if status_filter != "All":
+                        payload["status"] = status_filter
+                    try:
+                        res = api("POST", "/reports", json=payload)
+                        if res.status_code == 202:
+                            st.session_state.report_job = res.json()["job_id"]
+                        else:
+                            st.error(f"Error: {res.text}")
+                    except: st.warning("Backend offline")
+            show_report_job()
+
+        # Fetch Aggregates (counted server-side from the rollup tables)
         try:
-            res = requests.get(f"{API_URL}/all-complaints")
-            data = res.json()
-            if data:
-                df = pd.DataFrame(data)
-                
+            categories = cached_get("/analytics/breakdown", by="category")
+            if categories["total"]:
                 # Charts
-                tab1, tab2 = st.tabs(["Category Distribution", "Timeline Analysis"])
-                
+                tab1, tab2, tab3 = st.tabs(["Category Distribution", "Timeline Analysis", "Priority & Sentiment"])
+
                 with tab1:
-                    fig = px.pie(df, names='category', title='Complaints by Category', hole=0.4, color_discrete_sequence=px.colors.qualitative.Pastel)
+                    df_cat = pd.DataFrame(list(categories["counts"].items()), columns=["category", "count"])
+                    fig = px.pie(df_cat, names='category', values='count', title='Complaints by Category', hole=0.4, color_discrete_sequence=px.colors.qualitative.Pastel)
                     st.plotly_chart(fig, use_container_width=True)
-                
+
                 with tab2:
-                    if 'date_logged' in df.columns:
-                        df['date_logged'] = pd.to_datetime(df['date_logged'])
-                        daily = df.groupby(df['date_logged'].dt.date).size().reset_index(name='count')
-                        fig2 = px.line(daily, x='date_logged', y='count', title='Daily Volume', markers=True)
-                        st.plotly_chart(fig2, use_container_width=True)
+                    granularity = st.radio("Granularity", ["day", "week", "month"], horizontal=True, format_func=str.title)
+                    series = cached_get("/analytics/timeseries", granularity=granularity)["series"]
+                    fig2 = px.line(pd.DataFrame(series), x='period', y='count', title=f'{granularity.title()}ly Volume', markers=True)
+                    st.plotly_chart(fig2, use_container_width=True)
+
+                with tab3:
+                    c1, c2, c3 = st.columns(3)
+                    for col, by in ((c1, "priority"), (c2, "status"), (c3, "sentiment")):
+                        counts = cached_get("/analytics/breakdown", by=by)["counts"]
+                        df_by = pd.DataFrame(list(counts.items()), columns=[by, "count"])
+                        col.plotly_chart(px.bar(df_by, x=by, y='count', title=f'By {by.title()}'), use_container_width=True)
             else:
                 st.info("No data available for analytics.")
         except Exception as e: st.error(f"Error loading analytics: {e}")
@@ -319,57 +549,76 @@ def show_dashboard():
         st.title("🎫 Ticket Resolution")
         st.caption("Update status to 'Resolved' to automatically notify customers via Email.")
 
+        # Filters are applied server-side; only one page is ever loaded
+        STATUSES = ["Open", "In Progress", "Resolved", "Escalated"]
         try:
-            res = requests.get(f"{API_URL}/all-complaints")
-            if res.status_code == 200 and res.json():
-                df = pd.DataFrame(res.json())
-                
-                # Editable Grid
+            categories = cached_get("/analytics/breakdown", by="category").get("counts", {})
+            priorities = cached_get("/analytics/breakdown", by="priority").get("counts", {})
+            f1, f2, f3, f4 = st.columns([1, 1, 1, 2])
+            status = f1.selectbox("Status", ["All"] + STATUSES, index=1)
+            category = f2.selectbox("Category", ["All"] + sorted(categories))
+            priority = f3.selectbox("Priority", ["All"] + sorted(priorities))
+            search = f4.text_input("Search", placeholder="Customer, account or complaint text")
+
+            filters = {k: v for k, v in {"status": status, "category": category, "priority": priority}.items() if v != "All"}
+            if search.strip():
+                filters["q"] = search.strip()
+            # A new filter starts again from page 1
+            if st.session_state.get("ticket_filters") != filters:
+                st.session_state.ticket_filters = filters
+                st.session_state.ticket_page = 1
+
+            p1, p2 = st.columns([1, 4])
+            page_size = p1.selectbox("Rows per page", [25, 50, 100, 200], index=1)
+            result = cached_get("/complaints", page=st.session_state.get("ticket_page", 1), page_size=page_size, **filters)
+            pages = max(result["pages"], 1)
+            page = p2.number_input(f"Page (of {pages}, {result['total']} tickets)", min_value=1, max_value=pages,
+                                   value=min(result["page"], pages), step=1)
+            if page != result["page"]:
+                st.session_state.ticket_page = int(page)
+                st.rerun()
+
+            if result["items"]:
+                df = pd.DataFrame(result["items"])
+                df["action"] = df["action"].fillna("")
+
+                # Editable Grid (keyed per page/filter so edits never leak across pages)
                 edited_df = st.data_editor(
-                    df,
-                    key="ticket_editor",
+                    df[["id", "customer_name", "complaint", "category", "priority", "status", "action"]],
+                    key=f"ticket_editor_{page}_{page_size}_{sorted(filters.items())}",
                     num_rows="fixed",
                     column_config={
                         "id": st.column_config.NumberColumn("ID", disabled=True, width="small"),
                         "customer_name": st.column_config.TextColumn("Customer", disabled=True),
                         "complaint": st.column_config.TextColumn("Issue", disabled=True, width="large"),
+                        "category": st.column_config.TextColumn("Category", disabled=True),
                         "priority": st.column_config.TextColumn("Priority", disabled=True),
-                        "status": st.column_config.SelectboxColumn("Status", options=["Open", "In Progress", "Resolved", "Escalated"], required=True),
+                        "status": st.column_config.SelectboxColumn("Status", options=STATUSES, required=True),
                         "action": st.column_config.TextColumn("Agent Notes", width="medium")
                     },
                     hide_index=True,
                     use_container_width=True
                 )
 
-                if st.button("💾 Save & Notify Customers", type="primary"):
-                    # (Same robust save logic as before)
-                    progress = st.progress(0)
-                    updates = 0
-                    orig_dict = df.set_index("id")[["status", "action"]].to_dict(orient="index")
-                    
-                    for idx, row in edited_df.iterrows():
-                        curr_id = int(row["id"])
-                        if curr_id in orig_dict:
-                            orig_stat = orig_dict[curr_id]["status"]
-                            orig_act = orig_dict[curr_id]["action"]
-                            new_stat = row["status"]
-                            new_act = row["action"] if row["action"] else ""
-                            
-                            if new_stat != orig_stat or new_act != (orig_act if orig_act else ""):
-                                payload = {"id": curr_id, "status": new_stat, "action": new_act}
-                                requests.post(f"{API_URL}/update-complaint", json=payload)
-                                updates += 1
-                    
-                    progress.progress(100)
-                    if updates > 0:
-                        st.success(f"✅ Updated {updates} tickets! Emails sent where applicable.")
-                        import time
-                        time.sleep(1.5)
-                        st.rerun()
+                # Change detection on the visible page only
+                edited_df["action"] = edited_df["action"].fillna("")
+                changed = edited_df[(edited_df["status"] != df["status"]) | (edited_df["action"] != df["action"])]
+                st.caption(f"{len(changed)} unsaved change(s) on this page")
+
+                if st.button("💾 Save & Notify Customers", type="primary", disabled=changed.empty):
+                    updates = [{"id": int(r.id), "status": r.status, "action": r.action}
+                               for r in changed.itertuples(index=False)]
+                    res = api("POST", "/complaints/bulk-update", json={"updates": updates}).json()
+                    if "error" in res:
+                        st.error(f"Save failed: {res['error']}")
                     else:
-                        st.info("No changes detected.")
+                        invalidate()
+                        st.toast(f"✅ Updated {res['updated']} tickets! Emails sent where applicable.")
+                        if res.get("missing_ids"):
+                            st.toast(f"⚠️ Tickets no longer exist: {res['missing_ids']}")
+                        st.rerun()
             else:
-                st.info("No active tickets found.")
+                st.info("No tickets match these filters.")
         except Exception as e: st.error(f"Connection Error: {e}")
 
     # --- 4. AI CHAT TAB ---
@@ -390,7 +639,7 @@ def show_dashboard():
             with st.chat_message("assistant", avatar="🤖"):
                 try:
                     # 1. Get the FULL response (Text + Data)
-                    res = requests.post(f"{API_URL}/chat", params={"query": prompt})
+                    res = api("POST", "/chat", params={"query": prompt})
                     full_response = res.json() 
                     
                     # 2. Extract the Text Message
@@ -420,23 +669,82 @@ def show_dashboard():
             cat = c1.selectbox("Category", ["Fraud", "Loan", "Credit Card", "Account"])
             word = c2.text_input("New Keyword")
             if st.form_submit_button("Add to Knowledge Base"):
-                requests.post(f"{API_URL}/add-keyword", json={"category": cat, "word": word})
+                api("POST", "/add-keyword", json={"category": cat, "word": word})
+                _cached_get.clear()  # keywords are not covered by the data version
                 st.success(f"AI updated with '{word}'")
                 st.rerun()
 
         st.markdown("---")
         st.subheader("Existing Keywords")
         try:
-            kw = requests.get(f"{API_URL}/keywords").json()
+            kw = cached_get("/keywords")
             for k, v in kw.items():
                 with st.expander(f"{k} ({len(v)})"):
                     st.write(", ".join([f"`{x}`" for x in v]))
         except: st.error("Database offline")
 
+        st.markdown("---")
+        st.subheader("🚦 Triage Rules")
+        st.caption("First matching rule wins. Conditions: category, sentiment, urgency (priority rules only), "
+                   "keywords_any + min_hits, score_min / score_max (sentiment score, -1 to 1).")
+        try:
+            rule_set = api("GET", "/rules").json()
+            st.caption(f"Rule set version {rule_set['version']}")
+            for kind in ("urgency", "priority"):
+                with st.expander(f"{kind.title()} rules ({len(rule_set[kind])})"):
+                    text = st.text_area(f"{kind} rules (JSON)", json.dumps(rule_set[kind], indent=2), height=300,
+                                        key=f"rules_{kind}_{rule_set['version']}", label_visibility="collapsed")
+                    if st.button(f"Save {kind} rules", key=f"save_rules_{kind}"):
+                        try:
+                            res = api("PUT", f"/rules/{kind}", json=json.loads(text)).json()
+                        except ValueError as e:
+                            res = {"error": f"Invalid JSON: {e}"}
+                        if "error" in res:
+                            st.error(res["error"])
+                        else:
+                            st.toast(f"Rules saved (version {res['version']}); new uploads use them immediately")
+                            st.rerun()
+            if st.button("Restore default rules"):
+                api("POST", "/rules/reset")
+                st.rerun()
+        except: st.error("Database offline")
+
+        st.markdown("---")
+        st.subheader("🏷️ Category Model")
+        st.caption("Learns categories from resolved tickets + the keywords above; low-confidence predictions keep the keyword match.")
+        try:
+            info = api("GET", "/category-model").json()
+            models = {m["version"]: m for m in info["models"]}
+            active = info["active"]
+            if active in models:
+                m = models[active]
+                st.info(f"Active: v{active} (trained {m['created_at']} on {m['train_rows']} tickets, holdout accuracy {m.get('holdout_accuracy', 0):.1%})")
+            else:
+                st.info("Active: keywords only")
+
+            c1, c2 = st.columns(2)
+            if c1.button("Train from resolved tickets", disabled=not info["enabled"]):
+                with st.spinner("Training..."):
+                    res = api("POST", "/category-model/train", timeout=600).json()
+                if "error" in res:
+                    st.error(res["error"])
+                else:
+                    st.toast(f"v{res['version']} trained (holdout accuracy {res.get('holdout_accuracy', 0):.1%})"
+                             + ("" if res["active"] else " but not activated: accuracy below threshold"))
+                    st.rerun()
+            choice = c2.selectbox("Use version", [0] + list(models), index=([0] + list(models)).index(active) if active in models else 0,
+                                  format_func=lambda v: "Keywords only" if v == 0 else f"v{v} ({models[v].get('holdout_accuracy', 0):.1%})")
+            if choice != (active if active in models else 0):
+                api("POST", f"/category-model/activate/{choice}")
+                st.rerun()
+        except: st.error("Database offline")
+
 # -------------------------
 # ROUTER
 # -------------------------
 if st.session_state.authenticated:
+    start_live_feed()
     show_dashboard()
+    show_timings()
 else:
     show_login_page()
\ No newline at end of file